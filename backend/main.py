@@ -1,33 +1,97 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import librosa
+import asyncio
+import hmac
 import numpy as np
-import tempfile
 import os
 import sys
-from typing import List
+from typing import List, Optional
 import json
 from datetime import datetime
 
 # Add parent directory to path to import from src
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from transcriber.transcribe import transcribe_bytes
-from src.backend.bad_word_flagger import WordFlagger
+from transcriber.transcribe import transcribe_file
+from transcriber.profiles import get_profile
+from transcriber.language import analysis_supported
+from transcriber.media_probe import ASR_SAMPLE_RATE, extract_pcm
+from src.backend.vocabulary_store import VocabularyStore
+from src.backend.debug_sink import DebugSink
+from src.backend.media_store import MediaStore
+from src.backend.upload_ingest import UploadRejected, ingest_upload
+from src.backend.observability import configure_logging, get_logger, metrics_payload, record_cache, record_stage, span
+from src.backend.profiling import EXPORT_FORMATS, ProfileStore, annotate, profile_request, to_chrome_trace, to_collapsed, to_speedscope
+from src.backend.redaction import REDACT_MODES, merge_intervals, output_format, probe_has_video, start_redaction
+from src.backend.aggregation import (
+    index_results,
+    build_score_matrix,
+    build_processed_sentences,
+    aggregate_overall_scores,
+)
 from src.ai.extremist_batch_two import HierarchicalExtremismDetector
+from src.ai.llm_transport import aclose_async_client
+
+configure_logging()
+log = get_logger("backend")
 
 app = FastAPI(title="Audio Analysis API", version="1.0.0")
 
 # Create single detector instance (reuse across requests)
 _detector = HierarchicalExtremismDetector()
-_flagger = WordFlagger()
+
+# Vocabulary filter shared by all workers (SQLite, hot-reloaded on version change)
+_vocabulary = VocabularyStore()
+
+# Sampled debug/audit output (see src/backend/debug_sink.py for retention settings)
+_debug_sink = DebugSink(os.environ.get("DEBUG_OUTPUT_DIR", os.path.join(os.path.dirname(__file__), 'debug_output')))
+
+# Uploaded media, kept for /redact (content-addressed, size/age-limited)
+_media_store = MediaStore()
+
+# Request profiles (see src/backend/profiling.py), stored next to the media they were taken for
+_profile_store = ProfileStore(os.path.join(_media_store.directory, "profiles"))
+
+# Token for the /admin endpoints and for requesting a profile with "X-Profile: 1" (unset = disabled)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Default extremism analysis mode: "sentence" (isolated) or "window" (context windows)
+ANALYSIS_MODE = os.environ.get("ANALYSIS_MODE", "sentence")
+
+# Speech in a language the (English) analysis does not support (env ANALYSIS_LANGUAGES):
+# "skip" returns the transcript without extremism analysis, "llm" reroutes it to a detector
+# running both stages on the LLM (no English-only local extractor / word lists).
+UNSUPPORTED_LANGUAGE_POLICY = os.environ.get("UNSUPPORTED_LANGUAGE_POLICY", "skip")
+_multilingual_detector: Optional[HierarchicalExtremismDetector] = None
+
+
+def _detector_for(language: Optional[str]) -> Optional[HierarchicalExtremismDetector]:
+    """Detector for a transcript language, or None if its analysis is skipped."""
+    global _multilingual_detector
+    if analysis_supported(language):
+        return _detector
+    if UNSUPPORTED_LANGUAGE_POLICY != "llm":
+        return None
+    if _multilingual_detector is None:
+        _multilingual_detector = HierarchicalExtremismDetector(stage1_engine="llm", stage2_engine="llm")
+    return _multilingual_detector
 
 # Pydantic models for request bodies
 class WordRequest(BaseModel):
     word: str
 
+class RedactRange(BaseModel):
+    start: float
+    end: float
+
+class RedactRequest(BaseModel):
+    media_id: str
+    ranges: List[RedactRange]
+    mode: str = "beep"        # "beep" | "mute"
+    padding_s: float = 0.05   # extra seconds redacted around each range
+
 # CORS for Flutter web
 app.add_middleware(
     CORSMiddleware,
@@ -37,6 +101,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("shutdown")
+async def _close_llm_pool():
+    await aclose_async_client()
+
+
 @app.get("/")
 def read_root():
     return {
@@ -45,38 +115,62 @@ def read_root():
         "version": "1.0.0"
     }
 
+def _is_admin(request: Request) -> bool:
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def _require_admin(request: Request) -> None:
+    if not _is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def _profile_requested(request: Request) -> bool:
+    """"X-Profile: 1" from an admin; profiling every caller's request on demand is not offered."""
+    if request.headers.get("X-Profile", "").lower() not in ("1", "true", "yes"):
+        return False
+    if not _is_admin(request):
+        log.warning("⚠️ X-Profile ignored: missing or invalid X-Admin-Token")
+        return False
+    return True
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (stage latency, in-flight stages, tokens, cache hits, errors)"""
+    body, content_type = metrics_payload()
+    return Response(content=body, media_type=content_type)
+
+async def _ingest(request: Request):
+    """Stream the multipart "file" field into the media store (see src/backend/upload_ingest.py)."""
+    try:
+        with span("upload"):
+            return await ingest_upload(request, _media_store)
+    except UploadRejected as e:
+        log.warning("⛔ Upload rejected (%s): %s", e.status_code, e.detail)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
 @app.post("/extract-waveform")
-async def extract_waveform(file: UploadFile = File(...)):
-    """Extract waveform from audio/video file"""
-    print(f"📁 Received file: {file.filename}")
-    
-    allowed_extensions = ['mp3', 'wav', 'mp4', 'm4a', 'aac', 'flac', 'ogg', 'mov', 'avi']
-    file_ext = file.filename.split('.')[-1].lower()
-    
-    if file_ext not in allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported extension: {file_ext}"
-        )
-    
-    tmp_path = None
+async def extract_waveform(request: Request):
+    """Extract waveform from audio/video file (multipart field "file")"""
+    # Streamed to disk and sniffed by ffprobe: non-media, over-size and over-long
+    # uploads are rejected before the whole body is received
+    upload = await _ingest(request)
+    log.info("📁 Received file: %s", upload.filename)
     
     try:
-        # Save file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_ext}') as tmp:
-            content = await file.read()
-            tmp.write(content)
-            tmp_path = tmp.name
+        log.debug("💾 Stored as: %s", upload.path)
+        log.debug("📊 Size: %.2f MB", upload.size / 1024 / 1024)
         
-        print(f"💾 Saved to: {tmp_path}")
-        print(f"📊 Size: {len(content) / 1024 / 1024:.2f} MB")
-        
-        # Load audio
-        print("🎵 Loading audio...")
-        y, sr = librosa.load(tmp_path, sr=22050, mono=True)
+        # Load audio: only the audio stream is decoded, by ffmpeg, at the ASR rate
+        log.debug("🎵 Loading audio...")
+        sr = ASR_SAMPLE_RATE
+        with span("decode", media_id=upload.media_id):
+            y = await asyncio.to_thread(extract_pcm, upload.path, sr)
         
         duration = len(y) / sr
-        print(f"⏱️ Duration: {duration:.2f}s")
+        log.debug("⏱️ Duration: %.2fs", duration)
         
         # Reduce resolution to 500-1000 points
         target_samples = min(1000, len(y))
@@ -106,7 +200,7 @@ async def extract_waveform(file: UploadFile = File(...)):
         else:
             waveform_normalized = np.zeros(len(waveform_array), dtype=int)
         
-        print(f"✅ Waveform generated: {len(waveform_normalized)} points")
+        log.info("✅ Waveform generated: %d points", len(waveform_normalized))
         
         return {
             "success": True,
@@ -114,64 +208,106 @@ async def extract_waveform(file: UploadFile = File(...)):
             "sample_rate": int(sr),
             "duration": float(duration),
             "samples": len(waveform_normalized),
-            "filename": file.filename,
-            "file_size": len(content)
+            "filename": upload.filename,
+            "file_size": upload.size,
+            "media_id": upload.media_id,
         }
     
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"❌ Error: {str(e)}")
-        print(f"📋 Details:\n{error_details}")
+        log.exception("❌ Error: %s", e)
         raise HTTPException(status_code=500, detail=f"{str(e)}\n\nTraceback: {error_details}")
-    
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
-            print("🗑️ Removed temporary file")
 
 @app.post("/process-media/")
-async def process_media(file: UploadFile = File(...)):
+async def process_media(
+    request: Request,
+    analysis_mode: str = ANALYSIS_MODE,
+    profile: Optional[str] = None,
+    asr_profile: Optional[str] = None,
+):
     """
-    Process audio/video file:
+    Process audio/video file (multipart field "file"):
     1. Transcribes to text
     2. Flags bad words
     3. Batch analyzes all sentences for extremism
     4. Categorizes and returns processed data
+
+    analysis_mode: "sentence" analyzes each sentence in isolation; "window" analyzes
+    sentences in context windows with their neighbours (better recall on pronoun-heavy
+    speech, fewer LLM calls).
+
+    profile: vocabulary filter profile (tenant) to flag words with; the shared list by default.
+
+    asr_profile: transcription profile, "fast" (bulk triage), "balanced" (default, env
+    ASR_PROFILE) or "accurate" (escalations); see transcriber/profiles.py.
+
+    With "X-Profile: 1" (and X-Admin-Token) the request is profiled and the response carries
+    "X-Profile-Id"; see /admin/profiles. PROFILE_SLOW_S also keeps profiles of slow requests.
     """
+    async with profile_request(
+        _profile_store, forced=_profile_requested(request), path="/process-media/",
+        analysis_mode=analysis_mode, asr_profile=asr_profile,
+    ) as profile_run:
+        response = await _process_media(request, analysis_mode, profile, asr_profile)
+    if profile_run is not None and profile_run.saved:
+        response.headers["X-Profile-Id"] = profile_run.profile_id
+    return response
+
+
+async def _process_media(
+    request: Request,
+    analysis_mode: str,
+    profile: Optional[str],
+    asr_profile: Optional[str],
+) -> JSONResponse:
+    if analysis_mode not in ("sentence", "window"):
+        raise HTTPException(status_code=400, detail=f"Unsupported analysis_mode: {analysis_mode}")
+    try:
+        # SQLite read, and a matcher recompile if the list changed: off the event loop
+        flagger = await asyncio.to_thread(_vocabulary.flagger, profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        asr = get_profile(asr_profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    def categorize_score(score):
-        """Categorize numerical score into None, Low, Medium, High"""
-        if score < 2.0:
-            return {"level": "None", "color": "#48BB78", "icon": "check_circle"}
-        elif score < 5.0:
-            return {"level": "Low", "color": "#ECC94B", "icon": "info"}
-        elif score < 7.5:
-            return {"level": "Medium", "color": "#ED8936", "icon": "warning"}
-        else:
-            return {"level": "High", "color": "#E53E3E", "icon": "error"}
-    
+    # Step 1: Stream the upload to the media store (rejects bad/oversized files early)
+    upload = await _ingest(request)
+    media_id = upload.media_id
+    annotate(media_id=media_id, filename=upload.filename, size=upload.size)
+
     try:
-        print(f"📁 Processing file: {file.filename}")
-        
-        # Step 1: Read file
-        file_bytes = await file.read()
-        print(f"📦 Size: {len(file_bytes) / 1024 / 1024:.2f} MB")
+        log.info("📁 Processing file: %s", upload.filename)
+        log.debug("📦 Size: %.2f MB", upload.size / 1024 / 1024)
 
-        # Step 2: Transcribe
-        print("🎵 Transcribing audio...")
-        transcribe_result = transcribe_bytes(file_bytes, filename_hint=file.filename)
+        # Step 2: Transcribe (the transcriber reports its own extract/LID/ASR/pack timings).
+        # ffmpeg, LID and Whisper block for seconds to minutes: run them off the event loop
+        log.debug("🎵 Transcribing audio (%s profile)...", asr.name)
+        with span("transcribe", media_id=media_id, asr_profile=asr.name):
+            transcribe_result = await asyncio.to_thread(
+                transcribe_file, upload.path, return_words=True, columnar_words=True,
+                content_hash=media_id, profile=asr,
+            )
+        for stage, seconds in transcribe_result.get("timings", {}).items():
+            record_stage(stage, seconds)
+        if transcribe_result.get("cache") in ("hit", "miss"):
+            record_cache("transcript", transcribe_result["cache"] == "hit")
         sentences = transcribe_result.get("sentences", [])
+        words = transcribe_result.get("words", [])
+        language = transcribe_result.get("language")
         transcription_text = " ".join([str(s.get("text", "")) for s in sentences]).strip()
-        print(f"📝 Transcription completed: {len(sentences)} sentences, {len(transcription_text)} characters")
+        log.info("📝 Transcription completed: %d sentences, %d characters", len(sentences), len(transcription_text))
 
-        # Step 3: Flag bad words
-        print("🚩 Detecting inappropriate words...")
-        flagged_words = _flagger.flag_words(transcription_text)
-        print(f"🚩 Found {len(flagged_words)} flagged sentences")
+        # Step 3: Flag bad words on the Whisper word stream (with audio start/end per hit)
+        log.debug("🚩 Detecting inappropriate words...")
+        with span("flag"):
+            flagged_words = flagger.flag_word_stream(words, sentences)
+        log.info("🚩 Found %d flagged sentences", len(flagged_words))
 
         # Step 4: Batch analyze ALL sentences using the batch method
-        print(f"🔍 Batch analyzing {len(sentences)} sentences...")
+        log.debug("🔍 Batch analyzing %d sentences...", len(sentences))
         
         # Prepare batch input - list of dicts with id and text
         batch_input = [
@@ -184,184 +320,42 @@ async def process_media(file: UploadFile = File(...)):
         ]
         
         # Use the async batch method directly (we're in an async context)
-        batch_results = await _detector._batch_analyze_async(batch_input)
-        print(f"✅ Batch analysis completed for {len(batch_results)} sentences")
-        
-        # Category colors for frontend
-        category_colors = {
-            'violence_advocacy': '#E53E3E',
-            'dehumanization': '#9F7AEA',
-            'outgroup_homogenization': '#38B2AC',
-            'threat_inflation': '#ED8936',
-            'absolutism': '#ECC94B',
-        }
-        
-        category_names = {
-            'violence_advocacy': 'Violence Advocacy',
-            'dehumanization': 'Dehumanization',
-            'outgroup_homogenization': 'Outgroup Homogenization',
-            'threat_inflation': 'Threat Inflation',
-            'absolutism': 'Absolutism',
-        }
-        
-        # Step 5: Process each sentence with its individual analysis
-        processed_sentences = []
-        all_dimension_scores = {
-            'violence_advocacy': [],
-            'dehumanization': [],
-            'outgroup_homogenization': [],
-            'threat_inflation': [],
-            'absolutism': []
-        }
-        
-        for idx, sentence in enumerate(sentences):
-            # Find corresponding batch result
-            batch_result = None
-            for result in batch_results:
-                if result.get('text_id') == idx:
-                    batch_result = result
-                    break
-            
-            if batch_result is None or 'error' in batch_result:
-                # Fallback for missing/error results
-                processed_sentence = {
-                    'text': sentence.get('text', ''),
-                    'start': sentence.get('start', 0),
-                    'end': sentence.get('end', 0),
-                    'category': 'Transcription',
-                    'color': '#667EEA',
-                    'level': 'None'
-                }
-                processed_sentences.append(processed_sentence)
-                continue
-            
-            # Get this sentence's scores
-            sentence_scores = batch_result.get('scores', {})
-            
-            # Find the highest scoring dimension
-            dominant_category = None
-            highest_score = 0.0
-            
-            for dimension in ['violence_advocacy', 'dehumanization', 
-                            'outgroup_homogenization', 'threat_inflation', 'absolutism']:
-                if dimension in sentence_scores:
-                    score_data = sentence_scores[dimension]
-                    if isinstance(score_data, dict) and 'score' in score_data:
-                        score = score_data['score']
-                    elif isinstance(score_data, (int, float)):
-                        score = score_data
-                    else:
-                        score = 0.0
-                    
-                    # Collect for overall aggregation
-                    all_dimension_scores[dimension].append(score)
-                    
-                    if score > highest_score:
-                        highest_score = score
-                        dominant_category = dimension
-            
-            # Determine category and level based on this sentence's score
-            # Check both vocabulary filter AND extremism categories
-            sentence_text = sentence.get('text', '')
-            words_in_sentence = [word.lower().strip() for word in sentence_text.split()]
-            has_filtered_word = any(word in _flagger.bad_words for word in words_in_sentence)
-            
-            # Check for extremism category
-            extremism_category = None
-            extremism_level = 'None'
-            extremism_color = None
-            
-            if dominant_category and highest_score >= 2.0:
-                extremism_category = category_names[dominant_category]
-                category_info = categorize_score(highest_score)
-                extremism_level = category_info['level']
-                extremism_color = category_colors.get(dominant_category, '#667EEA')
-            
-            # Determine primary category and secondary categories
-            categories = []
-            
-            if has_filtered_word:
-                categories.append('Vocabulary Filter')
-                color = '#ED8936'  # Orange for vocabulary filter
-                level = 'Flagged'
-                print(f"  🚩 Vocabulary Filter: \"{sentence_text[:50]}...\"")
-            
-            if extremism_category:
-                categories.append(extremism_category)
-                # If not already colored by vocab filter, use extremism color
-                if not has_filtered_word:
-                    color = extremism_color
-                    level = extremism_level
-                print(f"  ⚠️ Sentence {idx}: {extremism_category} ({extremism_level}, score={highest_score:.1f}) - \"{sentence_text[:50]}...\"")
-            
-            # If no categories, it's just transcription
-            if not categories:
-                categories.append('Transcription')
-                color = '#667EEA'
-                level = 'None'
-            
-            # Primary category is the first one (vocab filter has priority for display)
-            primary_category = categories[0]
-            
-            processed_sentence = {
-                'text': sentence.get('text', ''),
-                'start': sentence.get('start', 0),
-                'end': sentence.get('end', 0),
-                'category': primary_category,
-                'categories': categories,  # All applicable categories
-                'color': color,
-                'level': level
-            }
-            
-            processed_sentences.append(processed_sentence)
-        
-        # Step 6: Calculate overall scores by aggregating sentence scores
-        overall_categorized_scores = {}
-        
-        for dimension in ['violence_advocacy', 'dehumanization', 
-                         'outgroup_homogenization', 'threat_inflation', 'absolutism']:
-            scores = all_dimension_scores[dimension]
-            if scores:
-                # Use max score as overall (most concerning sentence)
-                max_score = max(scores)
-                avg_score = sum(scores) / len(scores)
-                
-                # Overall is max score with slight contribution from average
-                overall_score = max_score + (0.1 * avg_score)
-                overall_score = min(10.0, overall_score)  # Cap at 10
-            else:
-                overall_score = 0.0
-            
-            category_info = categorize_score(overall_score)
-            overall_categorized_scores[dimension] = {
-                'score': overall_score,
-                'level': category_info['level'],
-                'color': category_info['color'],
-                'icon': category_info['icon']
-            }
-            print(f"  📊 Overall {dimension}: {overall_score:.1f} → {category_info['level']}")
-        
-        # Calculate overall extremism (max of all dimensions)
-        all_scores = [overall_categorized_scores[dim]['score'] for dim in overall_categorized_scores]
-        if all_scores:
-            overall_extremism_score = max(all_scores)
+        detector = _detector_for(language)
+        if detector is None:
+            log.info("🌐 Language '%s' is not supported by the analysis; skipping LLM calls", language)
+            batch_results = []
         else:
-            overall_extremism_score = 0.0
-        
-        overall_extremism_info = categorize_score(overall_extremism_score)
-        overall_categorized_scores['overall_extremism'] = {
-            'score': overall_extremism_score,
-            'level': overall_extremism_info['level'],
-            'color': overall_extremism_info['color'],
-            'icon': overall_extremism_info['icon']
-        }
-        print(f"  📊 Overall extremism: {overall_extremism_score:.1f} → {overall_extremism_info['level']}")
-        
-        # Step 7: Save debug JSON
+            with span("detect", mode=analysis_mode, sentences=len(batch_input)):
+                if analysis_mode == "window":
+                    batch_results = await detector._batch_analyze_windowed_async(batch_input)
+                else:
+                    batch_results = await detector._batch_analyze_async(batch_input)
+        log.info("✅ Batch analysis completed for %d sentences", len(batch_results))
+        
+        with span("aggregate"):
+            # Step 5: Join sentences with their analysis and vocabulary-filter hits
+            results_by_id = index_results(batch_results)
+            scores = build_score_matrix(len(sentences), results_by_id)
+            processed_sentences = build_processed_sentences(
+                sentences,
+                results_by_id,
+                scores,
+                flagged_sentence_ids=(entry["sentence_index"] for entry in flagged_words),
+            )
+            
+            # Step 6: Calculate overall scores by aggregating sentence scores
+            overall_categorized_scores = aggregate_overall_scores(scores)
+        for dimension, info in overall_categorized_scores.items():
+            log.debug("  📊 Overall %s: %.1f → %s", dimension, info['score'], info['level'])
+        overall_extremism_info = overall_categorized_scores['overall_extremism']
+        overall_extremism_score = overall_extremism_info['score']
+        
+        # Step 7: Save debug JSON (sampled, written off the event loop)
         debug_data = {
-            'filename': file.filename,
+            'filename': upload.filename,
             'timestamp': datetime.now().isoformat(),
             'summary': {
+                'language': language,
                 'transcription_length': len(transcription_text),
                 'sentences_count': len(sentences),
                 'flagged_sentences_count': len(flagged_words),
@@ -375,21 +369,16 @@ async def process_media(file: UploadFile = File(...)):
             'batch_results': batch_results,
         }
         
-        # Create debug directory
-        debug_dir = os.path.join(os.path.dirname(__file__), 'debug_output')
-        os.makedirs(debug_dir, exist_ok=True)
-        
-        timestamp_str = datetime.now().strftime('%Y%m%d_%H%M%S')
-        debug_filename = f"analysis_{timestamp_str}.json"
-        debug_filepath = os.path.join(debug_dir, debug_filename)
-        
-        with open(debug_filepath, 'w', encoding='utf-8') as f:
-            json.dump(debug_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"💾 Debug JSON saved: {debug_filepath}")
+        debug_filepath = _debug_sink.submit(debug_data)
+        if debug_filepath:
+            log.debug("💾 Debug JSON queued: %s", debug_filepath)
         
         # Step 8: Return response
         response_data = {
+            "media_id": media_id,
+            "asr_profile": asr.name,
+            "language": language,
+            "analysis_skipped": detector is None,
             "transcription": processed_sentences,
             "transcription_text": transcription_text,
             "flagged_words": flagged_words,
@@ -400,67 +389,133 @@ async def process_media(file: UploadFile = File(...)):
             },
         }
         
-        print(f"📤 Response: {len(processed_sentences)} sentences, {len(flagged_words)} flagged sentences")
+        log.info("📤 Response: %d sentences, %d flagged sentences", len(processed_sentences), len(flagged_words))
         
-        return JSONResponse(content=response_data)
+        with span("serialize"):
+            return JSONResponse(content=response_data)
 
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"❌ Processing error: {str(e)}")
-        print(f"📋 Details:\n{error_details}")
+        log.exception("❌ Processing error: %s", e)
         raise HTTPException(status_code=500, detail=f"{type(e).__name__}: {e}")
 
+@app.get("/admin/profiles")
+async def list_profiles(request: Request):
+    """List stored request profiles, newest first (admin)"""
+    _require_admin(request)
+    profiles = await asyncio.to_thread(_profile_store.list)
+    return {"profiles": profiles, "total_profiles": len(profiles)}
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile_export(profile_id: str, request: Request, format: str = "speedscope"):
+    """
+    Download a stored profile (admin). format: "speedscope" (open in speedscope.app),
+    "collapsed" (flamegraph.pl / inferno), "trace" (Perfetto / chrome://tracing, with the
+    asyncio task timeline) or "json" (raw).
+    """
+    _require_admin(request)
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    data = await asyncio.to_thread(_profile_store.load, profile_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired profile_id")
+    if format == "collapsed":
+        return PlainTextResponse(
+            to_collapsed(data),
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'},
+        )
+    exporters = {"speedscope": to_speedscope, "trace": to_chrome_trace, "json": lambda d: d}
+    suffix = {"speedscope": ".speedscope.json", "trace": ".trace.json", "json": ".json"}[format]
+    return JSONResponse(
+        content=exporters[format](data),
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}{suffix}"'},
+    )
+
+@app.post("/redact")
+async def redact_media(request: RedactRequest):
+    """
+    Produce a redacted copy of previously processed media: the given time ranges are
+    beeped or muted, video is stream-copied (no re-encode). The result is streamed back.
+    """
+    if request.mode not in REDACT_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported redaction mode: {request.mode}")
+    src_path = _media_store.path(request.media_id)
+    if src_path is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired media_id; process the file again")
+
+    intervals = merge_intervals(((r.start, r.end) for r in request.ranges), padding_s=max(0.0, request.padding_s))
+    log.info("🔇 Redacting %d intervals (%s) in %s", len(intervals), request.mode, os.path.basename(src_path))
+    try:
+        has_video = await probe_has_video(src_path)
+        # Waits for the first output, so an ffmpeg failure is still an error response
+        output = await start_redaction(src_path, intervals, request.mode, has_video)
+    except Exception as e:
+        log.error("❌ Redaction error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    _, media_type, extension = output_format(src_path, has_video)
+    return StreamingResponse(
+        output,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="redacted_{request.media_id[:12]}{extension}"'},
+    )
+
+# The vocabulary endpoints are plain functions, run in FastAPI's thread pool: the store
+# does SQLite I/O and recompiles the matcher after a change (~1.3 s for 50k terms)
 @app.post("/vocabulary-filter/add")
-async def add_word_to_filter(request: WordRequest):
-    """Add a word to the vocabulary filter"""
+def add_word_to_filter(request: WordRequest, profile: Optional[str] = None):
+    """Add a word to the vocabulary filter (of a profile, if given)"""
     try:
         word = request.word.lower().strip()
         if not word:
             raise HTTPException(status_code=400, detail="Word cannot be empty")
         
-        print(f"➕ Adding word to filter: {word}")
-        _flagger.add_word(word)
+        log.info("➕ Adding word to filter: %s", word)
+        _vocabulary.add([word], profile=profile)
         
         return {
             "success": True,
             "message": f"Word '{word}' added to filter",
-            "total_words": len(_flagger.bad_words)
+            "total_words": len(_vocabulary.flagger(profile).bad_words)
         }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"❌ Error adding word: {str(e)}")
+        log.error("❌ Error adding word: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/vocabulary-filter/remove")
-async def remove_word_from_filter(request: WordRequest):
-    """Remove a word from the vocabulary filter"""
+def remove_word_from_filter(request: WordRequest, profile: Optional[str] = None):
+    """Remove a word from the vocabulary filter (of a profile, if given)"""
     try:
         word = request.word.lower().strip()
         if not word:
             raise HTTPException(status_code=400, detail="Word cannot be empty")
         
-        print(f"➖ Removing word from filter: {word}")
-        _flagger.remove_word(word)
+        log.info("➖ Removing word from filter: %s", word)
+        if not _vocabulary.remove([word], profile=profile):
+            log.warning("⚠️ Word '%s' not found in vocabulary filter", word)
         
         return {
             "success": True,
             "message": f"Word '{word}' removed from filter",
-            "total_words": len(_flagger.bad_words)
+            "total_words": len(_vocabulary.flagger(profile).bad_words)
         }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"❌ Error removing word: {str(e)}")
+        log.error("❌ Error removing word: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/vocabulary-filter/list")
-async def get_filtered_words():
-    """Get the list of all filtered words"""
+def get_filtered_words(profile: Optional[str] = None):
+    """Get the list of all filtered words (of a profile, if given)"""
     try:
-        if _flagger.bad_words is None:
-            print("⚠️ bad_words is None, returning empty list")
-            words = []
-        else:
-            words = sorted(list(_flagger.bad_words))
-        print(f"📋 Retrieved {len(words)} filtered words")
+        words = sorted(_vocabulary.flagger(profile).bad_words)
+        log.debug("📋 Retrieved %d filtered words", len(words))
         
         return {
             "success": True,
@@ -468,7 +523,7 @@ async def get_filtered_words():
             "total_words": len(words)
         }
     except Exception as e:
-        print(f"❌ Error getting filtered words: {str(e)}")
+        log.error("❌ Error getting filtered words: %s", e)
         # Return empty list instead of error
         return {
             "success": False,
@@ -476,6 +531,70 @@ async def get_filtered_words():
             "total_words": 0
         }
 
+@app.post("/vocabulary-filter/import")
+async def import_filter_words(
+    file: UploadFile = File(...),
+    replace: bool = False,
+    profile: Optional[str] = None,
+):
+    """
+    Bulk import a word list: a text file with one entry per line ("#" starts a comment).
+    With replace=true the uploaded list replaces the current one (of the profile, if given).
+    """
+    try:
+        content = (await file.read()).decode("utf-8-sig")
+        words = [line.strip() for line in content.splitlines()]
+        words = [w for w in words if w and not w.startswith("#")]
+        log.info("📥 Importing %d words into filter (replace=%s)", len(words), replace)
+
+        return await asyncio.to_thread(_import_words, words, replace, profile)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Word list must be UTF-8 text")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.error("❌ Error importing words: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _import_words(words: List[str], replace: bool, profile: Optional[str]) -> dict:
+    """Store an imported word list and recompile the matcher (blocking)."""
+    if replace:
+        added = _vocabulary.replace(words, profile=profile)
+    else:
+        added = _vocabulary.add(words, profile=profile)
+    return {
+        "success": True,
+        "imported": added,
+        "total_words": len(_vocabulary.flagger(profile).bad_words),
+        "version": _vocabulary.version(profile)
+    }
+
+@app.get("/vocabulary-filter/export")
+def export_filter_words(profile: Optional[str] = None):
+    """Export the word list as a text file (one entry per line, importable as-is)"""
+    try:
+        words = _vocabulary.words(profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    log.info("📤 Exporting %d filtered words", len(words))
+    return PlainTextResponse(
+        "\n".join(words) + "\n",
+        headers={
+            "Content-Disposition": 'attachment; filename="vocabulary.txt"',
+            "X-Vocabulary-Version": str(_vocabulary.version(profile)),
+        },
+    )
+
+@app.get("/vocabulary-filter/profiles")
+def list_filter_profiles():
+    """List the vocabulary filter profiles (tenants with their own additions/exclusions)"""
+    profiles = _vocabulary.profiles()
+    return {
+        "success": True,
+        "profiles": profiles,
+        "total_profiles": len(profiles)
+    }
+
 if __name__ == "__main__":
     import uvicorn
     print("🚀 Starting server...")
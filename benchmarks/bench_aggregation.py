@@ -0,0 +1,155 @@
+"""
+Benchmark: /process-media/ response assembly on synthetic transcripts.
+
+Compares the previous per-sentence assembly (linear scan of batch_results per sentence
+and re-checking every word against the vocabulary list) with src.backend.aggregation.
+
+Usage:
+    python -m benchmarks.bench_aggregation [--sentences 10000] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.backend.aggregation import (  # noqa: E402
+    DIMENSIONS,
+    CATEGORY_COLORS,
+    CATEGORY_NAMES,
+    categorize_score,
+    assemble,
+)
+from src.backend.bad_word_flagger import WordFlagger  # noqa: E402
+
+_VOCAB = (
+    "the we they people country must will never always all those should go home now "
+    "really think maybe some damn crap hell destroy remove protect family city"
+).split()
+
+
+def make_transcript(n_sentences, seed=0):
+    """Synthetic Whisper sentences plus matching batch results (some errors, some gaps)."""
+    rng = random.Random(seed)
+    sentences, batch_results = [], []
+    t = 0.0
+    for idx in range(n_sentences):
+        words = [rng.choice(_VOCAB) for _ in range(rng.randint(4, 18))]
+        text = " ".join(words).capitalize() + "."
+        dur = 0.3 * len(words)
+        sentences.append({"start": round(t, 2), "end": round(t + dur, 2), "text": text})
+        t += dur + 0.2
+        roll = rng.random()
+        if roll < 0.01:
+            batch_results.append({"error": "timeout", "text_id": idx})
+        elif roll < 0.02:
+            continue  # missing result
+        else:
+            batch_results.append({
+                "text_id": idx,
+                "scores": {dim: {"score": round(rng.random() * 10, 1)} for dim in DIMENSIONS},
+            })
+    rng.shuffle(batch_results)  # results do not have to come back in order
+    return sentences, batch_results
+
+
+def legacy_assemble(sentences, batch_results, flagger):
+    """The pre-aggregation-module implementation (kept here as the baseline)."""
+    processed_sentences = []
+    all_dimension_scores = {dim: [] for dim in DIMENSIONS}
+    for idx, sentence in enumerate(sentences):
+        batch_result = None
+        for result in batch_results:
+            if result.get("text_id") == idx:
+                batch_result = result
+                break
+        if batch_result is None or "error" in batch_result:
+            processed_sentences.append({
+                "text": sentence.get("text", ""), "start": sentence.get("start", 0),
+                "end": sentence.get("end", 0), "category": "Transcription",
+                "color": "#667EEA", "level": "None",
+            })
+            continue
+        sentence_scores = batch_result.get("scores", {})
+        dominant_category, highest_score = None, 0.0
+        for dimension in DIMENSIONS:
+            if dimension in sentence_scores:
+                score = sentence_scores[dimension]["score"]
+                all_dimension_scores[dimension].append(score)
+                if score > highest_score:
+                    highest_score, dominant_category = score, dimension
+        sentence_text = sentence.get("text", "")
+        words_in_sentence = [flagger._normalize_word(word) for word in sentence_text.split()]
+        has_filtered_word = any(word in flagger.bad_words for word in words_in_sentence)
+        categories, color, level = [], "#667EEA", "None"
+        if has_filtered_word:
+            categories.append("Vocabulary Filter")
+            color, level = "#ED8936", "Flagged"
+        if dominant_category and highest_score >= 2.0:
+            categories.append(CATEGORY_NAMES[dominant_category])
+            if not has_filtered_word:
+                color = CATEGORY_COLORS[dominant_category]
+                level = categorize_score(highest_score)["level"]
+        if not categories:
+            categories.append("Transcription")
+        processed_sentences.append({
+            "text": sentence_text, "start": sentence.get("start", 0), "end": sentence.get("end", 0),
+            "category": categories[0], "categories": categories, "color": color, "level": level,
+        })
+    overall = {}
+    for dimension in DIMENSIONS:
+        scores = all_dimension_scores[dimension]
+        overall_score = min(10.0, max(scores) + 0.1 * (sum(scores) / len(scores))) if scores else 0.0
+        overall[dimension] = overall_score
+    return processed_sentences, overall
+
+
+def new_assemble(sentences, batch_results, flagger):
+    flagged = flagger.flag_sentences([s["text"] for s in sentences])
+    return assemble(sentences, batch_results, (entry["sentence_index"] for entry in flagged))
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sentences", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the new path")
+    args = parser.parse_args()
+
+    sentences, batch_results = make_transcript(args.sentences)
+    flagger = WordFlagger()
+
+    new_t, (new_sentences, new_overall) = _best_of(
+        lambda: new_assemble(sentences, batch_results, flagger), args.repeat
+    )
+    print(f"sentences: {args.sentences}")
+    print(f"aggregation module: {new_t * 1000:9.1f} ms")
+
+    if not args.skip_legacy:
+        old_t, (old_sentences, old_overall) = _best_of(
+            lambda: legacy_assemble(sentences, batch_results, flagger), 1
+        )
+        print(f"legacy assembly:    {old_t * 1000:9.1f} ms  ({old_t / new_t:.0f}x slower)")
+        same = old_sentences == new_sentences and all(
+            abs(old_overall[d] - new_overall[d]["score"]) < 1e-9 for d in DIMENSIONS
+        )
+        print(f"outputs identical:  {same}")
+
+
+if __name__ == "__main__":
+    main()
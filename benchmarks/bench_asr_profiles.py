@@ -0,0 +1,143 @@
+"""
+Benchmark: real-time factor and word error rate of each ASR profile (transcriber.profiles).
+
+Every sample of a manifest is transcribed with each profile (transcript cache disabled);
+RTF is decode wall time / audio duration (lower is faster, 0.1 = ten times real time) and
+WER is the word-level edit distance to the reference, after lowercasing and stripping
+punctuation. The first sample is decoded once per profile before timing so model loading
+is not counted. Results are printed as a Markdown table.
+
+The manifest is JSONL, one sample per line; audio paths are relative to the manifest:
+
+    {"audio": "clips/interview_01.mp3", "text": "reference transcript ..."}
+
+Audio is not checked into the repo. Put the clips and their manifest under
+benchmarks/asr_samples/ (the default location) or pass --manifest.
+
+Usage:
+    python -m benchmarks.bench_asr_profiles [--manifest benchmarks/asr_samples/manifest.jsonl]
+        [--profiles fast,balanced,accurate] [--device cpu] [--json report.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import wave
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from transcriber.profiles import PROFILES, get_profile  # noqa: E402
+from transcriber.transcribe import DEFAULT_DEVICE, _extract_wav, _remove_quietly, transcribe_file  # noqa: E402
+
+DEFAULT_MANIFEST = os.path.join(PROJECT_ROOT, "benchmarks", "asr_samples", "manifest.jsonl")
+
+_NON_WORD = re.compile(r"[^\w']+")
+
+
+def normalize_words(text):
+    return [w for w in _NON_WORD.sub(" ", text.lower()).split() if w]
+
+
+def word_errors(reference, hypothesis):
+    """Levenshtein distance between two word lists (substitutions + insertions + deletions)."""
+    prev = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        cur = [i] + [0] * len(hypothesis)
+        for j, hyp_word in enumerate(hypothesis, 1):
+            cur[j] = min(
+                prev[j] + 1,
+                cur[j - 1] + 1,
+                prev[j - 1] + (ref_word != hyp_word),
+            )
+        prev = cur
+    return prev[-1]
+
+
+def load_manifest(path):
+    base = os.path.dirname(os.path.abspath(path))
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                item = json.loads(line)
+                samples.append((os.path.join(base, item["audio"]), item["text"]))
+    return samples
+
+
+def _wav_duration(path):
+    with wave.open(path, "rb") as w:
+        return w.getnframes() / float(w.getframerate())
+
+
+def run_profile(profile, wavs, device):
+    asr = get_profile(profile)
+    # Warm-up: model download/load is not part of the decode time
+    transcribe_file(wavs[0][0], device=device, profile=asr, use_cache=False)
+    audio_s = decode_s = 0.0
+    errors = ref_words = 0
+    for wav_path, duration, reference in wavs:
+        t0 = time.perf_counter()
+        result = transcribe_file(wav_path, device=device, profile=asr, use_cache=False)
+        decode_s += time.perf_counter() - t0
+        audio_s += duration
+        hypothesis = normalize_words(" ".join(s["text"] for s in result["sentences"]))
+        ref = normalize_words(reference)
+        errors += word_errors(ref, hypothesis)
+        ref_words += len(ref)
+    return {
+        "profile": asr.name,
+        "model": asr.model_size,
+        "beam": asr.beam_size,
+        "batch": asr.batch_size,
+        "audio_s": round(audio_s, 1),
+        "decode_s": round(decode_s, 2),
+        "rtf": round(decode_s / audio_s, 3) if audio_s else None,
+        "wer": round(errors / ref_words, 4) if ref_words else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--device", default=DEFAULT_DEVICE)
+    parser.add_argument("--json", help="also write the rows to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.manifest):
+        sys.exit(f"Manifest not found: {args.manifest} (see the module docstring for its format)")
+    samples = load_manifest(args.manifest)
+    if not samples:
+        sys.exit("Manifest has no samples")
+
+    # Decode to 16 kHz mono once, so every profile sees identical input
+    wavs = []
+    try:
+        for audio_path, reference in samples:
+            wav_path = _extract_wav(audio_path)
+            wavs.append((wav_path, _wav_duration(wav_path), reference))
+        print(f"{len(wavs)} samples, {sum(d for _, d, _ in wavs) / 60:.1f} min of audio, device={args.device}\n")
+
+        rows = [run_profile(name.strip(), wavs, args.device) for name in args.profiles.split(",") if name.strip()]
+    finally:
+        for wav_path, _, _ in wavs:
+            _remove_quietly(wav_path)
+
+    print("| profile | model | beam | batch | RTF | WER | decode s |")
+    print("|---|---|---|---|---|---|---|")
+    for r in rows:
+        wer = f"{r['wer'] * 100:.1f}%" if r["wer"] is not None else "-"
+        print(f"| {r['profile']} | {r['model']} | {r['beam']} | {r['batch']} | {r['rtf']} | {wer} | {r['decode_s']} |")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"manifest": args.manifest, "device": args.device, "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: word list memory / serialization, dicts vs transcriber.columnar.
+
+Builds a synthetic Whisper word stream (default 30k words, about a 3-hour podcast) and
+compares a list of {"w","s","e"} dicts with a ColumnarTranscript: resident memory, JSON
+encoding of the dicts, binary round trip of the columnar form, and a time-range slice.
+
+Usage:
+    python -m benchmarks.bench_columnar [--words 30000] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from transcriber.columnar import ColumnarTranscript  # noqa: E402
+from transcriber.sentence_packer import Word  # noqa: E402
+
+_VOCAB = (
+    "the we they people country must will never always all those should go home now "
+    "really think maybe some damn crap hell destroy remove protect family city."
+).split()
+
+
+def make_words(n_words, seed=0):
+    rng = random.Random(seed)
+    t = 0.0
+    for _ in range(n_words):
+        dur = rng.uniform(0.15, 0.5)
+        yield Word(" " + rng.choice(_VOCAB), round(t, 2), round(t + dur, 2))
+        t += dur + (0.9 if rng.random() < 0.03 else 0.05)
+
+
+def _measure(build):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - t0
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size, elapsed
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--words", type=int, default=30000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    words = list(make_words(args.words))
+    dicts, dict_mem, dict_build = _measure(lambda: [w.to_dict() for w in words])
+    columnar, col_mem, col_build = _measure(lambda: ColumnarTranscript.from_words(words))
+
+    json_t = _best_of(lambda: json.dumps(dicts), args.repeat)
+    blob = columnar.to_bytes()
+    to_bytes_t = _best_of(columnar.to_bytes, args.repeat)
+    from_bytes_t = _best_of(lambda: ColumnarTranscript.from_bytes(blob), args.repeat)
+    to_dicts_t = _best_of(columnar.to_dicts, args.repeat)
+    mid = float(columnar.starts[len(columnar) // 2])
+    slice_t = _best_of(lambda: columnar.slice_time(mid, mid + 60.0), args.repeat)
+
+    print(f"words: {args.words}")
+    print(f"{'':24}{'dicts':>12}{'columnar':>12}")
+    print(f"{'memory (MB)':24}{dict_mem / 1e6:12.2f}{col_mem / 1e6:12.2f}")
+    print(f"{'build (ms)':24}{dict_build * 1000:12.1f}{col_build * 1000:12.1f}")
+    print(f"{'serialize (ms)':24}{json_t * 1000:12.1f}{to_bytes_t * 1000:12.1f}   (json.dumps vs to_bytes)")
+    print(f"{'serialized size (KB)':24}{len(json.dumps(dicts)) / 1024:12.1f}{len(blob) / 1024:12.1f}")
+    print(f"columnar from_bytes:    {from_bytes_t * 1000:9.2f} ms")
+    print(f"columnar to_dicts:      {to_dicts_t * 1000:9.2f} ms")
+    print(f"60 s time slice:        {slice_t * 1e6:9.1f} us")
+    print(f"round trip identical:   {ColumnarTranscript.from_bytes(blob).to_dicts() == columnar.to_dicts()}")
+
+
+if __name__ == "__main__":
+    main()
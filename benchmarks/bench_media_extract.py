@@ -0,0 +1,120 @@
+"""
+Benchmark: audio extraction from video containers, previous path vs transcriber.media_probe.
+
+Previous path (per upload): the waveform endpoint ran librosa.load() on the container
+(audioread/ffmpeg fallback for video) and the transcriber ran a second, implicit-stream
+ffmpeg decode to WAV. New path: one ffprobe, then the selected audio stream only, decoded
+by ffmpeg to PCM over a pipe (waveform) and to WAV (ASR); optionally both in parallel
+threads.
+
+Without input files a synthetic H.264 + AAC video is generated with ffmpeg (lavfi test
+source, 1080p) so the video track is realistically heavy.
+
+Usage:
+    python -m benchmarks.bench_media_extract [FILE ...] [--synthesize 600] [--repeat 3]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from transcriber.media_probe import ASR_SAMPLE_RATE, _binary, extract_pcm, extract_wav, probe  # noqa: E402
+
+
+def synthesize(seconds, path):
+    ffmpeg = _binary(os.environ.get("FFMPEG_BIN"), "ffmpeg")
+    subprocess.run(
+        [
+            ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", f"testsrc2=size=1920x1080:rate=30:duration={seconds}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-b:v", "8M",
+            "-c:a", "aac", "-b:a", "128k", "-ac", "2",
+            path,
+        ],
+        check=True,
+    )
+    return path
+
+
+def previous_path(src, wav_path):
+    import librosa
+
+    librosa.load(src, sr=22050, mono=True)
+    ffmpeg = _binary(os.environ.get("FFMPEG_BIN"), "ffmpeg")
+    subprocess.run(
+        [ffmpeg, "-y", "-i", src, "-vn", "-ac", "1", "-ar", "16000", wav_path],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def new_path(src, wav_path):
+    info = probe(src)
+    extract_pcm(src, ASR_SAMPLE_RATE, info=info)
+    extract_wav(src, wav_path, info=info)
+
+
+def new_path_parallel(src, wav_path):
+    info = probe(src)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        pcm = pool.submit(extract_pcm, src, ASR_SAMPLE_RATE, info)
+        wav = pool.submit(extract_wav, src, wav_path, ASR_SAMPLE_RATE, info)
+        pcm.result()
+        wav.result()
+
+
+def _best_of(fn, repeat, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--synthesize", type=float, default=600, help="seconds of synthetic video if no files")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_media_")
+    files = args.files or [synthesize(args.synthesize, os.path.join(tmpdir, "synthetic.mp4"))]
+    wav_path = os.path.join(tmpdir, "out.wav")
+
+    try:
+        import librosa  # noqa: F401
+        has_librosa = True
+    except ImportError:
+        has_librosa = False
+        print("librosa not installed: previous path not measured")
+
+    print("| file | MB | duration s | previous s | new s | new (parallel) s | speedup |")
+    print("|---|---|---|---|---|---|---|")
+    for src in files:
+        info = probe(src)
+        size_mb = os.path.getsize(src) / 1024 / 1024
+        old = _best_of(previous_path, args.repeat, src, wav_path) if has_librosa else None
+        new = _best_of(new_path, args.repeat, src, wav_path)
+        par = _best_of(new_path_parallel, args.repeat, src, wav_path)
+        speedup = f"{old / min(new, par):.1f}x" if old else "-"
+        old_s = f"{old:.2f}" if old else "-"
+        print(f"| {os.path.basename(src)} | {size_mb:.0f} | {info.duration_s or 0:.0f} | {old_s} | "
+              f"{new:.2f} | {par:.2f} | {speedup} |")
+
+    for name in os.listdir(tmpdir):
+        os.remove(os.path.join(tmpdir, name))
+    os.rmdir(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
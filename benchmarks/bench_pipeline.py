@@ -0,0 +1,351 @@
+"""
+Benchmark: the /process-media/ pipeline stage by stage, offline, with a JSON report.
+
+Stages (each run --iterations times on the same synthetic input):
+
+    waveform       ffmpeg decode of the synthetic recording to 16 kHz PCM (media_probe)
+    asr:<profile>  transcribe_file per ASR profile (transcript cache off)
+    pack           sentence packing of a synthetic Whisper word stream
+    flag           vocabulary flagging of that word stream
+    detector       detector fan-out (sentence mode) against the mock OpenAI server
+    detector_window  the same in context-window mode
+    aggregate      score matrix, processed sentences and overall scores
+
+Inputs are generated, not checked in: a speech-like recording (amplitude-modulated noise
+bursts with pauses; Whisper mostly hears silence, so ASR numbers measure decode speed,
+not accuracy) and synthetic word/sentence streams. Stages whose dependencies are missing
+(ffmpeg, faster-whisper models) are reported as skipped.
+
+Every stage runs --warmup discarded iterations first (connection pools, lazy imports and
+caches are cold in the first run) and then reports throughput (items/s at the median run),
+p50/p95/p99 wall time and its own peak RSS: the high-water mark is reset before the stage
+where the OS allows it (Linux), and ``peak_rss_delta_mb`` is that peak minus the RSS the
+stage started with. Elsewhere the delta is only the growth of the process-wide peak, and
+``peak_rss_scope`` says which one was measured. With --baseline, the run fails (exit 1)
+when a stage's p95 is more than --tolerance slower than in the baseline report.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--out report.json] [--baseline old.json]
+        [--audio-s 120] [--words 20000] [--llm-sentences 40] [--profiles fast]
+        [--latency-ms 300] [--rps 0] [--iterations 5] [--warmup 1]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from datetime import datetime
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.bench_aggregation import make_transcript  # noqa: E402
+from benchmarks.bench_columnar import make_words  # noqa: E402
+from benchmarks.mock_openai import MockConfig, MockOpenAIServer  # noqa: E402
+from src.backend.aggregation import (  # noqa: E402
+    aggregate_overall_scores,
+    build_processed_sentences,
+    build_score_matrix,
+    index_results,
+)
+from src.backend.bad_word_flagger import WordFlagger  # noqa: E402
+from transcriber.columnar import ColumnarTranscript  # noqa: E402
+from transcriber.sentence_packer import iter_sentences  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# ----------------------------
+# Measurement
+# ----------------------------
+_PROC_STATUS = "/proc/self/status"
+
+
+def _proc_status_mb(field):
+    """VmRSS / VmHWM from /proc (Linux), or None."""
+    try:
+        with open(_PROC_STATUS, "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Reset the process high-water mark (VmHWM); False where the OS does not allow it."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def rss_mb():
+    return _proc_status_mb("VmRSS")
+
+
+def peak_rss_mb():
+    peak = _proc_status_mb("VmHWM")
+    if peak is not None or resource is None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class StageMemory:
+    """Peak RSS of one stage, relative to the RSS it started with."""
+
+    def __init__(self):
+        self.per_stage = reset_peak_rss()
+        # Without a reset, the process-wide peak so far is the best available baseline
+        self.start = rss_mb() if self.per_stage else peak_rss_mb()
+
+    def report(self):
+        peak = peak_rss_mb()
+        if peak is None or self.start is None:
+            return {"peak_rss_mb": None, "peak_rss_delta_mb": None, "peak_rss_scope": None}
+        return {
+            "peak_rss_mb": round(peak, 1),
+            "peak_rss_delta_mb": round(max(0.0, peak - self.start), 1),
+            "peak_rss_scope": "stage" if self.per_stage else "process",
+        }
+
+
+def summarize(durations, items, memory=None):
+    d = np.asarray(durations, dtype=np.float64)
+    p50, p95, p99 = np.percentile(d, [50, 95, 99])
+    return {
+        "items": items,
+        "runs": len(durations),
+        "throughput_per_s": round(items / p50, 2) if p50 > 0 else None,
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+        **(memory or StageMemory()).report(),
+    }
+
+
+def run_stage(fn, iterations, items, warmup=1, memory=None):
+    """Time ``iterations`` runs of ``fn`` after ``warmup`` discarded ones."""
+    memory = memory or StageMemory()
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - t0)
+    return summarize(durations, items, memory)
+
+
+def skipped(reason):
+    return {"skipped": reason}
+
+
+# ----------------------------
+# Synthetic inputs
+# ----------------------------
+def synth_recording(path, seconds, sample_rate=16000, seed=0):
+    """Speech-like 16-bit WAV: 0.3-3 s syllabic noise bursts separated by short pauses."""
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(int(seconds * sample_rate), dtype=np.float32)
+    pos = 0
+    while pos < len(audio):
+        burst = int(rng.uniform(0.3, 3.0) * sample_rate)
+        t = np.arange(min(burst, len(audio) - pos)) / sample_rate
+        envelope = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3, 6) * t))  # ~syllable rate
+        audio[pos:pos + len(t)] = 0.2 * envelope * rng.standard_normal(len(t))
+        pos += len(t) + int(rng.uniform(0.1, 1.2) * sample_rate)
+    pcm = (np.clip(audio, -1, 1) * 32767).astype("<i2")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    return path
+
+
+# ----------------------------
+# Stages
+# ----------------------------
+def stage_waveform(wav_path, audio_s, iterations, warmup):
+    from transcriber.media_probe import extract_pcm, probe
+    try:
+        info = probe(wav_path)
+    except RuntimeError as e:
+        return skipped(str(e))
+    return run_stage(lambda: extract_pcm(wav_path, info=info), iterations, audio_s, warmup)
+
+
+def stage_asr(wav_path, audio_s, profile, iterations, warmup):
+    memory = StageMemory()  # the model load counts towards the stage's memory
+    try:
+        from transcriber.transcribe import transcribe_file
+        transcribe_file(wav_path, profile=profile, use_cache=False)  # warm-up / model load
+    except Exception as e:  # missing faster-whisper, model download, ffmpeg...
+        return skipped(f"{type(e).__name__}: {e}")
+    result = run_stage(
+        lambda: transcribe_file(wav_path, profile=profile, use_cache=False),
+        iterations, audio_s, max(0, warmup - 1), memory,
+    )
+    result["rtf_p50"] = round(result["p50_ms"] / 1000 / audio_s, 4)
+    return result
+
+
+def stage_detector(n_sentences, mode, iterations, warmup):
+    from src.ai.extremist_batch_two import HierarchicalExtremismDetector
+
+    detector = HierarchicalExtremismDetector()
+    detector._verbose = False
+    sentences, _ = make_transcript(n_sentences, seed=1)
+    batch_input = [{"id": i, "text": s["text"]} for i, s in enumerate(sentences)]
+    run = (
+        detector._batch_analyze_windowed_async if mode == "window" else detector._batch_analyze_async
+    )
+    # One loop for all runs: the async OpenAI client's connection pool is bound to it
+    loop = asyncio.new_event_loop()
+    errors = []
+    try:
+        result = run_stage(
+            lambda: errors.append(sum("error" in r for r in loop.run_until_complete(run(batch_input)))),
+            iterations, n_sentences, warmup,
+        )
+    finally:
+        loop.close()
+    result["failed_items"] = sum(errors[warmup:])
+    return result
+
+
+def stage_aggregate(n_sentences, iterations, warmup):
+    sentences, batch_results = make_transcript(n_sentences)
+
+    def aggregate():
+        results_by_id = index_results(batch_results)
+        scores = build_score_matrix(len(sentences), results_by_id)
+        build_processed_sentences(sentences, results_by_id, scores, flagged_sentence_ids=())
+        aggregate_overall_scores(scores)
+
+    return run_stage(aggregate, iterations, n_sentences, warmup)
+
+
+# ----------------------------
+# Report
+# ----------------------------
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+        ).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(report, baseline, tolerance):
+    """Stages whose p95 grew by more than ``tolerance`` (fraction) against the baseline."""
+    found = []
+    for name, stage in report["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old or "p95_ms" not in old or "p95_ms" not in stage:
+            continue
+        if stage["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            found.append(f"{name}: p95 {old['p95_ms']:.1f} -> {stage['p95_ms']:.1f} ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="previous JSON report to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown (0.2 = 20%%)")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1, help="discarded runs before timing")
+    parser.add_argument("--audio-s", type=float, default=120.0)
+    parser.add_argument("--words", type=int, default=20000)
+    parser.add_argument("--sentences", type=int, default=5000, help="for the aggregate stage")
+    parser.add_argument("--llm-sentences", type=int, default=40)
+    parser.add_argument("--profiles", default="fast", help="ASR profiles, comma-separated ('' = skip ASR)")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="mock LLM latency")
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--rps", type=float, default=0.0, help="mock LLM rate limit (0 = none)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stages = {}
+    tmpdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    wav_path = synth_recording(os.path.join(tmpdir, "synthetic.wav"), args.audio_s)
+    try:
+        stages["waveform"] = stage_waveform(wav_path, args.audio_s, args.iterations, args.warmup)
+        for profile in filter(None, (p.strip() for p in args.profiles.split(","))):
+            stages[f"asr:{profile}"] = stage_asr(
+                wav_path, args.audio_s, profile, args.iterations, args.warmup
+            )
+    finally:
+        os.remove(wav_path)
+        os.rmdir(tmpdir)
+
+    words = list(make_words(args.words))
+    stages["pack"] = run_stage(
+        lambda: list(iter_sentences(words)), args.iterations, args.words, args.warmup
+    )
+    transcript = ColumnarTranscript.from_words(words)
+    sentences = [s.to_dict() for s in iter_sentences(transcript)]
+    flagger = WordFlagger()
+    stages["flag"] = run_stage(
+        lambda: flagger.flag_word_stream(transcript, sentences), args.iterations, args.words,
+        args.warmup,
+    )
+
+    config = MockConfig(args.latency_ms, args.jitter, args.rps, args.error_rate)
+    with MockOpenAIServer(config) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("API_KEY", "mock")
+        stages["detector"] = stage_detector(args.llm_sentences, "sentence", args.iterations, args.warmup)
+        stages["detector_window"] = stage_detector(args.llm_sentences, "window", args.iterations, args.warmup)
+    stages["aggregate"] = stage_aggregate(args.sentences, args.iterations, args.warmup)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "stages": stages,
+        "mock_llm": config.stats,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
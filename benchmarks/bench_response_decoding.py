@@ -0,0 +1,209 @@
+"""
+Benchmark: LLM response decoding, previous _parse_json_response vs src.ai.response_decoding.
+
+Input is a corpus of raw responses, one JSON line per response ({"stage": ..., "content":
+...}) as recorded by running the detector with LLM_RESPONSE_CORPUS=corpus.jsonl. Without
+--corpus a synthetic corpus is generated: well-formed stage responses (mock server
+content with English evidence text, apostrophes included) plus a share of the defects seen
+in production: markdown fences, trailing commas, prose around the object, raw newlines in
+strings and truncation at max_completion_tokens.
+
+Reported per decoder: mean / p99 time per response, how many responses decoded to nothing
+(the detector's fallback) and, for the synthetic corpus, how many came back with exactly
+the intended content or, if truncated, with part of it.
+
+Usage:
+    python -m benchmarks.bench_response_decoding [--corpus corpus.jsonl] [--responses 5000]
+        [--defect-rate 0.1] [--repeat 3]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.mock_openai import fake_content  # noqa: E402
+from src.ai.response_decoding import STAGE_SCHEMAS, decode_response, parse_json  # noqa: E402
+
+_EVIDENCE = [
+    "they don't belong here and they're coming for what's ours",
+    "it's a war and we can't lose it",
+    "the people's patience is running out",
+    "I didn't say that, but he's right about [GROUP_A]",
+]
+
+
+# ----------------------------
+# Previous implementation (prints go to an in-memory sink, so only their cost is measured)
+# ----------------------------
+def legacy_parse(response, out):
+    original_response = response
+    if "```json" in response:
+        json_start = response.find("```json") + 7
+        json_end = response.find("```", json_start)
+        response = response[json_start:json_end].strip() if json_end != -1 else response[json_start:].strip()
+    elif "```" in response:
+        json_start = response.find("```") + 3
+        json_end = response.find("```", json_start)
+        response = response[json_start:json_end].strip() if json_end != -1 else response[json_start:].strip()
+    response = re.sub(r',(\s*[}\]])', r'\1', response)
+    try:
+        return json.loads(response)
+    except json.JSONDecodeError as e:
+        print("\n" + "=" * 80, file=out, flush=True)
+        print(f"JSON Decode Error: {e}", file=out, flush=True)
+        print(f"Error at character {e.pos}", file=out, flush=True)
+        print(f"Full response length: {len(original_response)} characters", file=out, flush=True)
+        print("\n--- Full Response ---", file=out, flush=True)
+        print(original_response, file=out, flush=True)
+        print("\n--- Extracted JSON (if different) ---", file=out, flush=True)
+        if response != original_response:
+            print(response, file=out, flush=True)
+        print("\n--- Context around error ---", file=out, flush=True)
+        start, end = max(0, e.pos - 100), min(len(response), e.pos + 100)
+        print(f"...{response[start:end]}...", file=out, flush=True)
+        print("=" * 80 + "\n", file=out, flush=True)
+        repair_strategies = [
+            lambda r: ' '.join(r.split()),
+            lambda r: r.replace("'", '"'),
+            lambda r: re.sub(r',(\s*[}\]])', r'\1', r),
+            lambda r: re.sub(r'(\w+):', r'"\1":', r),
+            lambda r: re.search(r'\{.*\}', r, re.DOTALL).group(0) if re.search(r'\{.*\}', r, re.DOTALL) else r,
+        ]
+        for i, strategy in enumerate(repair_strategies, 1):
+            try:
+                cleaned = strategy(response)
+                print(f"Attempting repair strategy {i}...", file=out, flush=True)
+                result = json.loads(cleaned)
+                print(f"Success with repair strategy {i}!", file=out, flush=True)
+                return result
+            except (json.JSONDecodeError, AttributeError, TypeError) as e_repair:
+                print(f"Strategy {i} failed: {e_repair}", file=out, flush=True)
+        print("All repair strategies failed. Returning default structure.", file=out, flush=True)
+        return {}
+
+
+# ----------------------------
+# Synthetic corpus
+# ----------------------------
+def _stage_object(stage, rng):
+    content = fake_content(f"{stage} {rng.random()}")
+    evidence = rng.choice(_EVIDENCE)
+    for dim in ("dehumanization", "violence_advocacy", "absolutism", "threat_inflation", "outgroup_homogenization"):
+        content[dim]["evidence"] = evidence
+    content["targets"] = [{"group": "[GROUP_A]", "category": "other", "evidence_phrases": [evidence]}]
+    content["dehumanization_instances"] = [{"term": "vermin", "type": "animal", "context": evidence, "target": "[GROUP_A]"}]
+    return content
+
+
+def _defect(obj, rng):
+    """(defective text, kind, intended object) for a stage object."""
+    kind = rng.choice(["fence", "trailing_comma", "prose", "newline", "truncated"])
+    text = json.dumps(obj, ensure_ascii=False)
+    if kind == "fence":
+        return f"```json\n{text}\n```", kind, obj
+    if kind == "trailing_comma":
+        return text[:-1] + ",\n}", kind, obj
+    if kind == "prose":
+        return f"Here is the analysis you asked for:\n{text}\nLet me know if you need more.", kind, obj
+    if kind == "newline":
+        # A raw line break inside a string value (invalid JSON)
+        obj = json.loads(text)
+        obj["targets"][0]["evidence_phrases"][0] += "\nand more"
+        return json.dumps(obj, ensure_ascii=False).replace("\\n", "\n"), kind, obj
+    return text[: rng.randint(len(text) // 3, len(text) - 2)], kind, obj
+
+
+def synthetic_corpus(n, defect_rate, seed=0):
+    rng = random.Random(seed)
+    stages = list(STAGE_SCHEMAS)
+    corpus = []
+    for _ in range(n):
+        stage = rng.choice(stages)
+        obj = _stage_object(stage, rng)
+        text, kind = json.dumps(obj, ensure_ascii=False, indent=2 if rng.random() < 0.2 else None), "clean"
+        if rng.random() < defect_rate:
+            text, kind, obj = _defect(obj, rng)
+        corpus.append({"stage": stage, "content": text, "kind": kind, "intended": obj})
+    return corpus
+
+
+def load_corpus(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [dict(json.loads(line), kind="recorded", intended=None) for line in f if line.strip()]
+
+
+# ----------------------------
+# Measurement
+# ----------------------------
+def run(name, decode, corpus, repeat):
+    """
+    Time ``decode`` over the corpus. With intended objects known, "exact" counts results
+    equal to decoding the clean response, "partial" truncated responses that kept some
+    fields (all of them real), "empty" responses that produced nothing.
+    """
+    best_times, results = None, None
+    for _ in range(repeat):
+        times, out = [], []
+        for item in corpus:
+            t0 = time.perf_counter()
+            out.append(decode(item))
+            times.append(time.perf_counter() - t0)
+        if best_times is None or sum(times) < sum(best_times):
+            best_times, results = times, out
+    t = np.asarray(best_times) * 1e6
+    exact = partial = empty = 0
+    for item, result in zip(corpus, results):
+        if not result or result == decode({"stage": item["stage"], "content": "{}"}):
+            empty += 1
+            continue
+        if item["intended"] is None:
+            continue
+        reference = decode({"stage": item["stage"], "content": json.dumps(item["intended"])})
+        if result == reference:
+            exact += 1
+        elif item["kind"] == "truncated" and set(result) <= set(reference):
+            partial += 1
+    return {"decoder": name, "mean_us": t.mean(), "p99_us": np.percentile(t, 99),
+            "exact": exact, "partial": partial, "empty": empty}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="recorded responses (JSONL with stage/content)")
+    parser.add_argument("--responses", type=int, default=5000)
+    parser.add_argument("--defect-rate", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.responses, args.defect_rate)
+    kinds = {}
+    for item in corpus:
+        kinds[item["kind"]] = kinds.get(item["kind"], 0) + 1
+    print(f"{len(corpus)} responses: " + ", ".join(f"{k} {v}" for k, v in sorted(kinds.items())))
+
+    sink = io.StringIO()
+    rows = [
+        run("previous (_parse_json_response)", lambda item: legacy_parse(item["content"], sink), corpus, args.repeat),
+        run("parse_json (no schema)", lambda item: parse_json(item["content"])[0] or {}, corpus, args.repeat),
+        run("decode_response (schema)", lambda item: decode_response(item["content"], item["stage"]), corpus, args.repeat),
+    ]
+    print(f"previous decoder wrote {len(sink.getvalue()) / 1024:.0f} KiB of diagnostics per pass")
+    print("| decoder | mean µs | p99 µs | exact | partial (truncated) | empty |")
+    print("|---|---|---|---|---|---|")
+    for r in rows:
+        print(f"| {r['decoder']} | {r['mean_us']:.1f} | {r['p99_us']:.1f} | {r['exact']} | {r['partial']} | {r['empty']} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Local stand-in for the OpenAI chat completions API (offline benchmarks and load tests).
+
+Serves ``POST /v1/chat/completions`` with a deterministic JSON object that satisfies every
+detector stage (stage-3 scores, per-sentence ``sentence_scores`` for context windows,
+targets, psycholinguistic and classification fields), plus realistic costs:
+
+- latency: a base delay plus log-normal jitter per request;
+- rate limit: a token bucket in requests/s; excess requests get HTTP 429 with Retry-After
+  (the openai client retries them like the real API);
+- errors: a fraction of requests fail with HTTP 500.
+
+It also implements the parts of the Files and Batch APIs that src/ai/batch_api.py uses
+(``POST /v1/files``, ``GET /v1/files/{id}/content``, ``POST /v1/batches``, ``GET
+/v1/batches/{id}``). A batch completes --batch-s seconds after it is created, without
+touching the rate limit; the error rate applies per request (failures go to the error file).
+
+The openai SDK honours OPENAI_BASE_URL, so pointing the detector at the stand-in needs no
+code change:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 API_KEY=mock uvicorn backend.main:app
+
+Usage:
+    python -m benchmarks.mock_openai [--port 8089] [--latency-ms 400] [--jitter 0.3]
+        [--rps 0] [--error-rate 0] [--batch-s 2]
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TAG_LIST = re.compile(r"mapping EACH of these tags to its own \w+ \(0-10\): ([S\d, ]+)")
+
+
+class MockConfig:
+    """Latency / rate-limit / error behaviour of the stand-in."""
+
+    def __init__(self, latency_ms=400.0, jitter=0.3, rps=0.0, error_rate=0.0, seed=0, batch_s=2.0):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.rps = rps
+        self.error_rate = error_rate
+        self.batch_s = batch_s
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = rps
+        self._last = time.monotonic()
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0, "batches": 0, "batch_requests": 0}
+
+    def delay_s(self):
+        with self._lock:
+            factor = self._rng.lognormvariate(0.0, self.jitter) if self.jitter else 1.0
+        return self.latency_ms * factor / 1000.0
+
+    def admit(self):
+        """Token bucket; False if this request is over the rate limit."""
+        with self._lock:
+            self.stats["requests"] += 1
+            if not self.rps:
+                return True
+            now = time.monotonic()
+            self._tokens = min(self.rps, self._tokens + (now - self._last) * self.rps)
+            self._last = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            self.stats["rate_limited"] += 1
+            return False
+
+    def fails(self):
+        with self._lock:
+            failed = self.error_rate and self._rng.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+            return failed
+
+
+def fake_content(prompt):
+    """Deterministic JSON answer for a detector prompt (scores derived from a prompt hash)."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    score = lambda i: round(digest[i] / 255 * 6, 1)  # noqa: E731 - mostly low/moderate scores
+    tags = []
+    m = _TAG_LIST.search(prompt)
+    if m:
+        tags = [t.strip() for t in m.group(1).split(",") if t.strip()]
+    return {
+        "dehumanization_score": score(0),
+        "violence_advocacy_score": score(1),
+        "threat_score": score(2),
+        "homogenization_score": score(3),
+        "instances": [],
+        "sentence_scores": {tag: score(4 + i % 20) for i, tag in enumerate(tags)},
+        "targets": [],
+        "attribution_distance": score(5),
+        "us_them_ratio": score(6),
+        "certainty_score": score(7),
+        "imperative_count": digest[8] % 3,
+        "absolutist_terms": [],
+        "absolutist_score": score(9),
+        "verb_adjective_ratio": 1.0,
+        "dehumanization": {"score": score(0), "evidence": "", "explanation": "mock"},
+        "violence_advocacy": {"score": score(1), "evidence": "", "explanation": "mock"},
+        "absolutism": {"score": score(9), "evidence": "", "explanation": "mock"},
+        "threat_inflation": {"score": score(2), "evidence": "", "explanation": "mock"},
+        "outgroup_homogenization": {"score": score(3), "evidence": "", "explanation": "mock"},
+    }
+
+
+def _completion(request):
+    """Chat completion response body for a request body."""
+    prompt = "".join(m.get("content") or "" for m in request.get("messages", []))
+    content = json.dumps(fake_content(prompt))
+    prompt_tokens = max(1, len(prompt) // 4)
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class _BatchStore:
+    """Uploaded files and batches of the Files / Batch API stand-in."""
+
+    def __init__(self, config):
+        self.config = config
+        self.files = {}
+        self.batches = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add_file(self, filename, purpose, data):
+        with self._lock:
+            file_id = f"file-mock{next(self._ids)}"
+            self.files[file_id] = {
+                "object": "file", "id": file_id, "bytes": len(data), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed", "_data": data,
+            }
+            return self.files[file_id]
+
+    def create_batch(self, request):
+        source = self.files.get(request.get("input_file_id"))
+        if source is None:
+            return None
+        with self._lock:
+            batch_id = f"batch_mock{next(self._ids)}"
+            batch = self.batches[batch_id] = {
+                "object": "batch", "id": batch_id, "endpoint": request.get("endpoint"),
+                "input_file_id": source["id"], "completion_window": request.get("completion_window"),
+                "status": "in_progress", "created_at": int(time.time()), "metadata": request.get("metadata"),
+                "output_file_id": None, "error_file_id": None,
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            }
+            self.config.stats["batches"] += 1
+        timer = threading.Timer(self.config.batch_s, self._complete, (batch, source["_data"]))
+        timer.daemon = True
+        timer.start()
+        return batch
+
+    def _complete(self, batch, data):
+        outputs, errors = [], []
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            entry = {"id": f"batch_req_{len(outputs) + len(errors)}", "custom_id": request["custom_id"], "error": None}
+            if self.config.fails():
+                entry["response"] = {"status_code": 500, "body": {"error": {"message": "mock failure", "type": "server_error"}}}
+                errors.append(entry)
+            else:
+                entry["response"] = {"status_code": 200, "body": _completion(request["body"])}
+                outputs.append(entry)
+        self.config.stats["batch_requests"] += len(outputs) + len(errors)
+        jsonl = lambda entries: "".join(json.dumps(e) + "\n" for e in entries).encode("utf-8")  # noqa: E731
+        output = self.add_file("batch_output.jsonl", "batch_output", jsonl(outputs)) if outputs else None
+        error = self.add_file("batch_errors.jsonl", "batch_output", jsonl(errors)) if errors else None
+        batch.update(
+            status="completed", completed_at=int(time.time()),
+            output_file_id=output and output["id"], error_file_id=error and error["id"],
+            request_counts={"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)},
+        )
+
+
+def _public(obj):
+    return {k: v for k, v in obj.items() if not k.startswith("_")}
+
+
+def _handler(config):
+    store = _BatchStore(config)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, headers=(), content_type="application/json"):
+            data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client gave up (timeout, or a hedged call that lost the race)
+
+        def _upload(self, body):
+            # multipart/form-data with "purpose" and "file" fields
+            message = BytesParser(policy=HTTP).parsebytes(
+                b"Content-Type: " + self.headers["Content-Type"].encode("latin-1") + b"\r\n\r\n" + body
+            )
+            fields = {
+                part.get_param("name", header="content-disposition"): part
+                for part in message.iter_parts()
+            }
+            if "file" not in fields:
+                self._send(400, {"error": {"message": "missing file"}})
+                return
+            purpose = fields["purpose"].get_payload(decode=True).decode() if "purpose" in fields else "batch"
+            entry = store.add_file(fields["file"].get_filename(), purpose, fields["file"].get_payload(decode=True))
+            self._send(200, _public(entry))
+
+        def do_GET(self):
+            parts = self.path.split("?")[0].strip("/").split("/")
+            if parts[-3:-2] == ["files"] and parts[-1] == "content" and parts[-2] in store.files:
+                self._send(200, store.files[parts[-2]]["_data"], content_type="application/jsonl")
+            elif parts[-2:-1] == ["files"] and parts[-1] in store.files:
+                self._send(200, _public(store.files[parts[-1]]))
+            elif parts[-2:-1] == ["batches"] and parts[-1] in store.batches:
+                self._send(200, store.batches[parts[-1]])
+            else:
+                self._send(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length)
+            path = self.path.split("?")[0].rstrip("/")
+            if path.endswith("/files"):
+                self._upload(body)
+                return
+            if path.endswith("/batches"):
+                batch = store.create_batch(json.loads(body or b"{}"))
+                if batch is None:
+                    self._send(404, {"error": {"message": "input file not found"}})
+                else:
+                    self._send(200, batch)
+                return
+            if not path.endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+            request = json.loads(body or b"{}")
+            if not config.admit():
+                self._send(429, {"error": {"message": "rate limited", "type": "rate_limit"}},
+                           [("Retry-After", "1")])
+                return
+            time.sleep(config.delay_s())
+            if config.fails():
+                self._send(500, {"error": {"message": "mock failure", "type": "server_error"}})
+                return
+            self._send(200, _completion(request))
+
+    return Handler
+
+
+class MockOpenAIServer:
+    """Threaded server; use as a context manager to run it in the background."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        self._server = ThreadingHTTPServer((host, port), _handler(self.config))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--jitter", type=float, default=0.3, help="log-normal sigma of the latency factor")
+    parser.add_argument("--rps", type=float, default=0.0, help="rate limit in requests/s (0 = none)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--batch-s", type=float, default=2.0, help="seconds until a batch completes")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(
+        MockConfig(args.latency_ms, args.jitter, args.rps, args.error_rate, batch_s=args.batch_s), args.host, args.port
+    )
+    print(f"Mock OpenAI API on {server.base_url} (latency {args.latency_ms:.0f} ms, "
+          f"rps {args.rps or math.inf}, errors {args.error_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
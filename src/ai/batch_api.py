@@ -0,0 +1,382 @@
+"""
+Deferred extremism analysis through an OpenAI-compatible Batch API.
+
+The online pipeline (``_batch_analyze_async``) sends every stage call as its own chat
+completion: full price, and under the interactive rate limits. Offline backlogs do not need
+that latency, so here the same pipeline runs deferred: the requests of a stage are collected
+for the whole corpus, written as JSONL, submitted as batches and polled, and the pipeline
+resumes with the next stage once they are done:
+
+    wave stage1      stage1_llm (only with the LLM Stage 1 engine)
+    wave stage2_3_5  stage2_psycho (LLM Stage 2 engine) or stage2_attribution (local engine),
+                     the four stage3_* calls, stage5_targets
+    wave stage4      stage4_classification
+
+Prompts, request parameters and decoding are the detector's own, so the results have the
+shape of ``_batch_analyze_async`` (sentence mode). Failed requests are resubmitted in a
+follow-up batch (LLM_BATCH_RETRIES); a sentence still missing a response gets an
+``{"error", "text_id"}`` entry, as online.
+
+Everything is kept in a work directory per corpus (``<work_dir>/<corpus hash>/``): request
+files, state.json with the batch ids and the downloaded outputs. An interrupted run picks up
+its submitted batches instead of paying for them again.
+
+Configuration (environment):
+    LLM_BATCH_MAX_REQUESTS   requests per batch (default 50000, the OpenAI limit)
+    LLM_BATCH_MAX_MB         size of a batch input file (default 190; the limit is 200)
+    LLM_BATCH_POLL_S         seconds between status polls (default 30)
+    LLM_BATCH_WINDOW         completion window (default 24h)
+    LLM_BATCH_RETRIES        follow-up batches for failed requests (default 1)
+
+Batches go to the client's endpoint (OPENAI_BASE_URL); benchmarks/mock_openai.py implements
+the Files and Batch APIs for local runs.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.ai.psycholinguistic_features import compute_psycholinguistic_features
+from src.backend.observability import get_logger, record_tokens, span
+
+__all__ = ["BatchAPIAnalyzer", "BATCH_ENDPOINT"]
+
+logger = get_logger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+DEFAULT_MAX_REQUESTS = int(os.environ.get("LLM_BATCH_MAX_REQUESTS", "50000"))
+DEFAULT_MAX_BYTES = int(float(os.environ.get("LLM_BATCH_MAX_MB", "190")) * 1024 * 1024)
+DEFAULT_POLL_S = float(os.environ.get("LLM_BATCH_POLL_S", "30"))
+DEFAULT_WINDOW = os.environ.get("LLM_BATCH_WINDOW", "24h")
+DEFAULT_RETRIES = int(os.environ.get("LLM_BATCH_RETRIES", "1"))
+
+# Uploads and downloads of batch files take longer than a chat completion
+_TRANSFER_TIMEOUT_S = 600.0
+
+_TERMINAL = frozenset({"completed", "failed", "expired", "cancelled"})
+
+# (feature key, stage, prompt builder) of the Stage 3 detections
+_STAGE3 = (
+    ("dehumanization", "stage3_dehumanization", "_dehumanization_prompt"),
+    ("violence", "stage3_violence", "_violence_prompt"),
+    ("threat", "stage3_threat", "_threat_prompt"),
+    ("homogenization", "stage3_homogenization", "_homogenization_prompt"),
+)
+
+
+def _index(custom_id: str) -> int:
+    return int(custom_id.rpartition(":")[2])
+
+
+class BatchAPIAnalyzer:
+    """
+    Runs a detector's sentence pipeline stage by stage, corpus-wide, through the Batch API.
+    """
+
+    def __init__(
+        self,
+        detector: Any,
+        work_dir: str,
+        client: Any = None,
+        max_requests: int = DEFAULT_MAX_REQUESTS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        poll_s: float = DEFAULT_POLL_S,
+        completion_window: str = DEFAULT_WINDOW,
+        retries: int = DEFAULT_RETRIES,
+    ):
+        """
+        Args:
+            detector: HierarchicalExtremismDetector whose prompts and engines are used.
+            work_dir: Directory for request files, batch state and outputs.
+            client: Synchronous OpenAI client (default: the detector's).
+            max_requests: Requests per batch.
+            max_bytes: Size limit of a batch input file.
+            poll_s: Seconds between batch status polls.
+            completion_window: Completion window requested for each batch.
+            retries: Follow-up batches for requests that failed.
+        """
+        self.detector = detector
+        self.work_dir = work_dir
+        self.client = client or detector.client
+        self.max_requests = max(1, max_requests)
+        self.max_bytes = max_bytes
+        self.poll_s = poll_s
+        self.completion_window = completion_window
+        self.retries = max(0, retries)
+        self._dir: Optional[str] = None
+        self._state: Dict[str, Any] = {}
+
+    # ----------------------------
+    # Pipeline
+    # ----------------------------
+    def analyze(self, normalized_texts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Analyze a corpus; blocks until every wave has completed (hours, with a 24h window).
+
+        Args:
+            normalized_texts: ``[{"id": ..., "text": ...}]`` with unique ids, as for
+                ``_batch_analyze_async``.
+
+        Returns:
+            One result per input, in order, shaped like ``_batch_analyze_async``.
+        """
+        detector = self.detector
+        texts = [item["text"] for item in normalized_texts]
+        self._open(normalized_texts)
+        logger.info("🧾 Batch API analysis of %d sentences in %s", len(texts), self._dir)
+        errors: Dict[int, str] = {}
+
+        # STAGE 1: locally for the whole corpus, or one wave
+        if detector._stage1 is not None:
+            elements = detector._stage1.extract_batch(texts)
+        else:
+            contents = self._wave(
+                "stage1", {f"stage1_llm:{i}": detector._linguistic_prompt(t) for i, t in enumerate(texts)}, errors
+            )
+            elements = [
+                detector._parse_json_response(contents[f"stage1_llm:{i}"], "stage1_llm") if i not in errors else None
+                for i in range(len(texts))
+            ]
+
+        # STAGE 1b + local STAGE 2
+        live = [i for i in range(len(texts)) if i not in errors]
+        anonymized = {i: detector.anonymize_groups(texts[i], elements[i]) for i in live}
+        psycho: Dict[int, Dict[str, Any]] = {}
+        if detector.stage2_engine == "local" and live:
+            psycho = dict(zip(live, compute_psycholinguistic_features(
+                [texts[i] for i in live], [elements[i] for i in live]
+            )))
+
+        # STAGES 2, 3 and 5: one wave
+        stage2 = "stage2_attribution" if detector.stage2_engine == "local" else "stage2_psycho"
+        prompts = {}
+        for i in live:
+            anonymized_text = anonymized[i][0]
+            if stage2 == "stage2_attribution":
+                prompts[f"{stage2}:{i}"] = detector._attribution_prompt(anonymized_text)
+            else:
+                prompts[f"{stage2}:{i}"] = detector._psycho_prompt(anonymized_text, elements[i])
+            for _, stage, builder in _STAGE3:
+                prompts[f"{stage}:{i}"] = getattr(detector, builder)(anonymized_text)
+            prompts[f"stage5_targets:{i}"] = detector._targets_prompt(texts[i], elements[i])
+        contents = self._wave("stage2_3_5", prompts, errors)
+
+        features: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        for i in live:
+            if i in errors:
+                continue
+            parse = lambda stage: detector._parse_json_response(contents[f"{stage}:{i}"], stage)  # noqa: E731
+            all_features = {
+                "linguistic_elements": elements[i],
+                "psycholinguistic": detector._stage2_features(psycho.get(i), contents[f"{stage2}:{i}"], stage2),
+            }
+            for key, stage, _ in _STAGE3:
+                all_features[key] = parse(stage)
+            features[i] = (all_features, parse("stage5_targets"))
+
+        # STAGE 4: one wave
+        contents = self._wave(
+            "stage4",
+            {f"stage4_classification:{i}": detector._classification_prompt(f[0]) for i, f in features.items()},
+            errors,
+        )
+
+        results = []
+        for i, item in enumerate(normalized_texts):
+            if i in errors:
+                logger.warning("Error processing text %s: %s", item["id"], errors[i])
+                results.append({"error": errors[i], "text_id": item["id"]})
+                continue
+            all_features, targets = features[i]
+            result = detector._finalize(
+                contents[f"stage4_classification:{i}"], targets, all_features, anonymized[i][1]
+            )
+            result["text_id"] = item["id"]
+            results.append(result)
+        return results
+
+    def _wave(self, name: str, prompts: Dict[str, str], errors: Dict[int, str]) -> Dict[str, str]:
+        """
+        Run one wave: submit, wait, resubmit failures.
+
+        Args:
+            name: Wave name (state key and file prefix).
+            prompts: Prompt per custom_id (``<stage>:<sentence index>``).
+            errors: Error per sentence index; sentences with a failed request are added.
+
+        Returns:
+            Response content per successful custom_id.
+        """
+        if not prompts:
+            return {}
+        requests = {cid: self.detector._chat_request(prompt) for cid, prompt in prompts.items()}
+        wave = self._state["waves"].setdefault(name, {"batches": []})
+        contents: Dict[str, str] = {}
+        failures: Dict[str, str] = {}
+        with span(f"llm_batch.{name}"):
+            for attempt in range(self.retries + 1):
+                batches = [entry for entry in wave["batches"] if entry["attempt"] == attempt]
+                if not batches:
+                    pending = {cid: body for cid, body in requests.items() if cid not in contents}
+                    if attempt:
+                        logger.info("🔁 Resubmitting %d failed %s requests", len(pending), name)
+                    batches = self._prepare(name, attempt, pending)
+                failed: Dict[str, str] = {}
+                for entry in self._wait(name, batches):
+                    done, errored = self._collect(entry)
+                    contents.update(done)
+                    failed.update(errored)
+                failures = {
+                    cid: failed.get(cid, "no response in the batch output")
+                    for cid in requests if cid not in contents
+                }
+                if not failures:
+                    break
+        for cid, message in failures.items():
+            errors.setdefault(_index(cid), f"{cid.partition(':')[0]}: {message}")
+        logger.info("✅ Wave %s: %d/%d requests succeeded", name, len(contents), len(requests))
+        return contents
+
+    # ----------------------------
+    # Batches
+    # ----------------------------
+    def _prepare(self, name: str, attempt: int, requests: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write the request files of an attempt and record them before anything is submitted."""
+        entries: List[Dict[str, Any]] = []
+        lines: List[bytes] = []
+        size = 0
+
+        def flush() -> None:
+            path = os.path.join(self._dir, f"{name}-{attempt}-{len(entries)}.jsonl")
+            with open(path, "wb") as f:
+                f.writelines(lines)
+            entries.append({"id": None, "attempt": attempt, "input": os.path.basename(path), "requests": len(lines)})
+
+        for cid, body in requests.items():
+            line = (json.dumps(
+                {"custom_id": cid, "method": "POST", "url": BATCH_ENDPOINT, "body": body}, ensure_ascii=False
+            ) + "\n").encode("utf-8")
+            if lines and (len(lines) >= self.max_requests or size + len(line) > self.max_bytes):
+                flush()
+                lines, size = [], 0
+            lines.append(line)
+            size += len(line)
+        if lines:
+            flush()
+        self._state["waves"][name]["batches"].extend(entries)
+        self._save()
+        return entries
+
+    def _submit(self, name: str, entry: Dict[str, Any]) -> None:
+        with open(os.path.join(self._dir, entry["input"]), "rb") as f:
+            upload = self.client.files.create(file=f, purpose="batch", timeout=_TRANSFER_TIMEOUT_S)
+        batch = self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+            metadata={"wave": name, "corpus": self._state["corpus"][:16]},
+        )
+        entry.update(id=batch.id, input_file_id=upload.id, status=batch.status)
+        self._save()
+        logger.info("📤 Submitted %s batch %s (%d requests)", name, batch.id, entry["requests"])
+
+    def _wait(self, name: str, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Submit what is not submitted yet and poll until every batch is finished and downloaded."""
+        for entry in entries:
+            if entry["id"] is None:
+                self._submit(name, entry)
+        pending = [entry for entry in entries if not entry.get("collected")]
+        while pending:
+            for entry in pending:
+                batch = self.client.batches.retrieve(entry["id"])
+                if batch.status in _TERMINAL:
+                    self._download(entry, batch)
+                elif batch.status != entry.get("status"):
+                    entry["status"] = batch.status
+                    self._save()
+            pending = [entry for entry in pending if not entry.get("collected")]
+            if pending:
+                logger.info("⏳ %s: %d batch(es) in progress", name, len(pending))
+                time.sleep(self.poll_s)
+        return entries
+
+    def _download(self, entry: Dict[str, Any], batch: Any) -> None:
+        for kind, file_id in (("output", batch.output_file_id), ("errors", batch.error_file_id)):
+            if file_id:
+                content = self.client.files.content(file_id, timeout=_TRANSFER_TIMEOUT_S)
+                with open(os.path.join(self._dir, f"{entry['id']}.{kind}.jsonl"), "wb") as f:
+                    f.write(content.content)
+        errors = getattr(getattr(batch, "errors", None), "data", None) or []
+        if errors:
+            entry["error"] = "; ".join(error.message or error.code or "" for error in errors)
+        counts = batch.request_counts
+        entry.update(status=batch.status, collected=True)
+        self._save()
+        logger.info(
+            "📥 Batch %s %s: %s completed, %s failed", entry["id"], batch.status,
+            counts.completed if counts else "?", counts.failed if counts else "?",
+        )
+
+    def _collect(self, entry: Dict[str, Any]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """(content per custom_id, error per custom_id) of a downloaded batch."""
+        contents: Dict[str, str] = {}
+        failed: Dict[str, str] = {}
+        for kind in ("output", "errors"):
+            path = os.path.join(self._dir, f"{entry['id']}.{kind}.jsonl")
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    cid = record["custom_id"]
+                    response = record.get("response") or {}
+                    body = response.get("body") or {}
+                    if response.get("status_code") == 200:
+                        record_tokens(cid.partition(":")[0], body.get("usage"))
+                        choices = body.get("choices") or [{}]
+                        content = (choices[0].get("message") or {}).get("content")
+                        if content:
+                            contents[cid] = content
+                        else:
+                            failed[cid] = "LLM returned empty response"
+                    else:
+                        error = record.get("error") or body.get("error") or {}
+                        failed[cid] = error.get("message") or f"HTTP {response.get('status_code')}"
+        # Requests the batch never got to (failed validation, expired, cancelled)
+        reason = entry.get("error") or f"batch {entry.get('status')}"
+        with open(os.path.join(self._dir, entry["input"]), "r", encoding="utf-8") as f:
+            for line in f:
+                cid = json.loads(line)["custom_id"]
+                if cid not in contents and cid not in failed:
+                    failed[cid] = reason
+        return contents, failed
+
+    # ----------------------------
+    # Work directory
+    # ----------------------------
+    def _open(self, normalized_texts: List[Dict[str, Any]]) -> None:
+        digest = hashlib.sha256(json.dumps({
+            "engines": [self.detector.stage1_engine, self.detector.stage2_engine],
+            "texts": [[str(item["id"]), item["text"]] for item in normalized_texts],
+        }, ensure_ascii=False).encode("utf-8")).hexdigest()
+        self._dir = os.path.join(self.work_dir, digest[:16])
+        os.makedirs(self._dir, exist_ok=True)
+        state_path = os.path.join(self._dir, "state.json")
+        if os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                self._state = json.load(f)
+            logger.info("♻️ Resuming Batch API work in %s", self._dir)
+        else:
+            self._state = {"corpus": digest, "sentences": len(normalized_texts), "created_at": time.time(), "waves": {}}
+            self._save()
+
+    def _save(self) -> None:
+        path = os.path.join(self._dir, "state.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(path + ".tmp", path)
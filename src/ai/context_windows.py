@@ -0,0 +1,126 @@
+"""
+Sliding context windows over transcript sentences.
+
+Instead of analyzing every sentence in isolation, consecutive sentences are packed into
+windows under a token budget: each window has a run of *target* sentences (scored) plus a
+few neighbouring *context* sentences on either side (only used to resolve references such
+as "they"). Every sentence is a target in exactly one window, so the number of LLM calls
+scales with the number of windows rather than the number of sentences.
+"""
+
+import os
+from typing import Dict, List, Sequence
+
+__all__ = [
+    "ContextWindow",
+    "build_context_windows",
+    "estimate_tokens",
+    "sentence_tag",
+    "DEFAULT_WINDOW_TOKENS",
+    "DEFAULT_CONTEXT_SENTENCES",
+]
+
+DEFAULT_WINDOW_TOKENS = int(os.environ.get("CONTEXT_WINDOW_TOKENS", "400"))
+DEFAULT_CONTEXT_SENTENCES = int(os.environ.get("CONTEXT_SENTENCES", "2"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def sentence_tag(sentence_id) -> str:
+    """Tag used to label a sentence inside a window prompt, e.g. "S12"."""
+    return f"S{sentence_id}"
+
+
+class ContextWindow:
+    """A run of target sentences with surrounding context sentences."""
+
+    __slots__ = ("window_id", "before", "targets", "after")
+
+    def __init__(self, window_id: int, before: List[dict], targets: List[dict], after: List[dict]):
+        self.window_id = window_id
+        self.before = before
+        self.targets = targets
+        self.after = after
+
+    @property
+    def target_ids(self) -> List:
+        return [item["id"] for item in self.targets]
+
+    @property
+    def text(self) -> str:
+        """Plain text of the whole window (context and targets)."""
+        return " ".join(item["text"] for item in self.before + self.targets + self.after)
+
+    def render(self) -> str:
+        """
+        Render the window for a prompt: one sentence per line, prefixed by its tag.
+        Context-only lines are marked so the model does not score them.
+        """
+        lines = []
+        for item in self.before:
+            lines.append(f"[{sentence_tag(item['id'])}] (context) {item['text']}")
+        for item in self.targets:
+            lines.append(f"[{sentence_tag(item['id'])}] {item['text']}")
+        for item in self.after:
+            lines.append(f"[{sentence_tag(item['id'])}] (context) {item['text']}")
+        return "\n".join(lines)
+
+
+def _fit(items: List[dict], costs: Dict[int, int], budget: int, keep_last: bool) -> List[dict]:
+    """Drop sentences farthest from the targets until the context fits ``budget``."""
+    items = list(items)
+    while items and sum(costs[id(item)] for item in items) > budget:
+        if keep_last:
+            items.pop(0)
+        else:
+            items.pop()
+    return items
+
+
+def build_context_windows(
+    items: Sequence[dict],
+    token_budget: int = DEFAULT_WINDOW_TOKENS,
+    context_sentences: int = DEFAULT_CONTEXT_SENTENCES,
+) -> List[ContextWindow]:
+    """
+    Greedily pack sentences into context windows.
+
+    Args:
+        items: Sentences in transcript order, as ``{"id": ..., "text": ...}`` dicts.
+        token_budget: Maximum estimated tokens per window (context included). A single
+            sentence longer than the budget still gets its own window.
+        context_sentences: Number of neighbouring sentences to include on each side.
+
+    Returns:
+        Windows in order; every input sentence is a target of exactly one window.
+    """
+    items = list(items)
+    costs = {id(item): estimate_tokens(item["text"]) for item in items}
+    windows: List[ContextWindow] = []
+    n = len(items)
+    i = 0
+    while i < n:
+        # Leading context: at most half the budget
+        before = _fit(items[max(0, i - context_sentences):i], costs, token_budget // 2, keep_last=True)
+        used = sum(costs[id(item)] for item in before)
+
+        targets: List[dict] = []
+        j = i
+        while j < n:
+            cost = costs[id(items[j])]
+            # Keep room for trailing context, but never more than a quarter of the budget
+            after_cost = sum(costs[id(item)] for item in items[j + 1:j + 1 + context_sentences])
+            reserve = min(after_cost, token_budget // 4)
+            if targets and used + cost + reserve > token_budget:
+                break
+            targets.append(items[j])
+            used += cost
+            j += 1
+
+        after = _fit(items[j:j + context_sentences], costs, max(0, token_budget - used), keep_last=False)
+        windows.append(ContextWindow(len(windows), before, targets, after))
+        i = j
+    return windows
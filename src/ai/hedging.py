@@ -0,0 +1,234 @@
+"""
+Hedged LLM calls: per-stage latency tracking and duplicate requests for slow calls.
+
+A sentence in ``_analyze_async`` waits for the slowest of its parallel stage calls, so one
+slow provider response (common at p99) stalls it, and a job with hundreds of sentences
+almost always hits one. With hedging on, a call that is still running after its stage's
+observed p90 gets a duplicate; whichever returns first wins and the other is cancelled.
+
+Duplicates cost tokens, so they are limited by a budget: each call earns LLM_HEDGE_BUDGET
+hedges (0.05 = at most 5% extra calls), and a hedge is only sent when a whole one has been
+earned. A stage is not hedged until LLM_HEDGE_MIN_SAMPLES calls have been observed.
+
+Configuration (environment):
+    LLM_HEDGE                 1 to enable hedging (latencies are tracked either way)
+    LLM_HEDGE_QUANTILE        latency quantile after which to hedge (default 0.9)
+    LLM_HEDGE_BUDGET          extra calls per call (default 0.05)
+    LLM_HEDGE_MIN_SAMPLES     observations per stage before hedging (default 20)
+    LLM_HEDGE_MIN_DELAY_MS    never hedge earlier than this (default 200)
+
+Hedges are counted in ``llm_hedges_total{stage,outcome}`` (sent, won, over_budget). The
+losing call of a hedged pair is cancelled: its latency is recorded as the time it ran
+until then (a lower bound, so the quantiles do not drift towards the winners), and its
+result is never seen, so callers count its cost with ``on_discarded`` (the detector
+counts the winner's token usage again: same prompt, estimated completion).
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from src.backend.observability import get_logger, record_hedge
+
+__all__ = ["LatencyTracker", "Hedger", "HEDGE_ENABLED"]
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+HEDGE_ENABLED = os.environ.get("LLM_HEDGE", "0").lower() in ("1", "true", "yes", "on")
+DEFAULT_QUANTILE = float(os.environ.get("LLM_HEDGE_QUANTILE", "0.9"))
+DEFAULT_BUDGET = float(os.environ.get("LLM_HEDGE_BUDGET", "0.05"))
+DEFAULT_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20"))
+DEFAULT_MIN_DELAY_S = float(os.environ.get("LLM_HEDGE_MIN_DELAY_MS", "200")) / 1000
+
+# Unused budget is capped so an idle period cannot fund a burst of hedges
+_MAX_CREDIT = 10.0
+
+
+class LatencyTracker:
+    """
+    Sliding window of call latencies per stage with cached quantiles.
+
+    Quantiles are recomputed (one sort of the window) every ``refresh`` observations, not
+    on every lookup.
+    """
+
+    def __init__(self, window: int = 512, refresh: int = 16):
+        """
+        Args:
+            window: Latencies kept per stage (most recent).
+            refresh: Observations between quantile recomputations.
+        """
+        self.window = window
+        self.refresh = refresh
+        self._samples: Dict[str, Deque[float]] = {}
+        self._sorted: Dict[str, list] = {}
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._pending[stage] = self._pending.get(stage, 0) + 1
+
+    def count(self, stage: str) -> int:
+        samples = self._samples.get(stage)
+        return len(samples) if samples is not None else 0
+
+    def quantile(self, stage: str, q: float) -> Optional[float]:
+        """
+        Args:
+            stage: Stage name.
+            q: Quantile in [0, 1].
+
+        Returns:
+            The latency quantile in seconds (nearest rank), None without observations.
+        """
+        with self._lock:
+            samples = self._samples.get(stage)
+            if not samples:
+                return None
+            ordered = self._sorted.get(stage)
+            if ordered is None or self._pending.get(stage, 0) >= self.refresh:
+                ordered = self._sorted[stage] = sorted(samples)
+                self._pending[stage] = 0
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """count / p50 / p90 / p99 (seconds) per stage, for diagnostics."""
+        return {
+            stage: {
+                "count": self.count(stage),
+                "p50": self.quantile(stage, 0.5),
+                "p90": self.quantile(stage, 0.9),
+                "p99": self.quantile(stage, 0.99),
+            }
+            for stage in list(self._samples)
+        }
+
+
+class Hedger:
+    """
+    Runs LLM calls with latency tracking and, if enabled, budgeted hedging.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = HEDGE_ENABLED,
+        quantile: float = DEFAULT_QUANTILE,
+        budget: float = DEFAULT_BUDGET,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        min_delay_s: float = DEFAULT_MIN_DELAY_S,
+        tracker: Optional[LatencyTracker] = None,
+    ):
+        """
+        Args:
+            enabled: Send hedges (otherwise latencies are only tracked).
+            quantile: Hedge a call still running after this latency quantile of its stage.
+            budget: Hedges earned per call (the extra-cost budget).
+            min_samples: Observations of a stage before it is hedged.
+            min_delay_s: Lower bound for the hedge delay.
+            tracker: Latency tracker (default: a new one).
+        """
+        self.enabled = enabled
+        self.quantile = quantile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay_s = min_delay_s
+        self.tracker = tracker or LatencyTracker()
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def hedge_delay(self, stage: str) -> Optional[float]:
+        """Seconds after which a call of ``stage`` is hedged, None if it is not (yet)."""
+        if not self.enabled or self.tracker.count(stage) < self.min_samples:
+            return None
+        return max(self.min_delay_s, self.tracker.quantile(stage, self.quantile))
+
+    def _earn(self) -> None:
+        with self._lock:
+            self._credit = min(_MAX_CREDIT, self._credit + self.budget)
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._credit < 1.0:
+                return False
+            self._credit -= 1.0
+            return True
+
+    async def _timed(self, stage: str, call: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            # A cancelled loser took at least this long
+            self.tracker.observe(stage, time.perf_counter() - start)
+            raise
+        self.tracker.observe(stage, time.perf_counter() - start)
+        return result
+
+    async def call(
+        self,
+        stage: str,
+        call: Callable[[], Awaitable[T]],
+        on_discarded: Optional[Callable[[T], None]] = None,
+    ) -> T:
+        """
+        Await ``call()``, hedging it with a second ``call()`` if it is slow.
+
+        Args:
+            stage: Stage name (latencies and hedge delays are per stage).
+            call: Starts the request; called once, or twice when hedged.
+            on_discarded: Called with the winning result when the other call of a hedged
+                pair was sent and its result discarded (e.g. to count its estimated cost).
+
+        Returns:
+            The result of whichever call finished first successfully.
+
+        Raises:
+            Exception: The primary call's error if every attempt failed.
+        """
+        self._earn()
+        delay = self.hedge_delay(stage)
+        if delay is None:
+            return await self._timed(stage, call)
+
+        primary = asyncio.ensure_future(self._timed(stage, call))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done:
+            return primary.result()
+        if not self._spend():
+            record_hedge(stage, "over_budget")
+            return await primary
+
+        record_hedge(stage, "sent")
+        hedge = asyncio.ensure_future(self._timed(stage, call))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            record_hedge(stage, "won")
+                        result = task.result()
+                        if on_discarded is not None:
+                            on_discarded(result)
+                        return result
+            # Both failed: report the primary's error, as without hedging
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,300 @@
+"""
+Local Stage 1 (preprocessing) engine.
+
+Produces the same ``linguistic_elements`` structure the Stage 1 LLM prompt asks for
+(pronouns, verbs, adjectives, adverbs, modals, entities, group_references) using a
+spaCy tagger plus a group-reference gazetteer, so Stage 1 no longer needs an LLM
+round trip. When spaCy (or its English model) is not installed, a lexicon-based
+fallback tagger is used so the pipeline keeps working; it is much weaker (no parser or
+NER), so a warning is logged when it takes over. The model is pinned in
+backend/requirements.txt, or install it with ``python -m spacy download en_core_web_sm``.
+"""
+
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+from src.backend.observability import get_logger
+
+__all__ = [
+    "LocalLinguisticExtractor",
+    "get_default_extractor",
+    "PRONOUN_TYPES",
+    "STRONG_MODALS",
+    "WEAK_MODALS",
+    "GROUP_NOUNS",
+]
+
+logger = get_logger(__name__)
+
+# ----------------------------
+# Lexicons
+# ----------------------------
+PRONOUN_TYPES: Dict[str, str] = {
+    "i": "first-person-singular", "me": "first-person-singular", "my": "first-person-singular",
+    "mine": "first-person-singular", "myself": "first-person-singular",
+    "we": "first-person-plural", "us": "first-person-plural", "our": "first-person-plural",
+    "ours": "first-person-plural", "ourselves": "first-person-plural",
+    "you": "second-person", "your": "second-person", "yours": "second-person",
+    "yourself": "second-person", "yourselves": "second-person",
+    "he": "third-person-singular", "him": "third-person-singular", "his": "third-person-singular",
+    "himself": "third-person-singular", "she": "third-person-singular", "her": "third-person-singular",
+    "hers": "third-person-singular", "herself": "third-person-singular", "it": "third-person-singular",
+    "its": "third-person-singular", "itself": "third-person-singular",
+    "they": "third-person-plural", "them": "third-person-plural", "their": "third-person-plural",
+    "theirs": "third-person-plural", "themselves": "third-person-plural",
+}
+
+STRONG_MODALS = frozenset({"must", "will", "shall", "cannot", "can't", "won't", "mustn't", "shan't"})
+WEAK_MODALS = frozenset({"might", "could", "may", "should", "would", "can", "ought"})
+
+# Nouns that denote groups of people. A noun phrase headed by one of these (or by a
+# NORP entity) is reported as a group reference.
+GROUP_NOUNS = frozenset({
+    "people", "persons", "folks", "immigrants", "migrants", "refugees", "foreigners",
+    "aliens", "invaders", "outsiders", "elites", "globalists", "liberals", "conservatives",
+    "leftists", "rightists", "communists", "socialists", "fascists", "nazis", "feminists",
+    "muslims", "christians", "jews", "hindus", "sikhs", "buddhists", "atheists", "catholics",
+    "protestants", "islamists", "zionists", "blacks", "whites", "asians", "africans", "arabs",
+    "latinos", "hispanics", "mexicans", "gypsies", "roma", "gays", "lesbians", "homosexuals",
+    "transgenders", "women", "men", "girls", "boys", "minorities", "natives", "tribes",
+    "clans", "gangs", "thugs", "criminals", "terrorists", "extremists", "radicals",
+    "politicians", "police", "cops", "soldiers", "enemies", "traitors", "infidels",
+    "unbelievers", "heretics", "nationalists", "patriots", "citizens", "voters",
+})
+
+_GROUP_DETERMINERS = ("those", "these", "all", "all the", "all of the", "such", "the")
+
+# Fallback-only lexicons (used when spaCy is unavailable).
+_FALLBACK_ADVERBS = frozenset({
+    "always", "never", "often", "sometimes", "very", "too", "quite", "rather", "just",
+    "already", "soon", "now", "then", "here", "there", "again", "still", "almost", "perhaps",
+    "maybe", "not", "really", "even", "only", "ever", "forever",
+})
+_FALLBACK_ADJ_SUFFIXES = ("ous", "ful", "ive", "less", "able", "ible", "ic", "ish", "al")
+_FALLBACK_ADJECTIVES = frozenset({
+    "bad", "good", "evil", "dangerous", "dirty", "filthy", "stupid", "weak", "strong", "true",
+    "real", "pure", "great", "big", "small", "old", "new", "violent", "sick", "wrong", "right",
+})
+_FALLBACK_VERB_SUFFIXES = ("ed", "ing", "ize", "ise", "ate", "ify")
+_FALLBACK_VERBS = frozenset({
+    "kill", "destroy", "eliminate", "remove", "attack", "fight", "hate", "want", "take", "get",
+    "go", "make", "stop", "send", "throw", "burn", "hurt", "harm", "deport", "expel", "purge",
+    "exterminate", "eradicate", "annihilate", "murder", "beat", "shoot", "hang", "rise", "wake",
+    "are", "is", "was", "were", "be", "have", "has", "had", "do", "does", "did", "say", "said",
+})
+_FALLBACK_NORP = frozenset({
+    "muslims", "christians", "jews", "hindus", "sikhs", "buddhists", "catholics", "protestants",
+    "arabs", "africans", "asians", "mexicans", "americans", "europeans", "russians", "chinese",
+    "democrats", "republicans", "communists", "socialists", "nazis", "islamists", "zionists",
+})
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+(?:['’][A-Za-z]+)*")
+
+# spaCy labels that the Stage 1 schema cares about.
+_ENTITY_LABELS = frozenset({"NORP", "ORG", "GPE", "PERSON", "LOC", "FAC", "EVENT"})
+
+DEFAULT_SPACY_MODEL = os.environ.get("STAGE1_SPACY_MODEL", "en_core_web_sm")
+DEFAULT_BATCH_SIZE = int(os.environ.get("STAGE1_BATCH_SIZE", "64"))
+
+
+def _empty_elements() -> Dict[str, list]:
+    return {
+        "pronouns": [],
+        "verbs": [],
+        "adjectives": [],
+        "adverbs": [],
+        "modals": [],
+        "entities": [],
+        "group_references": [],
+    }
+
+
+def _modal_strength(word: str) -> str:
+    return "strong" if word.replace("’", "'") in STRONG_MODALS else "weak"
+
+
+def _with_negation(tok) -> str:
+    """
+    Modal token text joined with an attached negation: spaCy splits "can't" into
+    "ca" + "n't", "won't" into "wo" + "n't" and "cannot" into "can" + "not".
+    """
+    if not tok.whitespace_ and tok.i + 1 < len(tok.doc):
+        following = tok.doc[tok.i + 1]
+        if following.lower_.replace("’", "'") in ("n't", "not"):
+            return tok.text + following.text
+    return tok.text
+
+
+def _append_unique(items: List[str], value: str) -> None:
+    if value and value not in items:
+        items.append(value)
+
+
+class LocalLinguisticExtractor:
+    """
+    Deterministic Stage 1 extractor returning the ``linguistic_elements`` schema.
+
+    The spaCy pipeline is loaded lazily on first use and shared across calls; only the
+    tagger, parser and NER components are kept enabled.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_SPACY_MODEL, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        :param model_name: spaCy model package to load (e.g. "en_core_web_sm").
+        :param batch_size: Number of texts per ``nlp.pipe`` batch.
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._nlp = None
+        self._nlp_loaded = False
+
+    @property
+    def backend(self) -> str:
+        """Name of the tagging backend in use ("spacy" or "lexicon")."""
+        return "spacy" if self._load_nlp() is not None else "lexicon"
+
+    def _load_nlp(self):
+        if not self._nlp_loaded:
+            self._nlp_loaded = True
+            try:
+                import spacy
+                self._nlp = spacy.load(self.model_name, disable=["lemmatizer", "textcat"])
+            except (ImportError, OSError) as e:
+                # spaCy or the model package is missing: use the lexicon fallback
+                logger.warning(
+                    "⚠️ spaCy model %s unavailable (%s); Stage 1 uses the lexicon fallback tagger. "
+                    "Install it with: python -m spacy download %s",
+                    self.model_name, e, self.model_name,
+                )
+                self._nlp = None
+        return self._nlp
+
+    def extract(self, text: str) -> Dict[str, list]:
+        """
+        Extract linguistic elements from a single text.
+
+        :param text: The text to analyze.
+        :return: Dict in the Stage 1 ``linguistic_elements`` schema.
+        """
+        return self.extract_batch([text])[0]
+
+    def extract_batch(self, texts: Iterable[str]) -> List[Dict[str, list]]:
+        """
+        Extract linguistic elements for many texts at once (uses ``nlp.pipe`` batching).
+
+        :param texts: Texts to analyze.
+        :return: One ``linguistic_elements`` dict per input text, in input order.
+        """
+        texts = [t or "" for t in texts]
+        nlp = self._load_nlp()
+        if nlp is None:
+            return [self._extract_lexicon(t) for t in texts]
+        return [self._from_doc(doc) for doc in nlp.pipe(texts, batch_size=self.batch_size)]
+
+    # ----------------------------
+    # spaCy backend
+    # ----------------------------
+    def _from_doc(self, doc) -> Dict[str, list]:
+        out = _empty_elements()
+
+        for tok in doc:
+            lower = tok.lower_
+            if tok.pos_ == "PRON" or lower in PRONOUN_TYPES:
+                ptype = PRONOUN_TYPES.get(lower)
+                if ptype:
+                    out["pronouns"].append({"word": tok.text, "type": ptype, "position": tok.i})
+            if tok.tag_ == "MD" or lower in STRONG_MODALS or lower in WEAK_MODALS:
+                if tok.tag_ == "MD" or tok.pos_ == "AUX":
+                    word = _with_negation(tok)
+                    out["modals"].append({"word": word, "strength": _modal_strength(word.lower())})
+                    continue
+            if tok.pos_ == "VERB":
+                out["verbs"].append({"word": tok.text, "form": self._verb_form(tok), "position": tok.i})
+            elif tok.pos_ == "ADJ":
+                _append_unique(out["adjectives"], tok.text)
+            elif tok.pos_ == "ADV":
+                _append_unique(out["adverbs"], tok.text)
+
+        for ent in doc.ents:
+            if ent.label_ in _ENTITY_LABELS:
+                out["entities"].append({"text": ent.text, "type": ent.label_})
+                if ent.label_ == "NORP":
+                    _append_unique(out["group_references"], ent.text)
+
+        for chunk in doc.noun_chunks:
+            if chunk.root.lower_ in GROUP_NOUNS:
+                _append_unique(out["group_references"], chunk.text)
+
+        return out
+
+    @staticmethod
+    def _verb_form(tok) -> str:
+        tag = tok.tag_
+        if tag == "VB":
+            # Sentence-initial base form without an explicit subject reads as a command
+            has_subject = any(child.dep_ in ("nsubj", "nsubjpass") for child in tok.children)
+            if not has_subject and (tok.i == tok.sent.start or tok.dep_ == "ROOT"):
+                return "imperative"
+            return "base"
+        if tag in ("VBD", "VBN"):
+            return "past"
+        return "present"
+
+    # ----------------------------
+    # Lexicon fallback backend
+    # ----------------------------
+    def _extract_lexicon(self, text: str) -> Dict[str, list]:
+        out = _empty_elements()
+        tokens = _TOKEN_RE.findall(text)
+        lowered = [t.lower() for t in tokens]
+
+        for pos, (tok, lower) in enumerate(zip(tokens, lowered)):
+            ptype = PRONOUN_TYPES.get(lower)
+            if ptype:
+                out["pronouns"].append({"word": tok, "type": ptype, "position": pos})
+            elif lower in STRONG_MODALS or lower in WEAK_MODALS:
+                out["modals"].append({"word": tok, "strength": _modal_strength(lower)})
+            elif lower in _FALLBACK_ADVERBS or (lower.endswith("ly") and len(lower) > 4):
+                _append_unique(out["adverbs"], tok)
+            elif lower in _FALLBACK_ADJECTIVES or (
+                len(lower) > 5 and lower.endswith(_FALLBACK_ADJ_SUFFIXES)
+            ):
+                _append_unique(out["adjectives"], tok)
+            elif lower in _FALLBACK_VERBS or (len(lower) > 4 and lower.endswith(_FALLBACK_VERB_SUFFIXES)):
+                if lower.endswith("ed"):
+                    form = "past"
+                elif pos == 0:
+                    form = "imperative"
+                else:
+                    form = "present" if lower.endswith(("ing", "s")) else "base"
+                out["verbs"].append({"word": tok, "form": form, "position": pos})
+
+            if lower in _FALLBACK_NORP and tok[:1].isupper():
+                out["entities"].append({"text": tok, "type": "NORP"})
+
+        # Group references: determiner + group noun ("those people"), or bare group nouns
+        for pos, lower in enumerate(lowered):
+            if lower not in GROUP_NOUNS:
+                continue
+            phrase = tokens[pos]
+            for det in _GROUP_DETERMINERS:
+                det_tokens = det.split()
+                start = pos - len(det_tokens)
+                if start >= 0 and lowered[start:pos] == det_tokens:
+                    phrase = " ".join(tokens[start:pos + 1])
+                    break
+            _append_unique(out["group_references"], phrase)
+
+        return out
+
+
+_default_extractor: Optional[LocalLinguisticExtractor] = None
+
+
+def get_default_extractor() -> LocalLinguisticExtractor:
+    """Process-wide shared extractor (the spaCy model is loaded once)."""
+    global _default_extractor
+    if _default_extractor is None:
+        _default_extractor = LocalLinguisticExtractor()
+    return _default_extractor
@@ -0,0 +1,285 @@
+"""
+Shared OpenAI clients on one tuned, metered HTTP connection pool.
+
+Every detector used to build its own ``OpenAI`` / ``AsyncOpenAI`` client, so each had a
+private pool with default limits and a large fan-out queued behind it. All detectors now
+share one sync client per process and one async client per event loop (an httpx async pool
+cannot be used from another loop). Synchronous code that starts its own loop runs it with
+``run_sync``, which closes that loop's client before the loop ends. Both clients are
+configured from the environment:
+
+    LLM_MAX_CONNECTIONS      connections per pool (default 200)
+    LLM_MAX_KEEPALIVE        idle connections kept open (default: LLM_MAX_CONNECTIONS)
+    LLM_KEEPALIVE_EXPIRY     seconds an idle connection is kept (default 30)
+    LLM_HTTP2                auto (default: on if the h2 package is installed), 1 or 0
+    LLM_CONNECT_TIMEOUT      seconds (default 5)
+    LLM_READ_TIMEOUT         seconds (default 120)
+    LLM_WRITE_TIMEOUT        seconds (default 30)
+    LLM_POOL_TIMEOUT         seconds a request may wait for a connection (default 300)
+    LLM_MAX_RETRIES          retries of the OpenAI SDK (default 2)
+
+With HTTP/2 the requests of a fan-out are multiplexed over a few connections instead of
+one connection each. The transports report how long requests wait for a connection and
+how many connections are busy (``llm_pool_*`` metrics in src/backend/observability.py); a
+non-zero wait means the pool, not the provider, is limiting throughput.
+"""
+
+import asyncio
+import importlib
+import os
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from src.backend.observability import get_logger, record_pool_state, record_pool_wait, record_pool_waiting
+
+# The transport must come from the SDK's own HTTP library (httpx, or httpx2 in newer releases)
+httpx = importlib.import_module(DefaultAsyncHttpxClient.__mro__[1].__module__.partition(".")[0])
+
+__all__ = [
+    "get_client",
+    "get_async_client",
+    "aclose_async_client",
+    "run_sync",
+    "transport_settings",
+]
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "200"))
+DEFAULT_MAX_KEEPALIVE = int(os.environ.get("LLM_MAX_KEEPALIVE", str(DEFAULT_MAX_CONNECTIONS)))
+DEFAULT_KEEPALIVE_EXPIRY = float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "30"))
+DEFAULT_HTTP2 = os.environ.get("LLM_HTTP2", "auto").lower()
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", "5"))
+DEFAULT_READ_TIMEOUT = float(os.environ.get("LLM_READ_TIMEOUT", "120"))
+DEFAULT_WRITE_TIMEOUT = float(os.environ.get("LLM_WRITE_TIMEOUT", "30"))
+DEFAULT_POOL_TIMEOUT = float(os.environ.get("LLM_POOL_TIMEOUT", "300"))
+DEFAULT_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+
+_lock = threading.Lock()
+_client: Optional[OpenAI] = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+_http2: Optional[bool] = None
+
+
+def _http2_enabled() -> bool:
+    global _http2
+    if _http2 is None:
+        if DEFAULT_HTTP2 in ("0", "false", "no", "off"):
+            _http2 = False
+        else:
+            try:
+                import h2  # noqa: F401
+                _http2 = True
+            except ImportError:
+                if DEFAULT_HTTP2 != "auto":
+                    logger.warning("⚠️ LLM_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+                _http2 = False
+    return _http2
+
+
+def transport_settings() -> Dict[str, Any]:
+    """The effective pool settings (for logs and diagnostics)."""
+    return {
+        "max_connections": DEFAULT_MAX_CONNECTIONS,
+        "max_keepalive_connections": DEFAULT_MAX_KEEPALIVE,
+        "keepalive_expiry": DEFAULT_KEEPALIVE_EXPIRY,
+        "http2": _http2_enabled(),
+        "timeout": {
+            "connect": DEFAULT_CONNECT_TIMEOUT,
+            "read": DEFAULT_READ_TIMEOUT,
+            "write": DEFAULT_WRITE_TIMEOUT,
+            "pool": DEFAULT_POOL_TIMEOUT,
+        },
+        "max_retries": DEFAULT_MAX_RETRIES,
+    }
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections=DEFAULT_MAX_KEEPALIVE,
+        keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=DEFAULT_CONNECT_TIMEOUT,
+        read=DEFAULT_READ_TIMEOUT,
+        write=DEFAULT_WRITE_TIMEOUT,
+        pool=DEFAULT_POOL_TIMEOUT,
+    )
+
+
+# ----------------------------
+# Metered transports
+# ----------------------------
+class _PoolMeter:
+    """
+    Connection wait accounting. httpcore emits its first trace event (TCP connect, or
+    sending headers on a reused connection) once the request holds a connection, so the
+    time until then is the pool wait.
+    """
+
+    def _init_meter(self, label: str) -> None:
+        self._label = label
+        record_pool_state(label, 0, 0, DEFAULT_MAX_CONNECTIONS)
+
+    def _publish(self) -> None:
+        # httpx keeps the httpcore pool private; skip the snapshot if that ever changes
+        pool = getattr(self, "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None:
+            return
+        idle = sum(1 for connection in connections if connection.is_idle())
+        record_pool_state(self._label, len(connections) - idle, idle)
+
+    def _start(self, request: httpx.Request) -> Dict[str, Any]:
+        # A retried request arrives with our hook from the previous attempt; chain to the original
+        previous = request.extensions.get("trace")
+        state = {"start": time.perf_counter(), "waiting": True, "parent": getattr(previous, "_parent", previous)}
+        record_pool_waiting(self._label, 1)
+        return state
+
+    def _acquired(self, state: Dict[str, Any]) -> None:
+        if state["waiting"]:
+            state["waiting"] = False
+            record_pool_waiting(self._label, -1)
+            record_pool_wait(self._label, time.perf_counter() - state["start"])
+            self._publish()
+
+    def _finish(self, state: Dict[str, Any]) -> None:
+        # Failed before getting a connection (e.g. PoolTimeout): the wait still counts
+        self._acquired(state)
+        self._publish()
+
+
+class _MeteredTransport(_PoolMeter, httpx.HTTPTransport):
+    def __init__(self, label: str, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._init_meter(label)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        state = self._start(request)
+
+        def trace(name: str, info: Dict[str, Any]) -> None:
+            self._acquired(state)
+            if state["parent"] is not None:
+                state["parent"](name, info)
+
+        trace._parent = state["parent"]
+        request.extensions = {**request.extensions, "trace": trace}
+        try:
+            return super().handle_request(request)
+        finally:
+            self._finish(state)
+
+
+class _MeteredAsyncTransport(_PoolMeter, httpx.AsyncHTTPTransport):
+    def __init__(self, label: str, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._init_meter(label)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        state = self._start(request)
+
+        async def trace(name: str, info: Dict[str, Any]) -> None:
+            self._acquired(state)
+            if state["parent"] is not None:
+                await state["parent"](name, info)
+
+        trace._parent = state["parent"]
+        request.extensions = {**request.extensions, "trace": trace}
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self._finish(state)
+
+
+# ----------------------------
+# Shared clients
+# ----------------------------
+def get_client(api_key: Optional[str] = None) -> OpenAI:
+    """
+    The process-wide synchronous OpenAI client.
+
+    Args:
+        api_key: Used when the client is first created (default: the SDK reads OPENAI_API_KEY).
+
+    Returns:
+        The shared client.
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            transport = _MeteredTransport("sync", http2=_http2_enabled(), limits=_limits())
+            _client = OpenAI(
+                api_key=api_key,
+                max_retries=DEFAULT_MAX_RETRIES,
+                http_client=DefaultHttpxClient(transport=transport, timeout=_timeout()),
+            )
+        return _client
+
+
+def get_async_client(api_key: Optional[str] = None) -> AsyncOpenAI:
+    """
+    The asynchronous OpenAI client of the running event loop (one pool per loop).
+
+    Args:
+        api_key: Used when the loop's client is first created.
+
+    Returns:
+        The shared client for the current loop.
+
+    Raises:
+        RuntimeError: If called outside a running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            transport = _MeteredAsyncTransport("async", http2=_http2_enabled(), limits=_limits())
+            client = AsyncOpenAI(
+                api_key=api_key,
+                max_retries=DEFAULT_MAX_RETRIES,
+                http_client=DefaultAsyncHttpxClient(transport=transport, timeout=_timeout()),
+            )
+            _async_clients[loop] = client
+            logger.info("🔌 LLM connection pool: %s", transport_settings())
+        return client
+
+
+async def aclose_async_client() -> None:
+    """Close the current loop's client and its connections (e.g. on application shutdown)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client.close()
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    ``asyncio.run(coro)`` that closes the loop's client (and its connections) before the loop
+    ends. Open connections keep their loop alive, so otherwise every sync call would leave a
+    client and its pool behind.
+
+    Args:
+        coro: The coroutine to run.
+
+    Returns:
+        The coroutine's result.
+    """
+    async def main() -> T:
+        try:
+            return await coro
+        finally:
+            await aclose_async_client()
+
+    return asyncio.run(main())
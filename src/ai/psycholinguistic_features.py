@@ -0,0 +1,177 @@
+"""
+Local Stage 2 (psycholinguistic features) extractor.
+
+Everything in Stage 2 except ``attribution_distance`` is counting over fixed word lists,
+so it is computed here for a whole transcript at once: every token of every sentence is
+mapped to a feature category in a single pass, and the per-sentence counts and ratios are
+then computed with numpy over the (sentences x categories) count matrix. Only the
+semantic ``attribution_distance`` is left to the LLM.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.ai.linguistic_elements import PRONOUN_TYPES, STRONG_MODALS, WEAK_MODALS
+
+__all__ = [
+    "compute_psycholinguistic_features",
+    "ABSOLUTIST_TERMS",
+    "HEDGE_TERMS",
+    "NEGATION_TERMS",
+    "CERTAINTY_MARKERS",
+    "UNCERTAINTY_MARKERS",
+]
+
+# ----------------------------
+# Word lists (as listed in the Stage 2 prompt)
+# ----------------------------
+ABSOLUTIST_TERMS = frozenset({
+    "all", "every", "always", "never", "none", "nothing", "everything",
+    "completely", "totally", "utterly",
+})
+HEDGE_TERMS = frozenset({
+    "some", "many", "certain", "few", "several", "possibly", "maybe", "arguably", "perhaps",
+})
+HEDGE_PHRASES = frozenset({("i", "think")})
+NEGATION_TERMS = frozenset({
+    "not", "isn't", "aren't", "wasn't", "weren't", "don't", "doesn't", "didn't",
+    "never", "no", "nor",
+})
+CERTAINTY_MARKERS = frozenset({"definitely", "certainly", "clearly", "obviously", "undoubtedly"})
+UNCERTAINTY_MARKERS = frozenset({"maybe", "possibly", "perhaps", "might", "could"})
+
+# Count-matrix columns
+_WORDS, _WE, _THEY, _STRONG, _WEAK, _ABS, _HEDGE, _NEG, _CERT, _UNCERT = range(10)
+_N_COLUMNS = 10
+
+_TOKEN_RE = re.compile(r"[a-z]+(?:['’][a-z]+)*")
+
+# Absolutist score grows by this many points per absolutist term (capped at 10)
+_ABSOLUTIST_POINTS = 2.5
+# Modals needed for the full strong/weak ratio in certainty_score; with fewer it is scaled
+# down, so a single "will" ("I will call you tomorrow.") does not read as certainty
+_CERTAINTY_FULL_MODALS = 3
+
+
+def _categories(token: str) -> List[int]:
+    cols = []
+    ptype = PRONOUN_TYPES.get(token)
+    if ptype == "first-person-plural":
+        cols.append(_WE)
+    elif ptype == "third-person-plural":
+        cols.append(_THEY)
+    if token in STRONG_MODALS:
+        cols.append(_STRONG)
+    elif token in WEAK_MODALS:
+        cols.append(_WEAK)
+    if token in ABSOLUTIST_TERMS:
+        cols.append(_ABS)
+    if token in HEDGE_TERMS:
+        cols.append(_HEDGE)
+    if token in NEGATION_TERMS or token.endswith("n't"):
+        cols.append(_NEG)
+    if token in CERTAINTY_MARKERS:
+        cols.append(_CERT)
+    if token in UNCERTAINTY_MARKERS:
+        cols.append(_UNCERT)
+    return cols
+
+
+def _safe_div(num: np.ndarray, den: np.ndarray, default: float = 0.0) -> np.ndarray:
+    out = np.full(num.shape, default, dtype=np.float64)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def compute_psycholinguistic_features(
+    texts: Sequence[str],
+    linguistic_elements: Optional[Sequence[Optional[dict]]] = None,
+) -> List[Dict[str, object]]:
+    """
+    Compute Stage 2 features for many sentences at once.
+
+    Args:
+        texts: Sentence texts (anonymized or original, as used by the pipeline).
+        linguistic_elements: Stage 1 output per text; used for imperative counts and the
+            verb/adjective ratio. May be None or contain None entries.
+
+    Returns:
+        One dict per text with the Stage 2 keys (us_them_ratio, certainty_score,
+        imperative_count, absolutist_terms, absolutist_score, verb_adjective_ratio,
+        hedge_ratio, negation_density, epistemic_certainty). ``attribution_distance`` is
+        not included; it requires the LLM.
+    """
+    n = len(texts)
+    counts = np.zeros((n, _N_COLUMNS), dtype=np.int64)
+    absolutist_terms: List[List[dict]] = [[] for _ in range(n)]
+
+    # Single pass over all tokens: collect (row, column) hits, then one bincount
+    rows: List[int] = []
+    cols: List[int] = []
+    category_cache: Dict[str, List[int]] = {}
+    for row, text in enumerate(texts):
+        tokens = _TOKEN_RE.findall((text or "").lower().replace("’", "'"))
+        counts[row, _WORDS] = len(tokens)
+        prev = None
+        for pos, tok in enumerate(tokens):
+            tok_cols = category_cache.get(tok)
+            if tok_cols is None:
+                tok_cols = category_cache[tok] = _categories(tok)
+            for col in tok_cols:
+                rows.append(row)
+                cols.append(col)
+                if col == _ABS:
+                    absolutist_terms[row].append({"word": tok, "position": pos})
+            if (prev, tok) in HEDGE_PHRASES:
+                rows.append(row)
+                cols.append(_HEDGE)
+            prev = tok
+
+    if rows:
+        flat = np.asarray(rows, dtype=np.int64) * _N_COLUMNS + np.asarray(cols, dtype=np.int64)
+        counts += np.bincount(flat, minlength=n * _N_COLUMNS).reshape(n, _N_COLUMNS)
+
+    # Stage 1 derived counts
+    imperatives = np.zeros(n, dtype=np.int64)
+    verbs = np.zeros(n, dtype=np.int64)
+    adjectives = np.zeros(n, dtype=np.int64)
+    if linguistic_elements is not None:
+        for row, elements in enumerate(linguistic_elements):
+            if not elements:
+                continue
+            verb_list = elements.get("verbs", []) or []
+            verbs[row] = len(verb_list)
+            imperatives[row] = sum(1 for v in verb_list if isinstance(v, dict) and v.get("form") == "imperative")
+            adjectives[row] = len(elements.get("adjectives", []) or [])
+
+    words = counts[:, _WORDS]
+    we, they = counts[:, _WE], counts[:, _THEY]
+    strong, weak = counts[:, _STRONG], counts[:, _WEAK]
+    cert, uncert = counts[:, _CERT], counts[:, _UNCERT]
+
+    us_them = np.minimum(10.0, _safe_div(we, they))
+    modals = strong + weak
+    certainty = 10.0 * _safe_div(strong, modals) * np.minimum(1.0, modals / _CERTAINTY_FULL_MODALS)
+    absolutist_score = np.minimum(10.0, _ABSOLUTIST_POINTS * counts[:, _ABS])
+    verb_adj = _safe_div(verbs, adjectives, default=0.0)
+    verb_adj = np.where((adjectives == 0) & (verbs > 0), verbs.astype(np.float64), verb_adj)
+    hedge_ratio = _safe_div(counts[:, _HEDGE], words)
+    # No markers either way -> neutral 5.0
+    epistemic = 10.0 * _safe_div(cert, cert + uncert, default=0.5)
+
+    results: List[Dict[str, object]] = []
+    for row in range(n):
+        results.append({
+            "us_them_ratio": round(float(us_them[row]), 2),
+            "certainty_score": round(float(certainty[row]), 2),
+            "imperative_count": int(imperatives[row]),
+            "absolutist_terms": absolutist_terms[row],
+            "absolutist_score": round(float(absolutist_score[row]), 2),
+            "verb_adjective_ratio": round(float(verb_adj[row]), 2),
+            "hedge_ratio": round(float(hedge_ratio[row]), 3),
+            "negation_density": int(counts[row, _NEG]),
+            "epistemic_certainty": round(float(epistemic[row]), 2),
+        })
+    return results
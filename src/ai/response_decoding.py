@@ -0,0 +1,492 @@
+"""
+Decoding of the detector's LLM responses into typed, schema-checked stage results.
+
+Fast path: the response (requested with ``response_format=json_object``) goes straight to
+orjson (stdlib json without it), no regex pre-processing. Only if that fails does a single
+bounded, string-aware pass repair it: surrounding prose / markdown fences are skipped,
+trailing commas and raw control characters are fixed, invalid escapes are dropped, and a
+truncated object (max_completion_tokens reached) is cut back to its last complete value
+and closed. String contents are never rewritten, so apostrophes survive.
+
+Every stage has a TypedDict schema: scores are coerced to float and clamped to 0-10,
+lists/objects of the wrong type are replaced, and missing fields get their defaults, so
+downstream code can index results directly. Keys not in the schema are kept.
+
+Outcomes are counted in ``llm_responses_total{stage,outcome}`` (ok, repaired, failed,
+empty, not_object, coerced) instead of printed; a failure logs one warning with the stage
+and size, the response itself only at DEBUG.
+
+Set LLM_RESPONSE_CORPUS to a file path to append every raw response as a JSON line
+(``{"stage": ..., "content": ...}``), e.g. as input for benchmarks/bench_response_decoding.py.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from typing import Annotated, Any, Callable, Dict, List, Optional, Tuple, TypedDict, Union, get_args, get_origin, get_type_hints
+
+try:
+    import orjson
+except ImportError:  # optional dependency; stdlib json is ~3-5x slower
+    orjson = None
+
+from src.backend.observability import get_logger, record_decode
+
+__all__ = [
+    "decode_response",
+    "parse_json",
+    "repair_json",
+    "validate",
+    "STAGE_SCHEMAS",
+    "Score",
+    "LinguisticElements",
+    "PsycholinguisticFeatures",
+    "Attribution",
+    "Dehumanization",
+    "ViolenceAdvocacy",
+    "ThreatInflation",
+    "Homogenization",
+    "DimensionAssessment",
+    "Classification",
+    "Targets",
+]
+
+logger = get_logger(__name__)
+
+# Longest response the repair pass will scan (4000 completion tokens are ~16k characters)
+MAX_REPAIR_CHARS = int(os.environ.get("LLM_REPAIR_MAX_CHARS", "65536"))
+RESPONSE_CORPUS = os.environ.get("LLM_RESPONSE_CORPUS")
+
+if orjson is not None:
+    _loads = orjson.loads
+    _DECODE_ERRORS: Tuple[type, ...] = (orjson.JSONDecodeError,)
+else:
+    _loads = json.loads
+    _DECODE_ERRORS = (json.JSONDecodeError,)
+
+
+# ----------------------------
+# Stage schemas
+# ----------------------------
+class _Range:
+    __slots__ = ("low", "high")
+
+    def __init__(self, low: float, high: float):
+        self.low = low
+        self.high = high
+
+
+Score = Annotated[float, _Range(0.0, 10.0)]
+Ratio = Annotated[float, _Range(0.0, 1.0)]
+
+# Optional[...] marks fields that stay absent when the model leaves them out
+# (sentence_scores is only requested in context-window mode); a null is dropped the same
+# way, so a present field always has its schema type.
+
+
+class LinguisticElements(TypedDict, total=False):
+    pronouns: List[Dict[str, Any]]
+    verbs: List[Dict[str, Any]]
+    adjectives: List[str]
+    adverbs: List[str]
+    modals: List[Dict[str, Any]]
+    entities: List[Dict[str, Any]]
+    group_references: List[str]
+
+
+class PsycholinguisticFeatures(TypedDict, total=False):
+    us_them_ratio: Score
+    certainty_score: Score
+    imperative_count: int
+    absolutist_terms: List[Dict[str, Any]]
+    absolutist_score: Score
+    verb_adjective_ratio: float
+    hedge_ratio: Ratio
+    negation_density: int
+    epistemic_certainty: Score
+    attribution_distance: Score
+
+
+class Attribution(TypedDict, total=False):
+    attribution_distance: Score
+
+
+class Dehumanization(TypedDict, total=False):
+    dehumanization_instances: List[Dict[str, Any]]
+    dehumanization_score: Score
+    sentence_scores: Optional[Dict[str, Score]]
+
+
+class ViolenceAdvocacy(TypedDict, total=False):
+    violence_instances: List[Dict[str, Any]]
+    violence_advocacy_score: Score
+    sentence_scores: Optional[Dict[str, Score]]
+
+
+class ThreatInflation(TypedDict, total=False):
+    existential_terms: List[Dict[str, Any]]
+    amplifiers: List[str]
+    scope_expansions: List[Dict[str, Any]]
+    threat_score: Score
+    sentence_scores: Optional[Dict[str, Score]]
+
+
+class Homogenization(TypedDict, total=False):
+    homogenization_patterns: List[Dict[str, Any]]
+    homogenization_score: Score
+    sentence_scores: Optional[Dict[str, Score]]
+
+
+class DimensionAssessment(TypedDict, total=False):
+    score: Score
+    evidence: str
+    explanation: str
+
+
+class Classification(TypedDict, total=False):
+    # A dimension the model omits or returns as null stays absent (the overall score skips it)
+    dehumanization: Optional[DimensionAssessment]
+    violence_advocacy: Optional[DimensionAssessment]
+    absolutism: Optional[DimensionAssessment]
+    threat_inflation: Optional[DimensionAssessment]
+    outgroup_homogenization: Optional[DimensionAssessment]
+
+
+class Targets(TypedDict, total=False):
+    targets: List[Dict[str, Any]]
+
+
+STAGE_SCHEMAS: Dict[str, type] = {
+    "stage1_llm": LinguisticElements,
+    "stage2_psycho": PsycholinguisticFeatures,
+    "stage2_attribution": Attribution,
+    "stage3_dehumanization": Dehumanization,
+    "stage3_violence": ViolenceAdvocacy,
+    "stage3_threat": ThreatInflation,
+    "stage3_homogenization": Homogenization,
+    "stage4_classification": Classification,
+    "stage5_targets": Targets,
+}
+
+
+# ----------------------------
+# Validation (compiled once per schema)
+# ----------------------------
+Checker = Callable[[Any], Tuple[Any, bool]]  # value -> (coerced value, was already valid)
+
+_checkers: Dict[Any, Tuple[Checker, Callable[[], Any], bool]] = {}
+
+
+def _compile(tp) -> Tuple[Checker, Callable[[], Any], bool]:
+    """(checker, default factory, fill when missing) for a type annotation."""
+    cached = _checkers.get(tp)
+    if cached is not None:
+        return cached
+    origin, args = get_origin(tp), get_args(tp)
+    fill = True
+
+    if origin is Union and type(None) in args:
+        (inner,) = [a for a in args if a is not type(None)]
+        check, default, _ = _compile(inner)
+        fill = False
+
+        def check_optional(v, check=check):
+            return (None, True) if v is None else check(v)
+
+        result = (check_optional, default, fill)
+    elif origin is Annotated:
+        check, default, fill = _compile(args[0])
+        bounds = next((a for a in args[1:] if isinstance(a, _Range)), None)
+
+        def check_range(v, check=check, bounds=bounds):
+            v, ok = check(v)
+            if bounds is not None and not bounds.low <= v <= bounds.high:
+                return min(max(v, bounds.low), bounds.high), False
+            return v, ok
+
+        result = (check_range, default, fill)
+    elif tp is float:
+        result = (_check_float, float, fill)
+    elif tp is int:
+        result = (_check_int, int, fill)
+    elif tp is str:
+        result = (_check_str, str, fill)
+    elif tp is Any:
+        result = (lambda v: (v, True), lambda: None, False)
+    elif origin in (list, List):
+        item_check = _compile(args[0])[0] if args else (lambda v: (v, True))
+
+        def check_list(v, item_check=item_check):
+            if not isinstance(v, list):
+                return [], False
+            out, ok = [], True
+            for item in v:
+                item, good = item_check(item)
+                if good or item not in (None, ""):  # drop items that had nothing usable
+                    out.append(item)
+                ok = ok and good
+            return out, ok
+
+        result = (check_list, list, fill)
+    elif origin in (dict, Dict):
+        value_check = _compile(args[1])[0] if args and args[1] is not Any else None
+
+        def check_dict(v, value_check=value_check):
+            if not isinstance(v, dict):
+                return ({} if value_check else None), False
+            if value_check is None:
+                return v, True
+            out, ok = {}, True
+            for key, item in v.items():
+                out[str(key)], good = value_check(item)
+                ok = ok and good
+            return out, ok
+
+        result = (check_dict, dict, fill)
+    elif isinstance(tp, type) and issubclass(tp, dict) and hasattr(tp, "__annotations__"):
+        result = _compile_typed_dict(tp)
+    else:
+        raise TypeError(f"Unsupported schema type: {tp!r}")
+    _checkers[tp] = result
+    return result
+
+
+def _compile_typed_dict(schema) -> Tuple[Checker, Callable[[], Any], bool]:
+    fields = {name: _compile(tp) for name, tp in get_type_hints(schema, include_extras=True).items()}
+
+    def default() -> Dict[str, Any]:
+        return {name: make() for name, (_, make, fill) in fields.items() if fill}
+
+    def check(v):
+        if not isinstance(v, dict):
+            return default(), False
+        out, ok = dict(v), True
+        for name, (field_check, make, fill) in fields.items():
+            if name in v and v[name] is None and not fill:
+                del out[name]  # null optional field: absent, as if omitted
+                ok = False
+            elif name in v:
+                out[name], good = field_check(v[name])
+                ok = ok and good
+            elif fill:
+                out[name] = make()
+        return out, ok
+
+    return check, default, True
+
+
+def _check_float(v) -> Tuple[float, bool]:
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        v = float(v)
+        return (v, True) if math.isfinite(v) else (0.0, False)
+    if isinstance(v, str):
+        try:
+            v = float(v.strip())
+            return (v, False) if math.isfinite(v) else (0.0, False)
+        except ValueError:
+            pass
+    return 0.0, False
+
+
+def _check_int(v) -> Tuple[int, bool]:
+    if isinstance(v, int) and not isinstance(v, bool):
+        return v, True
+    f, _ = _check_float(v)
+    return int(round(f)), False
+
+
+def _check_str(v) -> Tuple[str, bool]:
+    if isinstance(v, str):
+        return v, True
+    if v is None:
+        return "", False
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return str(v), False
+    return "", False
+
+
+def validate(data: Any, schema: type) -> Tuple[Dict[str, Any], bool]:
+    """
+    Coerce parsed JSON to a stage schema.
+
+    Returns:
+        (result, valid): the typed result dict, and False if anything had to be coerced,
+        clamped or replaced (missing fields filled with defaults do not count).
+    """
+    return _compile(schema)[0](data)
+
+
+# ----------------------------
+# Parsing and repair
+# ----------------------------
+_STRUCTURAL = re.compile(r'[{}\[\]",:]')
+_SCALAR = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+_STRING_SPECIAL = re.compile(r'["\\\x00-\x1f]')
+_VALID_ESCAPES = frozenset('"\\/bfnrtu')
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+
+
+def _strip_trailing_comma(out: List[str]) -> None:
+    j = len(out)
+    while j and out[j - 1].isspace():
+        j -= 1
+    if j and out[j - 1] == ",":
+        del out[j - 1]
+
+
+def repair_json(text: str, max_chars: int = MAX_REPAIR_CHARS) -> Optional[str]:
+    """
+    Best-effort repair of a JSON object in one linear pass (None if there is no object or
+    the text is longer than ``max_chars``).
+
+    Skips text before the first "{" and after the object closes (prose, markdown fences),
+    removes trailing commas, escapes raw control characters in strings, drops invalid
+    escapes such as \\', and closes a truncated object after its last complete value (an
+    unterminated string value is kept and closed; a dangling key is dropped).
+    """
+    if len(text) > max_chars:
+        return None
+    i = text.find("{")
+    if i < 0:
+        return None
+    n = len(text)
+    out: List[str] = []
+    stack: List[str] = []
+    safe = (0, 0)           # (len(out), len(stack)) after the last complete value
+    expect_key = False
+    in_string = string_is_key = False
+
+    while i < n:
+        if in_string:
+            m = _STRING_SPECIAL.search(text, i)
+            if m is None:
+                out.append(text[i:])
+                i = n
+                break
+            if m.start() > i:
+                out.append(text[i:m.start()])
+            ch, i = m.group(), m.end()
+            if ch == '"':
+                out.append(ch)
+                in_string = False
+                if not string_is_key:
+                    safe = (len(out), len(stack))
+            elif ch == "\\":
+                if i >= n:
+                    break
+                nxt = text[i]
+                i += 1
+                out.append("\\" + nxt if nxt in _VALID_ESCAPES else nxt)
+            else:
+                out.append(_CONTROL_ESCAPES.get(ch) or f"\\u{ord(ch):04x}")
+            continue
+
+        m = _STRUCTURAL.search(text, i)
+        if m is None:
+            out.append(text[i:])
+            break
+        if m.start() > i:
+            out.append(text[i:m.start()])
+        ch, i = m.group(), m.end()
+        if ch == '"':
+            string_is_key = expect_key and bool(stack) and stack[-1] == "{"
+            in_string = True
+            out.append(ch)
+        elif ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+            expect_key = ch == "{"
+            safe = (len(out), len(stack))
+        elif ch in "}]":
+            _strip_trailing_comma(out)
+            out.append("}" if stack.pop() == "{" else "]")
+            expect_key = False
+            if not stack:
+                return "".join(out)
+            safe = (len(out), len(stack))
+        elif ch == ",":
+            _strip_trailing_comma(out)
+            if out and out[-1] not in ("{", "["):
+                safe = (len(out), len(stack))
+                out.append(ch)
+            expect_key = stack[-1] == "{"
+        else:  # ":"
+            out.append(ch)
+            expect_key = False
+
+    # Truncated: keep an unterminated string value or a complete trailing scalar, then
+    # close what is open
+    if in_string and not string_is_key:
+        out.append('"')
+        safe = (len(out), len(stack))
+    elif not in_string and len(out) >= 2 and out[-2] in (":", ",", "[") and _SCALAR.fullmatch(out[-1].strip()):
+        safe = (len(out), len(stack))
+    cut, depth = safe
+    del out[cut:]
+    _strip_trailing_comma(out)
+    out.extend("}" if c == "{" else "]" for c in reversed(stack[:depth]))
+    return "".join(out)
+
+
+def parse_json(text: Optional[str]) -> Tuple[Optional[Any], str]:
+    """
+    Parse a response: strict parse first, then one bounded repair.
+
+    Returns:
+        (value, outcome) with outcome "ok", "repaired", "empty" or "failed" (value None).
+    """
+    if not text or text.isspace():
+        return None, "empty"
+    try:
+        return _loads(text), "ok"
+    except _DECODE_ERRORS:
+        pass
+    repaired = repair_json(text)
+    if repaired is not None:
+        try:
+            return _loads(repaired), "repaired"
+        except _DECODE_ERRORS:
+            pass
+    return None, "failed"
+
+
+_corpus_lock = threading.Lock()
+
+
+def _record_corpus(stage: str, text: Optional[str]) -> None:
+    line = json.dumps({"stage": stage, "content": text}, ensure_ascii=False)
+    with _corpus_lock, open(RESPONSE_CORPUS, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def decode_response(text: Optional[str], stage: str = "llm", schema: Optional[type] = None) -> Dict[str, Any]:
+    """
+    Decode one LLM response into the typed result of its stage.
+
+    Args:
+        text: Raw message content.
+        stage: Stage name (metric label; also selects the schema from STAGE_SCHEMAS).
+        schema: Schema overriding the stage's.
+
+    Returns:
+        The validated result; on unusable responses the schema defaults (``{}`` for
+        stages without a schema), as the detector has always fallen back to.
+    """
+    if RESPONSE_CORPUS:
+        _record_corpus(stage, text)
+    schema = schema or STAGE_SCHEMAS.get(stage)
+    data, outcome = parse_json(text)
+    if outcome == "failed":
+        logger.warning("Unparseable %s response (%d characters); using defaults", stage, len(text))
+        logger.debug("Unparseable %s response:\n%s", stage, text)
+    elif data is not None and not isinstance(data, dict):
+        outcome, data = "not_object", None
+    record_decode(stage, outcome)
+    if schema is None:
+        return data if data is not None else {}
+    result, valid = validate(data if data is not None else {}, schema)
+    if data is not None and not valid:
+        record_decode(stage, "coerced")
+    return result
@@ -0,0 +1,209 @@
+"""
+Response assembly for /process-media/.
+
+Joins the Whisper sentences with the per-sentence extremism results (dict-indexed by
+``text_id``) and the per-sentence vocabulary-filter hits, and aggregates the per-sentence
+scores into overall dimension scores. Scores are kept in a columnar (sentences x
+dimensions) numpy array so the overall aggregation is vectorized.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+__all__ = [
+    "DIMENSIONS",
+    "CATEGORY_COLORS",
+    "CATEGORY_NAMES",
+    "categorize_score",
+    "index_results",
+    "build_score_matrix",
+    "build_processed_sentences",
+    "aggregate_overall_scores",
+    "assemble",
+]
+
+DIMENSIONS = (
+    "violence_advocacy",
+    "dehumanization",
+    "outgroup_homogenization",
+    "threat_inflation",
+    "absolutism",
+)
+
+# Category colors for frontend
+CATEGORY_COLORS = {
+    "violence_advocacy": "#E53E3E",
+    "dehumanization": "#9F7AEA",
+    "outgroup_homogenization": "#38B2AC",
+    "threat_inflation": "#ED8936",
+    "absolutism": "#ECC94B",
+}
+
+CATEGORY_NAMES = {
+    "violence_advocacy": "Violence Advocacy",
+    "dehumanization": "Dehumanization",
+    "outgroup_homogenization": "Outgroup Homogenization",
+    "threat_inflation": "Threat Inflation",
+    "absolutism": "Absolutism",
+}
+
+TRANSCRIPTION_COLOR = "#667EEA"
+VOCABULARY_FILTER_COLOR = "#ED8936"
+
+# Sentences below this score are not tagged with an extremism category
+EXTREMISM_THRESHOLD = 2.0
+
+
+def categorize_score(score: float) -> Dict[str, str]:
+    """Categorize numerical score into None, Low, Medium, High"""
+    if score < 2.0:
+        return {"level": "None", "color": "#48BB78", "icon": "check_circle"}
+    elif score < 5.0:
+        return {"level": "Low", "color": "#ECC94B", "icon": "info"}
+    elif score < 7.5:
+        return {"level": "Medium", "color": "#ED8936", "icon": "warning"}
+    else:
+        return {"level": "High", "color": "#E53E3E", "icon": "error"}
+
+
+def _score_value(score_data) -> float:
+    if isinstance(score_data, dict) and "score" in score_data:
+        return float(score_data["score"] or 0.0)
+    if isinstance(score_data, (int, float)):
+        return float(score_data)
+    return 0.0
+
+
+def index_results(batch_results: Iterable[dict]) -> Dict[object, dict]:
+    """Index batch results by ``text_id`` (O(n) instead of a scan per sentence)."""
+    return {result.get("text_id"): result for result in batch_results}
+
+
+def build_score_matrix(n_sentences: int, results_by_id: Dict[object, dict]) -> np.ndarray:
+    """
+    Build the (sentences x DIMENSIONS) score array.
+
+    Cells are NaN where a sentence has no result, an error result, or no score for that
+    dimension, so they are ignored by the aggregation.
+    """
+    scores = np.full((n_sentences, len(DIMENSIONS)), np.nan, dtype=np.float64)
+    for idx in range(n_sentences):
+        result = results_by_id.get(idx)
+        if result is None or "error" in result:
+            continue
+        sentence_scores = result.get("scores", {}) or {}
+        for col, dimension in enumerate(DIMENSIONS):
+            if dimension in sentence_scores:
+                scores[idx, col] = _score_value(sentence_scores[dimension])
+    return scores
+
+
+def build_processed_sentences(
+    sentences: List[dict],
+    results_by_id: Dict[object, dict],
+    scores: np.ndarray,
+    flagged_sentence_ids: Optional[Iterable[int]] = None,
+) -> List[dict]:
+    """
+    Build the per-sentence entries of the response (category, color, level).
+
+    :param sentences: Whisper sentences (``{"start", "end", "text"}``).
+    :param results_by_id: Batch results indexed by ``text_id`` (see ``index_results``).
+    :param scores: Score matrix from ``build_score_matrix``.
+    :param flagged_sentence_ids: Indices of sentences containing vocabulary-filter hits.
+    :return: List of processed sentence dicts, in sentence order.
+    """
+    flagged = set(flagged_sentence_ids or ())
+
+    # Dominant dimension per sentence (first highest wins, like a strict > scan)
+    filled = np.nan_to_num(scores, nan=0.0)
+    dominant_cols = filled.argmax(axis=1) if len(filled) else np.zeros(0, dtype=np.int64)
+    highest_scores = filled.max(axis=1) if len(filled) else np.zeros(0)
+
+    processed = []
+    for idx, sentence in enumerate(sentences):
+        result = results_by_id.get(idx)
+        if result is None or "error" in result:
+            # Fallback for missing/error results
+            processed.append({
+                "text": sentence.get("text", ""),
+                "start": sentence.get("start", 0),
+                "end": sentence.get("end", 0),
+                "category": "Transcription",
+                "color": TRANSCRIPTION_COLOR,
+                "level": "None",
+            })
+            continue
+
+        highest_score = float(highest_scores[idx])
+        categories = []
+        color = TRANSCRIPTION_COLOR
+        level = "None"
+
+        has_filtered_word = idx in flagged
+        if has_filtered_word:
+            categories.append("Vocabulary Filter")
+            color = VOCABULARY_FILTER_COLOR
+            level = "Flagged"
+
+        if highest_score > 0.0 and highest_score >= EXTREMISM_THRESHOLD:
+            dominant_category = DIMENSIONS[int(dominant_cols[idx])]
+            categories.append(CATEGORY_NAMES[dominant_category])
+            # If not already colored by vocab filter, use extremism color
+            if not has_filtered_word:
+                color = CATEGORY_COLORS.get(dominant_category, TRANSCRIPTION_COLOR)
+                level = categorize_score(highest_score)["level"]
+
+        # If no categories, it's just transcription
+        if not categories:
+            categories.append("Transcription")
+
+        processed.append({
+            "text": sentence.get("text", ""),
+            "start": sentence.get("start", 0),
+            "end": sentence.get("end", 0),
+            "category": categories[0],  # vocab filter has priority for display
+            "categories": categories,
+            "color": color,
+            "level": level,
+        })
+    return processed
+
+
+def _categorized(score: float) -> Dict[str, object]:
+    info = categorize_score(score)
+    return {"score": score, "level": info["level"], "color": info["color"], "icon": info["icon"]}
+
+
+def aggregate_overall_scores(scores: np.ndarray) -> Dict[str, Dict[str, object]]:
+    """
+    Aggregate per-sentence scores into overall scores per dimension.
+
+    Overall per dimension is the max sentence score plus 10% of the mean (capped at 10);
+    ``overall_extremism`` is the max over dimensions.
+    """
+    present = ~np.isnan(scores)
+    counts = present.sum(axis=0)
+    has_scores = counts > 0
+    safe = np.where(present, scores, 0.0)
+
+    max_scores = np.where(has_scores, np.where(present, scores, -np.inf).max(axis=0, initial=-np.inf), 0.0)
+    mean_scores = np.divide(safe.sum(axis=0), counts, out=np.zeros(len(DIMENSIONS)), where=has_scores)
+    overall = np.where(has_scores, np.minimum(10.0, max_scores + 0.1 * mean_scores), 0.0)
+
+    result = {dimension: _categorized(float(overall[col])) for col, dimension in enumerate(DIMENSIONS)}
+    result["overall_extremism"] = _categorized(float(overall.max()) if len(overall) else 0.0)
+    return result
+
+
+def assemble(
+    sentences: List[dict],
+    batch_results: List[dict],
+    flagged_sentence_ids: Optional[Iterable[int]] = None,
+) -> Tuple[List[dict], Dict[str, Dict[str, object]]]:
+    """Convenience wrapper: processed sentences and overall scores in one call."""
+    results_by_id = index_results(batch_results)
+    scores = build_score_matrix(len(sentences), results_by_id)
+    processed = build_processed_sentences(sentences, results_by_id, scores, flagged_sentence_ids)
+    return processed, aggregate_overall_scores(scores)
@@ -1,19 +1,38 @@
-import os
+import bisect
+import re
 import string
-from typing import List, Dict
+from typing import List, Dict, Iterable, Optional
+
+from src.backend.observability import get_logger
+from src.backend.pattern_matcher import PatternMatcher, PreparedText, normalize_entry, search_layers
+
+logger = get_logger(__name__)
+
+# https://github.com/MauriceButler/badwords/blob/master/array.js
+DEFAULT_BAD_WORDS = ["4r5e", "5h1t", "5hit", "a55", "anal", "anus", "ar5e", "arrse", "arse", "ass", "ass-fucker", "asses", "assfucker", "assfukka", "asshole", "assholes", "asswhole", "a_s_s", "b!tch", "b00bs", "b17ch", "b1tch", "ballbag", "balls", "ballsack", "bastard", "beastial", "beastiality", "bellend", "bestial", "bestiality", "bi+ch", "biatch", "bitch", "bitcher", "bitchers", "bitches", "bitchin", "bitching", "bloody", "blow job", "blowjob", "blowjobs", "boiolas", "bollock", "bollok", "boner", "boob", "boobs", "booobs", "boooobs", "booooobs", "booooooobs", "breasts", "buceta", "bugger", "bum", "bunny fucker", "butt", "butthole", "buttmuch", "buttplug", "c0ck", "c0cksucker", "carpet muncher", "cawk", "chink", "cipa", "cl1t", "clit", "clitoris", "clits", "cnut", "cock", "cock-sucker", "cockface", "cockhead", "cockmunch", "cockmuncher", "cocks", "cocksuck", "cocksucked", "cocksucker", "cocksucking", "cocksucks", "cocksuka", "cocksukka", "cok", "cokmuncher", "coksucka", "coon", "cox", "crap", "cum", "cummer", "cumming", "cums", "cumshot", "cunilingus", "cunillingus", "cunnilingus", "cunt", "cuntlick", "cuntlicker", "cuntlicking", "cunts", "cyalis", "cyberfuc", "cyberfuck", "cyberfucked", "cyberfucker", "cyberfuckers", "cyberfucking", "d1ck", "damn", "dick", "dickhead", "dildo", "dildos", "dink", "dinks", "dirsa", "dlck", "dog-fucker", "doggin", "dogging", "donkeyribber", "doosh", "duche", "dyke", "ejaculate", "ejaculated", "ejaculates", "ejaculating", "ejaculatings", "ejaculation", "ejakulate", "f u c k", "f u c k e r", "f4nny", "fag", "fagging", "faggitt", "faggot", "faggs", "fagot", "fagots", "fags", "fanny", "fannyflaps", "fannyfucker", "fanyy", "fatass", "fcuk", "fcuker", "fcuking", "feck", "fecker", "felching", "fellate", "fellatio", "fingerfuck", "fingerfucked", "fingerfucker", "fingerfuckers", "fingerfucking", "fingerfucks", "fistfuck", "fistfucked", "fistfucker", "fistfuckers", "fistfucking", "fistfuckings", "fistfucks", "flange", "fook", "fooker", "fuck", "fucka", "fucked", "fucker", "fuckers", "fuckhead", "fuckheads", "fuckin", "fucking", "fuckings", "fuckingshitmotherfucker", "fuckme", "fucks", "fuckwhit", "fuckwit", "fudge packer", "fudgepacker", "fuk", "fuker", "fukker", "fukkin", "fuks", "fukwhit", "fukwit", "fux", "fux0r", "f_u_c_k", "gangbang", "gangbanged", "gangbangs", "gaylord", "gaysex", "goatse", "God", "god-dam", "god-damned", "goddamn", "goddamned", "hardcoresex", "hell", "heshe", "hoar", "hoare", "hoer", "homo", "hore", "horniest", "horny", "hotsex", "jack-off", "jackoff", "jap", "jerk-off", "jism", "jiz", "jizm", "jizz", "kawk", "knob", "knobead", "knobed", "knobend", "knobhead", "knobjocky", "knobjokey", "kock", "kondum", "kondums", "kum", "kummer", "kumming", "kums", "kunilingus", "l3i+ch", "l3itch", "labia", "lust", "lusting", "m0f0", "m0fo", "m45terbate", "ma5terb8", "ma5terbate", "masochist", "master-bate", "masterb8", "masterbat*", "masterbat3", "masterbate", "masterbation", "masterbations", "masturbate", "mo-fo", "mof0", "mofo", "mothafuck", "mothafucka", "mothafuckas", "mothafuckaz", "mothafucked", "mothafucker", "mothafuckers", "mothafuckin", "mothafucking", "mothafuckings", "mothafucks", "mother fucker", "motherfuck", "motherfucked", "motherfucker", "motherfuckers", "motherfuckin", "motherfucking", "motherfuckings", "motherfuckka", "motherfucks", "muff", "mutha", "muthafecker", "muthafuckker", "muther", "mutherfucker", "n1gga", "n1gger", "nazi", "nigg3r", "nigg4h", "nigga", "niggah", "niggas", "niggaz", "nigger", "niggers", "nob", "nob jokey", "nobhead", "nobjocky", "nobjokey", "numbnuts", "nutsack", "orgasim", "orgasims", "orgasm", "orgasms", "p0rn", "pawn", "pecker", "penis", "penisfucker", "phonesex", "phuck", "phuk", "phuked", "phuking", "phukked", "phukking", "phuks", "phuq", "pigfucker", "pimpis", "piss", "pissed", "pisser", "pissers", "pisses", "pissflaps", "pissin", "pissing", "pissoff", "poop", "porn", "porno", "pornography", "pornos", "prick", "pricks", "pron", "pube", "pusse", "pussi", "pussies", "pussy", "pussys", "rectum", "retard", "rimjaw", "rimming", "s hit", "s.o.b.", "sadist", "schlong", "screwing", "scroat", "scrote", "scrotum", "semen", "sex", "sh!+", "sh!t", "sh1t", "shag", "shagger", "shaggin", "shagging", "shemale", "shi+", "shit", "shitdick", "shite", "shited", "shitey", "shitfuck", "shitfull", "shithead", "shiting", "shitings", "shits", "shitted", "shitter", "shitters", "shitting", "shittings", "shitty", "skank", "slut", "sluts", "smegma", "smut", "snatch", "son-of-a-bitch", "spac", "spunk", "s_h_i_t", "t1tt1e5", "t1tties", "teets", "teez", "testical", "testicle", "tit", "titfuck", "tits", "titt", "tittie5", "tittiefucker", "titties", "tittyfuck", "tittywank", "titwank", "tosser", "turd", "tw4t", "twat", "twathead", "twatty", "twunt", "twunter", "v14gra", "v1gra", "vagina", "viagra", "vulva", "w00se", "wang", "wank", "wanker", "wanky", "whoar", "whore", "willies", "willy", "xrated", "xxx"]
+
+# Sentence end: one or more of .!? followed by whitespace or end of text
+# (so "s.o.b." or "b!tch" do not split a sentence)
+_SENTENCE_END = re.compile(r"[.!?]+(?=\s|$)")
 
 class WordFlagger:
     """
     A class to identify and flag specific words from a predefined list within a given text.
     """
 
-    def __init__(self):
+    def __init__(self, words: Optional[Iterable[str]] = None):
         """
         Initializes the WordFlagger with a list of bad words.
+
+        :param words: The vocabulary to use (defaults to DEFAULT_BAD_WORDS).
+
+        Entries may be single words, multi-word phrases ("blow job"), prefix wildcards
+        ("masterbat*") or obfuscated spellings ("5h1t"); all of them are found in one pass
+        by a compiled Aho–Corasick matcher.
         """
-        # https://github.com/MauriceButler/badwords/blob/master/array.js
-        bad_words = ["4r5e", "5h1t", "5hit", "a55", "anal", "anus", "ar5e", "arrse", "arse", "ass", "ass-fucker", "asses", "assfucker", "assfukka", "asshole", "assholes", "asswhole", "a_s_s", "b!tch", "b00bs", "b17ch", "b1tch", "ballbag", "balls", "ballsack", "bastard", "beastial", "beastiality", "bellend", "bestial", "bestiality", "bi+ch", "biatch", "bitch", "bitcher", "bitchers", "bitches", "bitchin", "bitching", "bloody", "blow job", "blowjob", "blowjobs", "boiolas", "bollock", "bollok", "boner", "boob", "boobs", "booobs", "boooobs", "booooobs", "booooooobs", "breasts", "buceta", "bugger", "bum", "bunny fucker", "butt", "butthole", "buttmuch", "buttplug", "c0ck", "c0cksucker", "carpet muncher", "cawk", "chink", "cipa", "cl1t", "clit", "clitoris", "clits", "cnut", "cock", "cock-sucker", "cockface", "cockhead", "cockmunch", "cockmuncher", "cocks", "cocksuck", "cocksucked", "cocksucker", "cocksucking", "cocksucks", "cocksuka", "cocksukka", "cok", "cokmuncher", "coksucka", "coon", "cox", "crap", "cum", "cummer", "cumming", "cums", "cumshot", "cunilingus", "cunillingus", "cunnilingus", "cunt", "cuntlick", "cuntlicker", "cuntlicking", "cunts", "cyalis", "cyberfuc", "cyberfuck", "cyberfucked", "cyberfucker", "cyberfuckers", "cyberfucking", "d1ck", "damn", "dick", "dickhead", "dildo", "dildos", "dink", "dinks", "dirsa", "dlck", "dog-fucker", "doggin", "dogging", "donkeyribber", "doosh", "duche", "dyke", "ejaculate", "ejaculated", "ejaculates", "ejaculating", "ejaculatings", "ejaculation", "ejakulate", "f u c k", "f u c k e r", "f4nny", "fag", "fagging", "faggitt", "faggot", "faggs", "fagot", "fagots", "fags", "fanny", "fannyflaps", "fannyfucker", "fanyy", "fatass", "fcuk", "fcuker", "fcuking", "feck", "fecker", "felching", "fellate", "fellatio", "fingerfuck", "fingerfucked", "fingerfucker", "fingerfuckers", "fingerfucking", "fingerfucks", "fistfuck", "fistfucked", "fistfucker", "fistfuckers", "fistfucking", "fistfuckings", "fistfucks", "flange", "fook", "fooker", "fuck", "fucka", "fucked", "fucker", "fuckers", "fuckhead", "fuckheads", "fuckin", "fucking", "fuckings", "fuckingshitmotherfucker", "fuckme", "fucks", "fuckwhit", "fuckwit", "fudge packer", "fudgepacker", "fuk", "fuker", "fukker", "fukkin", "fuks", "fukwhit", "fukwit", "fux", "fux0r", "f_u_c_k", "gangbang", "gangbanged", "gangbangs", "gaylord", "gaysex", "goatse", "God", "god-dam", "god-damned", "goddamn", "goddamned", "hardcoresex", "hell", "heshe", "hoar", "hoare", "hoer", "homo", "hore", "horniest", "horny", "hotsex", "jack-off", "jackoff", "jap", "jerk-off", "jism", "jiz", "jizm", "jizz", "kawk", "knob", "knobead", "knobed", "knobend", "knobhead", "knobjocky", "knobjokey", "kock", "kondum", "kondums", "kum", "kummer", "kumming", "kums", "kunilingus", "l3i+ch", "l3itch", "labia", "lust", "lusting", "m0f0", "m0fo", "m45terbate", "ma5terb8", "ma5terbate", "masochist", "master-bate", "masterb8", "masterbat*", "masterbat3", "masterbate", "masterbation", "masterbations", "masturbate", "mo-fo", "mof0", "mofo", "mothafuck", "mothafucka", "mothafuckas", "mothafuckaz", "mothafucked", "mothafucker", "mothafuckers", "mothafuckin", "mothafucking", "mothafuckings", "mothafucks", "mother fucker", "motherfuck", "motherfucked", "motherfucker", "motherfuckers", "motherfuckin", "motherfucking", "motherfuckings", "motherfuckka", "motherfucks", "muff", "mutha", "muthafecker", "muthafuckker", "muther", "mutherfucker", "n1gga", "n1gger", "nazi", "nigg3r", "nigg4h", "nigga", "niggah", "niggas", "niggaz", "nigger", "niggers", "nob", "nob jokey", "nobhead", "nobjocky", "nobjokey", "numbnuts", "nutsack", "orgasim", "orgasims", "orgasm", "orgasms", "p0rn", "pawn", "pecker", "penis", "penisfucker", "phonesex", "phuck", "phuk", "phuked", "phuking", "phukked", "phukking", "phuks", "phuq", "pigfucker", "pimpis", "piss", "pissed", "pisser", "pissers", "pisses", "pissflaps", "pissin", "pissing", "pissoff", "poop", "porn", "porno", "pornography", "pornos", "prick", "pricks", "pron", "pube", "pusse", "pussi", "pussies", "pussy", "pussys", "rectum", "retard", "rimjaw", "rimming", "s hit", "s.o.b.", "sadist", "schlong", "screwing", "scroat", "scrote", "scrotum", "semen", "sex", "sh!+", "sh!t", "sh1t", "shag", "shagger", "shaggin", "shagging", "shemale", "shi+", "shit", "shitdick", "shite", "shited", "shitey", "shitfuck", "shitfull", "shithead", "shiting", "shitings", "shits", "shitted", "shitter", "shitters", "shitting", "shittings", "shitty", "skank", "slut", "sluts", "smegma", "smut", "snatch", "son-of-a-bitch", "spac", "spunk", "s_h_i_t", "t1tt1e5", "t1tties", "teets", "teez", "testical", "testicle", "tit", "titfuck", "tits", "titt", "tittie5", "tittiefucker", "titties", "tittyfuck", "tittywank", "titwank", "tosser", "turd", "tw4t", "twat", "twathead", "twatty", "twunt", "twunter", "v14gra", "v1gra", "vagina", "viagra", "vulva", "w00se", "wang", "wank", "wanker", "wanky", "whoar", "whore", "willies", "willy", "xrated", "xxx"]
-        self.bad_words = set(bad_words)
+        self.bad_words = set()
+        self._matcher = PatternMatcher()
+        self.set_words(DEFAULT_BAD_WORDS if words is None else words)
 
     def flag_words(self, text: str) -> List[Dict[str, object]]:
         """
@@ -22,66 +41,255 @@ class WordFlagger:
         :param text: The text to analyze.
         :return: A list of dictionaries, each containing details of a flagged sentence.
                  Each entry represents ONE sentence with ALL flagged words in it.
+                 ``char_start``/``char_end`` of each flagged word are offsets into ``text``.
+        """
+        spans = self._sentence_spans(text)
+        sentences = [text[start:end] for start, end in spans]
+        offsets = [start for start, _ in spans]
+        prepared = PreparedText(sentences, offsets=offsets)
+        return self._format_results(sentences, self._search(prepared), offsets)
+
+    def flag_sentences(self, sentences: List[str]) -> List[Dict[str, object]]:
         """
+        Flags specific words in already-split sentences (e.g. the Whisper sentences), in a
+        single pass.
+
+        :param sentences: The sentences to analyze.
+        :return: Same structure as flag_words; ``sentence_index`` is the index into ``sentences``
+                 and character offsets are relative to each sentence.
+        """
+        return self._format_results(sentences, self._search(PreparedText(sentences)))
+
+    def flag_word_stream(self, words: List[dict], sentences: List[dict]) -> List[Dict[str, object]]:
+        """
+        Flags specific words directly in the Whisper word stream, so every hit carries the
+        audio time of the flagged word(s).
+
+        Words are assigned to the Whisper sentences through a sorted index of sentence
+        start times (binary search per word), and matches never span two sentences.
+
+        :param words: Whisper words, ``{"w": token, "s": start_sec, "e": end_sec}``, in time order,
+                      or a columnar transcript (transcriber.columnar.ColumnarTranscript).
+        :param sentences: Whisper sentences, ``{"start", "end", "text"}``, in time order.
+        :return: Same structure as flag_sentences; each flagged word also has ``start`` and
+                 ``end`` (seconds) and ``word_index`` is the index of the first matched word
+                 within its sentence.
+        """
+        tokens, word_starts, word_ends = self._word_columns(words)
+        sentence_words = self._assign_words(word_starts, word_ends, sentences)
+        documents = []
+        word_char_starts = []
+        for indices in sentence_words:
+            parts, starts, pos = [], [], 0
+            for i in indices:
+                token = tokens[i].strip()
+                starts.append(pos)
+                parts.append(token)
+                pos += len(token) + 1
+            documents.append(" ".join(parts))
+            word_char_starts.append(starts)
+
         flagged_results = []
-        sentences = self._split_into_sentences(text)
-
-        for sentence_index, sentence in enumerate(sentences):
-            words = sentence.split()
-            flagged_words_in_sentence = []
-            
-            for word_index, word in enumerate(words):
-                normalized_word = self._normalize_word(word)
-                if normalized_word in self.bad_words:
-                    flagged_words_in_sentence.append({
-                        "word_index": word_index,
-                        "flagged_word": word
-                    })
-            
-            # Only add entry if sentence contains flagged words
-            if flagged_words_in_sentence:
-                flagged_results.append({
-                    "sentence_index": sentence_index,
-                    "sentence_text": sentence,
-                    "flagged_words": flagged_words_in_sentence
-                })
+        current = None
+        for match in self._search(PreparedText(documents)):
+            doc = match.doc_index
+            starts = word_char_starts[doc]
+            first = bisect.bisect_right(starts, match.char_start) - 1
+            last = bisect.bisect_right(starts, match.char_end - 1) - 1
+            first_word = sentence_words[doc][first]
+            last_word = sentence_words[doc][last]
+            if current is None or current["sentence_index"] != doc:
+                current = {
+                    "sentence_index": doc,
+                    "sentence_text": str(sentences[doc].get("text", "")),
+                    "flagged_words": []
+                }
+                flagged_results.append(current)
+            current["flagged_words"].append({
+                "word_index": first,
+                "flagged_word": documents[doc][match.char_start:match.char_end],
+                "matched_entry": match.pattern,
+                "start": round(float(word_starts[first_word]), 2),
+                "end": round(float(word_ends[last_word]), 2)
+            })
+        return flagged_results
+
+    @staticmethod
+    def _word_columns(words) -> tuple:
+        """
+        Token, start and end columns of a word stream.
+
+        :param words: Word dicts ({"w","s","e"}) or a columnar transcript (anything with
+                      a ``columns()`` method returning (tokens, starts, ends)).
+        """
+        columns = getattr(words, "columns", None)
+        if columns is not None:
+            return columns()
+        return (
+            [str(w.get("w", "")) for w in words],
+            [float(w.get("s", 0.0) or 0.0) for w in words],
+            [float(w.get("e", 0.0) or 0.0) for w in words],
+        )
+
+    @staticmethod
+    def _assign_words(word_starts, word_ends, sentences: List[dict]) -> List[List[int]]:
+        """
+        Groups word indices by the sentence whose time interval contains them.
+
+        :param word_starts: Word start times, in time order.
+        :param word_ends: Word end times.
+        :param sentences: Whisper sentences in time order.
+        :return: For each sentence, the indices of its words.
+        """
+        groups: List[List[int]] = [[] for _ in sentences]
+        if not sentences:
+            return groups
+        # Sentence boundaries are rounded to 10 ms; compare against the word midpoint
+        starts = [float(s.get("start", 0.0)) for s in sentences]
+        for i, (word_start, word_end) in enumerate(zip(word_starts, word_ends)):
+            mid = (float(word_start) + float(word_end)) / 2
+            groups[max(0, bisect.bisect_right(starts, mid) - 1)].append(i)
+        return groups
+
+    def _search(self, prepared: PreparedText):
+        """
+        Runs the compiled matcher over prepared (normalized) sentences.
+
+        :param prepared: The sentences to search.
+        :return: Matches in sentence order.
+        """
+        return self._matcher.search(prepared)
 
+    @staticmethod
+    def _format_results(sentences: List[str], matches, offsets: Optional[List[int]] = None) -> List[Dict[str, object]]:
+        """
+        Groups matches per sentence into the flag_words output structure.
+
+        :param sentences: The searched sentences.
+        :param matches: Matches from the pattern matcher (in sentence order).
+        :param offsets: Character offset of each sentence if match offsets are absolute.
+        """
+        flagged_results = []
+        current = None
+        for match in matches:
+            sentence = sentences[match.doc_index]
+            if current is None or current["sentence_index"] != match.doc_index:
+                current = {
+                    "sentence_index": match.doc_index,
+                    "sentence_text": sentence,
+                    "flagged_words": []
+                }
+                flagged_results.append(current)
+            base = offsets[match.doc_index] if offsets is not None else 0
+            current["flagged_words"].append({
+                "word_index": match.first_token,
+                "flagged_word": sentence[match.char_start - base:match.char_end - base],
+                "matched_entry": match.pattern,
+                "char_start": match.char_start,
+                "char_end": match.char_end
+            })
         return flagged_results
 
+    def set_words(self, words: Iterable[str]) -> None:
+        """
+        Replaces the whole vocabulary (and recompiles the matcher once).
+
+        :param words: The new list of entries.
+        """
+        self.bad_words = {normalize_entry(w) for w in words if normalize_entry(w)}
+        self._matcher = PatternMatcher(self.bad_words)
+
+    def add_words(self, words: Iterable[str]) -> int:
+        """
+        Adds several entries at once (no logging, one lazy matcher rebuild).
+
+        :param words: The entries to add (will be normalized).
+        :return: The number of entries that were not present yet.
+        """
+        added = 0
+        for word in words:
+            normalized_word = normalize_entry(word)
+            if normalized_word and normalized_word not in self.bad_words:
+                self.bad_words.add(normalized_word)
+                self._matcher.add(normalized_word)
+                added += 1
+        return added
+
+    def remove_words(self, words: Iterable[str]) -> int:
+        """
+        Removes several entries at once (no logging).
+
+        :param words: The entries to remove (will be normalized).
+        :return: The number of entries that were present.
+        """
+        removed = 0
+        for word in words:
+            normalized_word = normalize_entry(word)
+            if normalized_word in self.bad_words:
+                self.bad_words.remove(normalized_word)
+                self._matcher.remove(normalized_word)
+                removed += 1
+        return removed
+
     def add_word(self, word: str) -> None:
         """
         Adds a word to the vocabulary filter.
 
-        :param word: The word to add (will be normalized).
+        :param word: The word or phrase to add (will be normalized; "*" suffix = prefix match).
         """
-        normalized_word = self._normalize_word(word)
+        normalized_word = normalize_entry(word)
         self.bad_words.add(normalized_word)
-        print(f"✅ Added '{normalized_word}' to vocabulary filter (total: {len(self.bad_words)} words)")
+        self._matcher.add(normalized_word)
+        logger.debug("✅ Added '%s' to vocabulary filter (total: %d words)", normalized_word, len(self.bad_words))
 
     def remove_word(self, word: str) -> None:
         """
         Removes a word from the vocabulary filter.
 
-        :param word: The word to remove (will be normalized).
+        :param word: The word or phrase to remove (will be normalized).
         """
-        normalized_word = self._normalize_word(word)
+        normalized_word = normalize_entry(word)
         if normalized_word in self.bad_words:
             self.bad_words.remove(normalized_word)
-            print(f"✅ Removed '{normalized_word}' from vocabulary filter (total: {len(self.bad_words)} words)")
+            self._matcher.remove(normalized_word)
+            logger.debug("✅ Removed '%s' from vocabulary filter (total: %d words)", normalized_word, len(self.bad_words))
         else:
-            print(f"⚠️ Word '{normalized_word}' not found in vocabulary filter")
+            logger.warning("⚠️ Word '%s' not found in vocabulary filter", normalized_word)
 
     @staticmethod
-    def _split_into_sentences(text: str) -> List[str]:
+    def _sentence_spans(text: str) -> List[tuple]:
+        """
+        Character spans (start, end) of the sentences in the text, whitespace-trimmed.
+
+        :param text: The text to split.
+        :return: A list of (start, end) offsets.
+        """
+        spans = []
+        start = 0
+        for m in _SENTENCE_END.finditer(text):
+            spans.append((start, m.start()))
+            start = m.end()
+        spans.append((start, len(text)))
+
+        trimmed = []
+        for start, end in spans:
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start < end:
+                trimmed.append((start, end))
+        return trimmed
+
+    @classmethod
+    def _split_into_sentences(cls, text: str) -> List[str]:
         """
         Splits the text into sentences using common sentence-ending punctuations.
 
         :param text: The text to split.
         :return: A list of sentences.
         """
-        import re
-        sentence_endings = re.compile(r'[.!?]')
-        return [sentence.strip() for sentence in sentence_endings.split(text) if sentence.strip()]
+        return [text[start:end] for start, end in cls._sentence_spans(text)]
 
     @staticmethod
     def _normalize_word(word: str) -> str:
@@ -92,3 +300,32 @@ class WordFlagger:
         :return: The normalized word.
         """
         return word.strip(string.punctuation).lower()
+
+
+class LayeredWordFlagger(WordFlagger):
+    """
+    A vocabulary profile: a shared base flagger plus per-profile added and excluded entries.
+
+    Only the (small) additions are compiled into a matcher of their own; the base matcher is
+    shared by every profile layered on it and both are searched over the same prepared text,
+    so flagging cost does not depend on the number of profiles. Instances are snapshots:
+    the vocabulary store builds a new one when the profile or the base changes.
+    """
+
+    def __init__(self, base: WordFlagger, added: Iterable[str] = (), excluded: Iterable[str] = ()):
+        """
+        :param base: The shared flagger (not copied, not modified).
+        :param added: Entries flagged for this profile only.
+        :param excluded: Base entries this profile does not flag.
+        """
+        super().__init__(words=added)
+        self.base = base
+        self.added = frozenset(self.bad_words)
+        self.excluded = frozenset(normalize_entry(w) for w in excluded) - self.added
+        self.bad_words = (base.bad_words - self.excluded) | self.added
+
+    def _search(self, prepared: PreparedText):
+        return search_layers(prepared, [
+            (self.base._matcher, self.excluded),
+            (self._matcher, None),
+        ])
@@ -0,0 +1,641 @@
+"""
+Offline batch processing of media files: transcription, vocabulary flagging and extremism
+analysis, without the HTTP server.
+
+Inputs are files, directories (walked recursively for media extensions) and manifests
+(``--manifest``: one path per line, or JSON lines with a ``path`` field). Files are
+processed as a pipeline:
+
+    hash      SHA-256 of the file (the media_id), in a thread
+    ASR       decode + language ID + Whisper in a pool of worker processes; each worker
+              keeps its models loaded for the whole run (--asr-workers)
+    analysis  flagging and the LLM detector on the event loop, several files at a time
+              (--analysis-concurrency), while the workers transcribe the next files
+    output    results.jsonl (one line per file), srt/<name>.<id>.srt and/or a Parquet
+              table of sentences (--formats), written as files complete
+
+Files waiting for analysis hold their ASR slot, so a slow analysis stage throttles ASR
+instead of piling up transcripts in memory.
+
+With --llm-mode batch the LLM analysis is deferred instead: every file is transcribed
+first, then the sentences of the whole corpus go through the provider's Batch API stage by
+stage (src/ai/batch_api.py; batch pricing, no online rate limits, results within the
+completion window), and the outputs are written once the batches are done. Transcripts are
+held in memory until then. Batch state is kept in <out>/batch_api/, so a re-run of the same
+files resumes the submitted batches. Sentence analysis mode only.
+
+Progress is appended to <out>/progress.jsonl. A re-run skips files already done, by path,
+size and mtime without reading them, or by content hash (a copy of a processed file is not
+processed again). Failed files are retried. After a crash between the two writes a file
+can appear twice in results.jsonl; the last line per media_id wins.
+
+Throughput is logged every --report-s seconds and at the end as audio hours processed per
+wall-clock hour; the final summary is also written to <out>/summary.json.
+
+Usage:
+    python -m src.backend.batch_cli INPUT [INPUT ...] --out DIR [--manifest FILE]
+        [--asr-profile fast] [--asr-workers 2] [--analysis-concurrency 2]
+        [--analysis-mode sentence] [--llm-mode online] [--formats jsonl,srt,parquet]
+        [--no-analysis]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for --formats parquet
+    pa = pq = None
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.backend.aggregation import (  # noqa: E402
+    DIMENSIONS,
+    aggregate_overall_scores,
+    build_processed_sentences,
+    build_score_matrix,
+    index_results,
+)
+from src.backend.observability import configure_logging, get_logger  # noqa: E402
+from transcriber.cache import hash_file  # noqa: E402
+from transcriber.language import analysis_supported  # noqa: E402
+from transcriber.profiles import get_profile  # noqa: E402
+
+__all__ = ["discover", "BatchProgress", "BatchRunner", "main"]
+
+logger = get_logger(__name__)
+
+MEDIA_EXTENSIONS = frozenset(
+    ".wav .mp3 .m4a .aac .flac .ogg .oga .opus .wma .amr .aiff .aif "
+    ".mp4 .m4v .mov .mkv .webm .avi .wmv .flv .mpg .mpeg .ts .3gp".split()
+)
+OUTPUT_FORMATS = ("jsonl", "srt", "parquet")
+LLM_MODES = ("online", "batch")
+
+# Speech the (English) analysis does not support: "skip" or "llm" (see backend/main.py)
+UNSUPPORTED_LANGUAGE_POLICY = os.environ.get("UNSUPPORTED_LANGUAGE_POLICY", "skip")
+
+# Sentences buffered per Parquet row group
+_PARQUET_ROWS = 10000
+
+
+# ----------------------------
+# Inputs
+# ----------------------------
+def _read_manifest(path: str) -> Iterator[str]:
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line)["path"] if line.startswith("{") else line
+            yield entry if os.path.isabs(entry) else os.path.join(base, entry)
+
+
+def discover(inputs: Iterable[str], manifests: Iterable[str] = ()) -> List[str]:
+    """
+    Media files from paths, directories and manifests, deduplicated, in a stable order.
+
+    :param inputs: Files (taken as given) and directories (walked for MEDIA_EXTENSIONS).
+    :param manifests: Manifest files; relative entries are relative to the manifest.
+    :return: Absolute paths.
+    """
+    found: Dict[str, None] = {}
+    candidates: List[str] = list(inputs)
+    for manifest in manifests:
+        candidates.extend(_read_manifest(manifest))
+    for candidate in candidates:
+        if os.path.isdir(candidate):
+            for root, dirs, files in os.walk(candidate):
+                dirs.sort()
+                for name in sorted(files):
+                    if Path(name).suffix.lower() in MEDIA_EXTENSIONS:
+                        found[os.path.abspath(os.path.join(root, name))] = None
+        elif os.path.isfile(candidate):
+            found[os.path.abspath(candidate)] = None
+        else:
+            logger.warning("⚠️ Input not found: %s", candidate)
+    return list(found)
+
+
+# ----------------------------
+# Progress (resume)
+# ----------------------------
+class BatchProgress:
+    """
+    Append-only progress log; files done in earlier runs are known by content hash and by
+    (path, size, mtime).
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: The progress JSONL file (created if missing).
+        """
+        self.path = path
+        self.done_hashes: Set[str] = set()
+        self._done_stats: Dict[str, Tuple[int, float]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    if entry.get("status") == "done":
+                        self.done_hashes.add(entry["media_id"])
+                        self._done_stats[entry["path"]] = (entry.get("size"), entry.get("mtime"))
+        self._file = open(path, "a", encoding="utf-8")
+
+    def is_done(self, path: str, stat: os.stat_result) -> bool:
+        """True if this exact file (same path, size and mtime) was processed before."""
+        return self._done_stats.get(path) == (stat.st_size, stat.st_mtime)
+
+    def record(self, path: str, stat: os.stat_result, media_id: Optional[str], status: str, **extra: Any) -> None:
+        entry = {"path": path, "size": stat.st_size, "mtime": stat.st_mtime, "media_id": media_id, "status": status}
+        entry.update(extra)
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if status == "done":
+            self.done_hashes.add(media_id)
+            self._done_stats[path] = (stat.st_size, stat.st_mtime)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+# ----------------------------
+# ASR worker (runs in the process pool)
+# ----------------------------
+def _init_worker(log_level: str) -> None:
+    configure_logging(log_level)
+
+
+def _transcribe_job(path: str, media_id: str, asr_profile: str, use_cache: bool) -> Dict[str, Any]:
+    """Transcribe one file in a worker process; models stay loaded between jobs."""
+    from transcriber.media_probe import probe
+    from transcriber.transcribe import transcribe_file
+
+    try:
+        duration_s = probe(path).duration_s
+    except RuntimeError:
+        duration_s = None  # transcribe_file reports the real problem
+    t0 = time.perf_counter()
+    result = transcribe_file(
+        path, return_words=True, columnar_words=True, content_hash=media_id,
+        profile=asr_profile, use_cache=use_cache,
+    )
+    words = result.get("words")
+    if duration_s is None and words is not None and len(words):
+        duration_s = float(words.ends[-1])
+    result["duration_s"] = duration_s
+    result["asr_s"] = time.perf_counter() - t0
+    return result
+
+
+# ----------------------------
+# Outputs
+# ----------------------------
+class _ParquetSink:
+    """Sentence rows of a run, written in row groups to one Parquet file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        fields = [
+            ("media_id", pa.string()), ("path", pa.string()), ("sentence", pa.int32()),
+            ("start", pa.float64()), ("end", pa.float64()), ("text", pa.string()),
+            ("category", pa.string()), ("level", pa.string()), ("flagged", pa.bool_()),
+        ]
+        fields += [(dimension, pa.float32()) for dimension in DIMENSIONS]
+        self.schema = pa.schema(fields)
+        self._rows: Dict[str, list] = {name: [] for name in self.schema.names}
+        self._writer = None
+
+    def add(self, media_id: str, path: str, processed: List[dict], scores: np.ndarray) -> None:
+        # Without analysis (--no-analysis) these are the bare transcript sentences: the
+        # analysis columns are null
+        for idx, sentence in enumerate(processed):
+            self._rows["media_id"].append(media_id)
+            self._rows["path"].append(path)
+            self._rows["sentence"].append(idx)
+            self._rows["start"].append(float(sentence["start"]))
+            self._rows["end"].append(float(sentence["end"]))
+            self._rows["text"].append(sentence["text"])
+            self._rows["category"].append(sentence.get("category"))
+            self._rows["level"].append(sentence.get("level"))
+            categories = sentence.get("categories")
+            self._rows["flagged"].append(None if categories is None else "Vocabulary Filter" in categories)
+            for col, dimension in enumerate(DIMENSIONS):
+                value = scores[idx, col] if idx < len(scores) else np.nan
+                self._rows[dimension].append(None if np.isnan(value) else float(value))
+        if len(self._rows["media_id"]) >= _PARQUET_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._rows["media_id"]:
+            return
+        table = pa.table(self._rows, schema=self.schema)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression="zstd")
+        self._writer.write_table(table)
+        self._rows = {name: [] for name in self.schema.names}
+
+    def close(self) -> None:
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+# ----------------------------
+# Pipeline
+# ----------------------------
+class BatchRunner:
+    """
+    Runs the decode → ASR → analysis → output pipeline over a list of files.
+    """
+
+    def __init__(
+        self,
+        out_dir: str,
+        asr_profile: Optional[str] = None,
+        asr_workers: int = 1,
+        analysis_concurrency: int = 2,
+        analysis_mode: str = "sentence",
+        llm_mode: str = "online",
+        vocabulary_profile: Optional[str] = None,
+        formats: Iterable[str] = ("jsonl",),
+        analyze: bool = True,
+        use_cache: bool = True,
+        report_s: float = 30.0,
+    ):
+        """
+        :param out_dir: Output directory (progress, results, SRT, Parquet, summary).
+        :param asr_profile: Transcription profile (see transcriber/profiles.py).
+        :param asr_workers: ASR worker processes; each loads its own Whisper model.
+        :param analysis_concurrency: Files analyzed at the same time.
+        :param analysis_mode: "sentence" or "window" (see /process-media/).
+        :param llm_mode: "online" (analyze files as they are transcribed) or "batch" (one
+            deferred Batch API run over the whole corpus, sentence mode only).
+        :param vocabulary_profile: Vocabulary filter profile; the shared list by default.
+        :param formats: Any of OUTPUT_FORMATS.
+        :param analyze: Run flagging and the LLM analysis (otherwise transcripts only).
+        :param use_cache: Use the transcript cache.
+        :param report_s: Seconds between throughput log lines.
+        """
+        formats = set(formats)
+        unknown = formats - set(OUTPUT_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown output formats: {', '.join(sorted(unknown))}")
+        if "parquet" in formats and pa is None:
+            raise ValueError("--formats parquet needs pyarrow (pip install pyarrow)")
+        if analysis_mode not in ("sentence", "window"):
+            raise ValueError(f"Unsupported analysis_mode: {analysis_mode}")
+        if llm_mode not in LLM_MODES:
+            raise ValueError(f"Unsupported llm_mode: {llm_mode}")
+        if llm_mode == "batch" and analysis_mode != "sentence":
+            raise ValueError("--llm-mode batch supports --analysis-mode sentence only")
+        self.out_dir = os.path.abspath(out_dir)
+        self.asr_profile = get_profile(asr_profile).name
+        self.asr_workers = max(1, asr_workers)
+        self.analysis_concurrency = max(1, analysis_concurrency)
+        self.analysis_mode = analysis_mode
+        self.llm_mode = llm_mode
+        self.vocabulary_profile = vocabulary_profile
+        self.formats = formats
+        self.analyze = analyze
+        self.use_cache = use_cache
+        self.report_s = report_s
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        self._flagger = None
+        self._detectors: Dict[str, Any] = {}
+        self._in_flight: Set[str] = set()
+        self._deferred: List[Dict[str, Any]] = []
+        self._stats = {"files": 0, "done": 0, "skipped": 0, "failed": 0, "audio_s": 0.0, "asr_s": 0.0, "sentences": 0}
+
+    # ---- analysis -------------------------------------------------------
+    def _detector_for(self, language: Optional[str]):
+        from src.ai.extremist_batch_two import HierarchicalExtremismDetector
+
+        if analysis_supported(language):
+            key = "default"
+        elif UNSUPPORTED_LANGUAGE_POLICY == "llm":
+            key = "llm"
+        else:
+            return None
+        if key not in self._detectors:
+            engines = {"stage1_engine": "llm", "stage2_engine": "llm"} if key == "llm" else {}
+            detector = HierarchicalExtremismDetector(**engines)
+            detector._verbose = False
+            self._detectors[key] = detector
+        return self._detectors[key]
+
+    @staticmethod
+    def _analysis_input(sentences: List[dict]) -> List[Dict[str, Any]]:
+        return [
+            {"id": idx, "text": s.get("text", "").strip()}
+            for idx, s in enumerate(sentences)
+            if s.get("text", "").strip()
+        ]
+
+    async def _analyze(self, transcript: Dict[str, Any], batch_results: Optional[List[dict]] = None) -> Dict[str, Any]:
+        """
+        :param transcript: Result of ``_transcribe_job``.
+        :param batch_results: Detector results from the Batch API (--llm-mode batch); the
+            detector is called here when not given.
+        """
+        sentences = transcript.get("sentences", [])
+        words = transcript.get("words") or []
+        flagged_words = self._flagger.flag_word_stream(words, sentences)
+        batch_input = self._analysis_input(sentences)
+        detector = self._detector_for(transcript.get("language"))
+        if detector is None or not batch_input:
+            batch_results = []
+        elif batch_results is not None:
+            pass  # analyzed with the corpus through the Batch API
+        elif self.analysis_mode == "window":
+            batch_results = await detector._batch_analyze_windowed_async(batch_input)
+        else:
+            batch_results = await detector._batch_analyze_async(batch_input)
+        results_by_id = index_results(batch_results)
+        scores = build_score_matrix(len(sentences), results_by_id)
+        processed = build_processed_sentences(
+            sentences, results_by_id, scores,
+            flagged_sentence_ids=(entry["sentence_index"] for entry in flagged_words),
+        )
+        return {
+            "analysis_skipped": detector is None,
+            "transcription": processed,
+            "flagged_words": flagged_words,
+            "scores": aggregate_overall_scores(scores),
+            "_scores": scores,
+        }
+
+    # ---- outputs ----------------------------------------------------------
+    def _write(self, path: str, media_id: str, transcript: Dict[str, Any], analysis: Optional[Dict[str, Any]]) -> None:
+        sentences = analysis["transcription"] if analysis is not None else transcript.get("sentences", [])
+        if "jsonl" in self.formats:
+            record = {
+                "media_id": media_id,
+                "path": path,
+                "language": transcript.get("language"),
+                "duration_s": transcript.get("duration_s"),
+                "asr_profile": self.asr_profile,
+                "transcription": sentences,
+            }
+            if analysis is not None:
+                record.update(
+                    analysis_skipped=analysis["analysis_skipped"],
+                    flagged_words=analysis["flagged_words"],
+                    scores=analysis["scores"],
+                )
+            self._results.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._results.flush()
+        if "srt" in self.formats:
+            from transcriber.transcribe import save_srt
+            save_srt(sentences, os.path.join(self.out_dir, "srt", f"{Path(path).stem}.{media_id[:12]}.srt"))
+        if self._parquet is not None:
+            scores = analysis["_scores"] if analysis is not None else np.full((len(sentences), len(DIMENSIONS)), np.nan)
+            self._parquet.add(media_id, path, sentences, scores)
+
+    async def _analyze_deferred(self) -> None:
+        """Analyze the transcribed files through the Batch API, one corpus per detector, and write them."""
+        from src.ai.batch_api import BatchAPIAnalyzer
+
+        groups: Dict[int, Tuple[Any, List[Dict[str, Any]]]] = {}
+        for job in self._deferred:
+            detector = self._detector_for(job["transcript"].get("language"))
+            if detector is not None:
+                groups.setdefault(id(detector), (detector, []))[1].append(job)
+
+        results: Dict[str, List[dict]] = {}
+        try:
+            for detector, jobs in groups.values():
+                corpus = [
+                    {"id": f"{job['media_id']}:{item['id']}", "text": item["text"]}
+                    for job in jobs
+                    for item in self._analysis_input(job["transcript"].get("sentences", []))
+                ]
+                if not corpus:
+                    continue
+                logger.info("🧾 Deferred analysis of %d files (%d sentences)", len(jobs), len(corpus))
+                analyzer = BatchAPIAnalyzer(detector, os.path.join(self.out_dir, "batch_api"))
+                for result in await asyncio.to_thread(analyzer.analyze, corpus):
+                    media_id, _, idx = result["text_id"].rpartition(":")
+                    results.setdefault(media_id, []).append(dict(result, text_id=int(idx)))
+        except Exception as e:
+            # Nothing is recorded as done; a re-run resumes the submitted batches
+            logger.error("❌ Batch API analysis failed: %s: %s", type(e).__name__, e)
+            for job in self._deferred:
+                self._fail(job["path"], job["stat"], job["media_id"], e)
+            return
+
+        for job in self._deferred:
+            try:
+                analysis = await self._analyze(job["transcript"], results.get(job["media_id"], []))
+                self._write(job["path"], job["media_id"], job["transcript"], analysis)
+            except Exception as e:
+                self._fail(job["path"], job["stat"], job["media_id"], e)
+            else:
+                self._done(job["path"], job["stat"], job["media_id"], job["transcript"])
+
+    # ---- pipeline ---------------------------------------------------------
+    def _fail(self, path: str, stat: os.stat_result, media_id: Optional[str], error: Exception) -> None:
+        logger.error("❌ %s: %s: %s", path, type(error).__name__, error)
+        self._stats["failed"] += 1
+        self._progress.record(path, stat, media_id, "failed", error=f"{type(error).__name__}: {error}")
+
+    def _done(self, path: str, stat: os.stat_result, media_id: str, transcript: Dict[str, Any]) -> None:
+        duration_s = transcript.get("duration_s") or 0.0
+        self._stats["done"] += 1
+        self._stats["audio_s"] += duration_s
+        self._stats["asr_s"] += transcript.get("asr_s", 0.0)
+        self._stats["sentences"] += len(transcript.get("sentences", []))
+        self._progress.record(
+            path, stat, media_id, "done", duration_s=duration_s, language=transcript.get("language"),
+            sentences=len(transcript.get("sentences", [])),
+        )
+
+    async def _process(self, path: str, pool: ProcessPoolExecutor,
+                       asr_slots: asyncio.Semaphore, analysis_slots: asyncio.Semaphore) -> None:
+        loop = asyncio.get_running_loop()
+        stat = os.stat(path)
+        media_id = None
+        added = deferred = False
+        try:
+            async with asr_slots:
+                media_id = await asyncio.to_thread(hash_file, path)
+                if media_id in self._progress.done_hashes or media_id in self._in_flight:
+                    logger.info("⏭️ Already processed (same content): %s", path)
+                    self._stats["skipped"] += 1
+                    return
+                self._in_flight.add(media_id)
+                added = True
+                transcript = await loop.run_in_executor(
+                    pool, _transcribe_job, path, media_id, self.asr_profile, self.use_cache
+                )
+                if self.analyze and self.llm_mode == "batch":
+                    # Analyzed with the whole corpus after ASR (stays in flight for deduplication)
+                    self._deferred.append({"path": path, "stat": stat, "media_id": media_id, "transcript": transcript})
+                    deferred = True
+                    return
+                # Keep the ASR slot until analysis can start (backpressure)
+                if self.analyze:
+                    await analysis_slots.acquire()
+            analysis = None
+            if self.analyze:
+                try:
+                    analysis = await self._analyze(transcript)
+                finally:
+                    analysis_slots.release()
+            self._write(path, media_id, transcript, analysis)
+        except (ImportError, BrokenProcessPool):
+            raise  # missing faster-whisper, or a worker died: every remaining file would fail
+        except Exception as e:
+            self._fail(path, stat, media_id, e)
+            return
+        finally:
+            # Only the task that claimed the content hash releases it
+            if added and not deferred:
+                self._in_flight.discard(media_id)
+        self._done(path, stat, media_id, transcript)
+
+    def summary(self, elapsed_s: float) -> Dict[str, Any]:
+        audio_h = self._stats["audio_s"] / 3600
+        return {
+            **self._stats,
+            "run_id": self.run_id,
+            "elapsed_s": round(elapsed_s, 1),
+            "audio_hours": round(audio_h, 3),
+            # Audio hours processed per wall-clock hour (= x realtime)
+            "audio_hours_per_hour": round(audio_h / (elapsed_s / 3600), 2) if elapsed_s > 0 else None,
+            "asr_workers": self.asr_workers,
+            "asr_profile": self.asr_profile,
+        }
+
+    async def _report(self, start: float) -> None:
+        while True:
+            await asyncio.sleep(self.report_s)
+            s = self.summary(time.perf_counter() - start)
+            logger.info(
+                "📊 %d/%d files (%d skipped, %d failed), %.2f audio h in %.0f s: %.1f audio h/h",
+                s["done"], s["files"], s["skipped"], s["failed"], s["audio_hours"], s["elapsed_s"],
+                s["audio_hours_per_hour"] or 0.0,
+            )
+
+    async def run(self, paths: List[str]) -> Dict[str, Any]:
+        """
+        Process ``paths`` and return the run summary.
+
+        :param paths: Media files (see ``discover``).
+        :return: Counts, audio hours and audio hours per wall-clock hour.
+        """
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._progress = BatchProgress(os.path.join(self.out_dir, "progress.jsonl"))
+        self._results = open(os.path.join(self.out_dir, "results.jsonl"), "a", encoding="utf-8")
+        self._parquet = (
+            _ParquetSink(os.path.join(self.out_dir, f"sentences-{self.run_id}.parquet"))
+            if "parquet" in self.formats else None
+        )
+        if self.analyze:
+            from src.backend.vocabulary_store import VocabularyStore
+            self._flagger = VocabularyStore().flagger(self.vocabulary_profile)
+
+        todo = []
+        for path in paths:
+            if self._progress.is_done(path, os.stat(path)):
+                self._stats["skipped"] += 1
+            else:
+                todo.append(path)
+        self._stats["files"] = len(paths)
+        logger.info("📂 %d files, %d already processed, %d to do", len(paths), len(paths) - len(todo), len(todo))
+
+        start = time.perf_counter()
+        reporter = asyncio.ensure_future(self._report(start))
+        # Spawned workers: forking a process with loaded CTranslate2 / OpenMP threads is unsafe
+        pool = ProcessPoolExecutor(
+            self.asr_workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker, initargs=(os.environ.get("LOG_LEVEL", "INFO"),),
+        )
+        # Twice the workers: the next file is hashed and queued while the current one decodes
+        asr_slots = asyncio.Semaphore(self.asr_workers * 2)
+        analysis_slots = asyncio.Semaphore(self.analysis_concurrency)
+        try:
+            await asyncio.gather(*(self._process(path, pool, asr_slots, analysis_slots) for path in todo))
+            if self._deferred:
+                pool.shutdown(wait=True)  # free the ASR workers' memory during the batch wait
+                await self._analyze_deferred()
+        finally:
+            reporter.cancel()
+            pool.shutdown(wait=True, cancel_futures=True)
+            self._results.close()
+            self._progress.close()
+            if self._parquet is not None:
+                self._parquet.close()
+
+        summary = self.summary(time.perf_counter() - start)
+        with open(os.path.join(self.out_dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", help="media files and directories")
+    parser.add_argument("--manifest", action="append", default=[], help="file listing media paths (repeatable)")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--asr-profile", default=None, help="fast | balanced | accurate (default: env ASR_PROFILE)")
+    parser.add_argument("--asr-workers", type=int, default=1, help="ASR processes (each loads a model)")
+    parser.add_argument("--analysis-concurrency", type=int, default=2, help="files analyzed at once")
+    parser.add_argument("--analysis-mode", default=os.environ.get("ANALYSIS_MODE", "sentence"))
+    parser.add_argument("--llm-mode", default="online", choices=LLM_MODES,
+                        help="batch: deferred Batch API analysis of the whole corpus after ASR")
+    parser.add_argument("--vocabulary-profile", default=None)
+    parser.add_argument("--formats", default="jsonl", help=f"comma-separated: {', '.join(OUTPUT_FORMATS)}")
+    parser.add_argument("--no-analysis", action="store_true", help="transcribe only")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the transcript cache")
+    parser.add_argument("--report-s", type=float, default=30.0, help="seconds between throughput reports")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    paths = discover(args.inputs, args.manifest)
+    if not paths:
+        parser.error("no media files found")
+    try:
+        runner = BatchRunner(
+            args.out,
+            asr_profile=args.asr_profile,
+            asr_workers=args.asr_workers,
+            analysis_concurrency=args.analysis_concurrency,
+            analysis_mode=args.analysis_mode,
+            llm_mode=args.llm_mode,
+            vocabulary_profile=args.vocabulary_profile,
+            formats=[f.strip() for f in args.formats.split(",") if f.strip()],
+            analyze=not args.no_analysis,
+            use_cache=not args.no_cache,
+            report_s=args.report_s,
+        )
+        summary = asyncio.run(runner.run(paths))
+    except (ValueError, RuntimeError) as e:
+        parser.error(str(e))
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Debug / audit sink for /process-media/ results.
+
+Records are sampled, serialized as compact JSON lines, compressed (zstd when the
+``zstandard`` package is installed, gzip otherwise) and written by a single background
+thread, so the request path only pays for a queue put. Every file gets a unique name,
+and old files are pruned by age and by total directory size after each write.
+"""
+
+import gzip
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+from src.backend.observability import get_logger
+
+__all__ = ["DebugSink"]
+
+logger = get_logger(__name__)
+
+DEFAULT_SAMPLE_RATE = float(os.environ.get("DEBUG_SAMPLE_RATE", "0.01"))
+DEFAULT_MAX_MB = float(os.environ.get("DEBUG_MAX_MB", "512"))
+DEFAULT_MAX_AGE_DAYS = float(os.environ.get("DEBUG_MAX_AGE_DAYS", "7"))
+DEFAULT_COMPRESSION = os.environ.get("DEBUG_COMPRESSION", "zstd")  # "zstd"|"gzip"|"none"
+
+_EXTENSIONS = {"zstd": ".jsonl.zst", "gzip": ".jsonl.gz", "none": ".jsonl"}
+
+
+class DebugSink:
+    """
+    Non-blocking, sampled writer for debug artifacts with size- and age-based retention.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        max_bytes: int = int(DEFAULT_MAX_MB * 1024 * 1024),
+        max_age_s: float = DEFAULT_MAX_AGE_DAYS * 86400,
+        compression: str = DEFAULT_COMPRESSION,
+    ):
+        """
+        :param directory: Output directory (created on first write).
+        :param sample_rate: Fraction of records to keep (0 disables, 1 keeps all).
+        :param max_bytes: Total size budget of the directory; oldest files are removed first.
+        :param max_age_s: Files older than this are removed.
+        :param compression: "zstd", "gzip" or "none". Falls back to gzip if zstd is unavailable.
+        """
+        if compression == "zstd" and zstandard is None:
+            compression = "gzip"
+        if compression not in _EXTENSIONS:
+            raise ValueError(f"Unsupported debug compression: {compression}")
+        self.directory = os.path.abspath(directory)
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.compression = compression
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-sink")
+        self._lock = threading.Lock()
+
+    def submit(self, record: dict, force: bool = False) -> Optional[str]:
+        """
+        Queue a record for writing; returns immediately.
+
+        :param record: JSON-serializable dict. It must not be mutated after submission.
+        :param force: Bypass sampling (e.g. for errors).
+        :return: The path the record will be written to, or None if it was not sampled.
+        """
+        if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return None
+        timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"analysis_{timestamp_str}_{uuid.uuid4().hex[:12]}{_EXTENSIONS[self.compression]}"
+        path = os.path.join(self.directory, filename)
+        self._executor.submit(self._write, path, record)
+        return path
+
+    def close(self) -> None:
+        """Flush pending writes and stop the worker thread."""
+        self._executor.shutdown(wait=True)
+
+    # ----------------------------
+    # Worker thread
+    # ----------------------------
+    def _write(self, path: str, record: dict) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            payload = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+            data = (payload + "\n").encode("utf-8")
+            if self.compression == "zstd":
+                data = zstandard.ZstdCompressor(level=3).compress(data)
+            elif self.compression == "gzip":
+                data = gzip.compress(data, compresslevel=5)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._prune()
+        except Exception as e:
+            logger.warning("⚠️ Debug sink write failed (%s): %s", path, e)
+
+    def _prune(self) -> None:
+        """Remove files older than max_age_s, then oldest files until under max_bytes."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.is_file() or not entry.name.startswith("analysis_"):
+                        continue
+                    st = entry.stat()
+                    if self.max_age_s and now - st.st_mtime > self.max_age_s:
+                        self._remove(entry.path)
+                    else:
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            if self.max_bytes and total > self.max_bytes:
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_bytes:
+                        break
+                    self._remove(path)
+                    total -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,166 @@
+"""
+Content-addressed store for uploaded media.
+
+/process-media/ keeps the uploaded file so later requests (e.g. /redact) can refer to it
+by ``media_id`` (the SHA-256 of the content) instead of uploading it again. Re-uploading
+the same file is a no-op. Files are pruned by age and by total size, oldest first.
+
+Configuration (environment):
+    MEDIA_STORE_DIR            directory (default: backend/media_store)
+    MEDIA_STORE_MAX_MB         total size budget
+    MEDIA_STORE_MAX_AGE_DAYS   files not used for this long are removed
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+__all__ = ["MediaStore", "media_id_for"]
+
+DEFAULT_MEDIA_DIR = os.environ.get(
+    "MEDIA_STORE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend", "media_store")),
+)
+DEFAULT_MAX_MB = float(os.environ.get("MEDIA_STORE_MAX_MB", "4096"))
+DEFAULT_MAX_AGE_DAYS = float(os.environ.get("MEDIA_STORE_MAX_AGE_DAYS", "3"))
+
+_MEDIA_ID = re.compile(r"^[0-9a-f]{64}$")
+_SUFFIX = re.compile(r"^\.[A-Za-z0-9]{1,8}$")
+
+
+def media_id_for(data: bytes) -> str:
+    """The media id of some content (hex SHA-256)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class MediaStore:
+    """
+    Stores media files as ``<media_id><suffix>`` with size- and age-based retention.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_MEDIA_DIR,
+        max_bytes: int = int(DEFAULT_MAX_MB * 1024 * 1024),
+        max_age_s: float = DEFAULT_MAX_AGE_DAYS * 86400,
+    ):
+        """
+        :param directory: Storage directory (created on first write).
+        :param max_bytes: Total size budget; least recently used files are removed first.
+        :param max_age_s: Files not used for this long are removed.
+        """
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self._lock = threading.Lock()
+
+    def put(self, data: bytes, filename: str = "") -> str:
+        """
+        Store content (if not stored yet) and return its media id.
+
+        :param data: File content.
+        :param filename: Original filename; only its extension is kept (ffmpeg uses it).
+        """
+        media_id = media_id_for(data)
+        suffix = Path(filename or "").suffix.lower()
+        if not _SUFFIX.match(suffix):
+            suffix = ".bin"
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            existing = self._find(media_id)
+            if existing:
+                os.utime(existing)
+            else:
+                path = os.path.join(self.directory, media_id + suffix)
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            self._prune(keep=media_id)
+        return media_id
+
+    def staging_path(self) -> str:
+        """A fresh temp path inside the store (for streaming an upload in; see adopt)."""
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f".upload-{uuid.uuid4().hex}.tmp")
+
+    def adopt(self, tmp_path: str, media_id: str, filename: str = "") -> str:
+        """
+        Move a fully written staging file into the store (or drop it if the content is
+        already stored). Returns the stored path.
+
+        :param tmp_path: File from staging_path(), already hashed by the caller.
+        :param media_id: SHA-256 of its content.
+        :param filename: Original filename; only its extension is kept.
+        """
+        suffix = Path(filename or "").suffix.lower()
+        if not _SUFFIX.match(suffix):
+            suffix = ".bin"
+        with self._lock:
+            existing = self._find(media_id)
+            if existing:
+                _remove(tmp_path)
+                os.utime(existing)
+                path = existing
+            else:
+                path = os.path.join(self.directory, media_id + suffix)
+                os.replace(tmp_path, path)
+            self._prune(keep=media_id)
+        return path
+
+    def path(self, media_id: str) -> Optional[str]:
+        """Path of stored media, or None if unknown/expired. Refreshes its last-use time."""
+        if not _MEDIA_ID.match(media_id or ""):
+            return None
+        with self._lock:
+            found = self._find(media_id)
+            if found:
+                os.utime(found)
+            return found
+
+    def _find(self, media_id: str) -> Optional[str]:
+        if not os.path.isdir(self.directory):
+            return None
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.startswith(media_id) and not entry.name.endswith(".tmp"):
+                    return entry.path
+        return None
+
+    def _prune(self, keep: str) -> None:
+        """Remove files older than max_age_s, then least recently used until under max_bytes."""
+        now = time.time()
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.startswith(keep):
+                    continue
+                st = entry.stat()
+                if self.max_age_s and now - st.st_mtime > self.max_age_s:
+                    _remove(entry.path)
+                elif not entry.name.endswith(".tmp"):  # uploads still being written
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        kept = self._find(keep)
+        if kept:
+            total += os.path.getsize(kept)
+        if self.max_bytes and total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                _remove(path)
+                total -= size
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
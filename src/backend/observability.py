@@ -0,0 +1,215 @@
+"""
+Tracing spans, Prometheus metrics and leveled logging for the analysis pipeline.
+
+``span("asr")`` opens an OpenTelemetry span (exported only if the deployment configures an
+OpenTelemetry SDK; otherwise the API's no-op tracer still propagates context) and records
+the stage in Prometheus:
+
+    pipeline_stage_seconds{stage}        histogram of stage wall time
+    pipeline_stage_inflight{stage}       stages currently running (queue depth for LLM calls)
+    pipeline_errors_total{stage}         stages that raised
+    llm_tokens_total{stage,kind}         prompt / completion tokens reported by the API
+    cache_events_total{cache,result}     hit / miss per cache
+    llm_responses_total{stage,outcome}   LLM response decoding: ok / repaired / failed / ...
+    llm_hedges_total{stage,outcome}      hedged LLM calls: sent / won / over_budget
+    llm_pool_wait_seconds{client}        time a request waited for an LLM API connection
+    llm_pool_waiting{client}             LLM HTTP requests currently waiting for a connection
+    llm_pool_connections{client,state}   LLM API connections, busy / idle
+    llm_pool_max_connections{client}     the pool's connection limit (utilization = busy / max)
+
+Both libraries are optional: without prometheus_client the metrics are no-ops and
+/metrics reports that; without opentelemetry-api spans only feed the metrics.
+
+Logging goes through the standard ``logging`` module (LOG_LEVEL, default INFO). Verbose
+diagnostics are logged at DEBUG, so in production they cost a level check.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+except ImportError:  # metrics become no-ops
+    CONTENT_TYPE_LATEST = "text/plain; charset=utf-8"
+    Counter = Gauge = Histogram = generate_latest = None
+
+try:
+    from opentelemetry import trace as _otel_trace
+except ImportError:
+    _otel_trace = None
+
+__all__ = [
+    "configure_logging",
+    "get_logger",
+    "span",
+    "record_stage",
+    "record_tokens",
+    "record_cache",
+    "record_decode",
+    "record_hedge",
+    "record_pool_wait",
+    "record_pool_waiting",
+    "record_pool_state",
+    "metrics_payload",
+    "METRICS_ENABLED",
+]
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+METRICS_ENABLED = Counter is not None
+
+# Seconds; LLM calls and ASR dominate the upper buckets
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# Connection pool waits should be ~0; anything in the upper buckets means the pool is the bottleneck
+_POOL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+
+if METRICS_ENABLED:
+    STAGE_SECONDS = Histogram(
+        "pipeline_stage_seconds", "Wall time of a pipeline stage", ["stage"], buckets=_BUCKETS
+    )
+    STAGE_INFLIGHT = Gauge("pipeline_stage_inflight", "Pipeline stages currently running", ["stage"])
+    STAGE_ERRORS = Counter("pipeline_errors_total", "Pipeline stages that raised", ["stage"])
+    LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the LLM API", ["stage", "kind"])
+    CACHE_EVENTS = Counter("cache_events_total", "Cache lookups", ["cache", "result"])
+    LLM_RESPONSES = Counter("llm_responses_total", "LLM responses by decoding outcome", ["stage", "outcome"])
+    LLM_HEDGES = Counter("llm_hedges_total", "Hedged LLM calls by outcome", ["stage", "outcome"])
+    POOL_WAIT = Histogram(
+        "llm_pool_wait_seconds", "Time waiting for an LLM API connection", ["client"], buckets=_POOL_BUCKETS
+    )
+    POOL_WAITING = Gauge("llm_pool_waiting", "LLM HTTP requests waiting for a connection", ["client"])
+    POOL_CONNECTIONS = Gauge("llm_pool_connections", "LLM API connections by state", ["client", "state"])
+    POOL_MAX_CONNECTIONS = Gauge("llm_pool_max_connections", "LLM API connection limit", ["client"])
+else:
+    STAGE_SECONDS = STAGE_INFLIGHT = STAGE_ERRORS = LLM_TOKENS = CACHE_EVENTS = LLM_RESPONSES = _NoopMetric()
+    LLM_HEDGES = POOL_WAIT = POOL_WAITING = POOL_CONNECTIONS = POOL_MAX_CONNECTIONS = _NoopMetric()
+
+_tracer = _otel_trace.get_tracer("extremism-pipeline") if _otel_trace is not None else None
+_logging_configured = False
+
+
+# ----------------------------
+# Logging
+# ----------------------------
+def configure_logging(level: str = LOG_LEVEL) -> None:
+    """Configure the root logger once (no-op if the host app already configured logging)."""
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # The HTTP clients log every LLM request at INFO
+    if logging.getLevelName(level) != logging.DEBUG:
+        for name in ("httpx", "httpx2", "httpcore"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+# ----------------------------
+# Spans and metrics
+# ----------------------------
+@contextmanager
+def span(stage: str, **attributes: Any) -> Iterator[Optional[Any]]:
+    """
+    Time a pipeline stage: OpenTelemetry span (child of the current one) + Prometheus.
+
+    :param stage: Stage name, also the metric label (keep the set small and fixed).
+    :param attributes: Span attributes (e.g. sentences=120, media_id=...).
+    :return: The OpenTelemetry span (or None) for adding attributes/events.
+    """
+    STAGE_INFLIGHT.labels(stage).inc()
+    start = time.perf_counter()
+    try:
+        if _tracer is not None:
+            with _tracer.start_as_current_span(stage, attributes=_span_attributes(attributes)) as otel_span:
+                yield otel_span
+        else:
+            yield None
+    except BaseException:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+        STAGE_INFLIGHT.labels(stage).dec()
+
+
+def _span_attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    # OpenTelemetry attributes must be primitives
+    return {
+        key: value if isinstance(value, (str, bool, int, float)) else str(value)
+        for key, value in attributes.items()
+        if value is not None
+    }
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Record a stage timed elsewhere (e.g. the transcriber's own timings)."""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def record_tokens(stage: str, usage: Any) -> None:
+    """Count tokens from an OpenAI ``usage`` object (or dict); missing usage is ignored."""
+    if usage is None:
+        return
+    get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = get(kind)
+        if value:
+            LLM_TOKENS.labels(stage, kind.split("_")[0]).inc(value)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_EVENTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_decode(stage: str, outcome: str) -> None:
+    LLM_RESPONSES.labels(stage, outcome).inc()
+
+
+def record_hedge(stage: str, outcome: str) -> None:
+    LLM_HEDGES.labels(stage, outcome).inc()
+
+
+def record_pool_wait(client: str, seconds: float) -> None:
+    POOL_WAIT.labels(client).observe(seconds)
+
+
+def record_pool_waiting(client: str, delta: int) -> None:
+    POOL_WAITING.labels(client).inc(delta)
+
+
+def record_pool_state(client: str, busy: int, idle: int, max_connections: Optional[int] = None) -> None:
+    """Publish a connection pool snapshot (connections by state and, if given, the limit)."""
+    POOL_CONNECTIONS.labels(client, "busy").set(busy)
+    POOL_CONNECTIONS.labels(client, "idle").set(idle)
+    if max_connections is not None:
+        POOL_MAX_CONNECTIONS.labels(client).set(max_connections)
+
+
+def metrics_payload() -> Tuple[bytes, str]:
+    """(body, content type) for a /metrics endpoint in the Prometheus text format."""
+    if not METRICS_ENABLED:
+        return b"# prometheus_client is not installed\n", CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,337 @@
+"""
+Aho–Corasick multi-pattern matcher for the vocabulary filter.
+
+Documents (sentences, word streams) are tokenized on whitespace and every token is
+normalized (lowercase, surrounding punctuation stripped). The normalized tokens are
+joined into one string (tokens separated by " ", documents by "\\n") and all patterns are
+found in a single linear pass of the automaton over that string. Matches are only
+accepted on token boundaries, so patterns match whole words or whole word sequences:
+
+- multi-word entries ("blow job", "f u c k") match consecutive tokens,
+- entries ending in "*" ("masterbat*") match any token starting with the prefix,
+- leetspeak spellings ("5h1t", "sh!+", "b!tch") are matched through a second pass over
+  the leet-normalized tokens, which only runs when a document contains such tokens.
+
+Patterns can be added and removed at any time: new patterns are inserted into the trie
+directly and the failure links are recomputed lazily (once) before the next search.
+"""
+
+import bisect
+import re
+import string
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+__all__ = [
+    "PatternMatcher",
+    "PreparedText",
+    "Match",
+    "search_layers",
+    "normalize_entry",
+    "normalize_token",
+]
+
+_PUNCT = string.punctuation
+_TOKEN_RE = re.compile(r"\S+")
+_DOC_SEP = "\n"
+
+# Leetspeak / obfuscation substitutions
+_LEET_CHARS = "013457@$!+"
+_LEET_TABLE = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t",
+    "@": "a", "$": "s", "!": "i", "+": "t",
+})
+
+
+def normalize_entry(entry: str) -> str:
+    """Canonical form of a vocabulary entry: lowercase, single spaces."""
+    return " ".join(entry.lower().split())
+
+
+def normalize_token(token: str) -> str:
+    """Plain token normalization: lowercase and strip surrounding punctuation."""
+    return token.strip(_PUNCT).lower()
+
+
+def _leet_token(token: str) -> str:
+    """Leet normalization: map substitutions first, then strip punctuation."""
+    return token.lower().translate(_LEET_TABLE).strip(_PUNCT)
+
+
+def _has_leet(token: str) -> bool:
+    """Only tokens mixing letters with substitution characters are leet candidates."""
+    return any(c in _LEET_CHARS for c in token) and any(c.isalpha() for c in token)
+
+
+class Match(NamedTuple):
+    """A pattern occurrence, in document / token / character coordinates."""
+    doc_index: int          # index of the document (e.g. sentence) in the prepared input
+    first_token: int        # whitespace-token index of the first matched token in the document
+    last_token: int         # whitespace-token index of the last matched token in the document
+    char_start: int         # character offset of the match start in the document (+ doc offset)
+    char_end: int           # character offset of the match end (exclusive)
+    pattern: str            # the vocabulary entry that matched
+
+
+class PreparedText:
+    """
+    Tokenized and normalized documents, ready to be searched by one or more matchers
+    (normalization is done once and shared).
+    """
+
+    __slots__ = (
+        "documents", "offsets", "plain", "leet", "token_doc", "token_index",
+        "token_start", "token_end", "norm_starts", "norm_start_to_token",
+    )
+
+    def __init__(self, documents: Sequence[str], offsets: Optional[Sequence[int]] = None):
+        """
+        :param documents: Texts to search (matches never span two documents).
+        :param offsets: Optional character offset of each document in a larger text;
+                        added to the reported character offsets.
+        """
+        self.documents = documents
+        self.offsets = offsets
+        self.token_doc: List[int] = []
+        self.token_index: List[int] = []
+        self.token_start: List[int] = []
+        self.token_end: List[int] = []
+        self.norm_starts: List[int] = []
+        plain_parts: List[str] = []
+        leet_parts: List[str] = []
+        any_leet = False
+        pos = 0
+
+        for doc_index, doc in enumerate(documents):
+            base = offsets[doc_index] if offsets is not None else 0
+            if doc_index:
+                plain_parts.append(_DOC_SEP)
+                leet_parts.append(_DOC_SEP)
+                pos += 1
+            first = True
+            for word_index, m in enumerate(_TOKEN_RE.finditer(doc)):
+                raw = m.group()
+                plain = normalize_token(raw)
+                leet = _leet_token(raw) if _has_leet(raw) else plain
+                if not plain and not leet:
+                    continue
+                if leet != plain:
+                    any_leet = True
+                # Both forms must occupy the same span: pad the shorter one
+                width = max(len(plain), len(leet))
+                if not first:
+                    plain_parts.append(" ")
+                    leet_parts.append(" ")
+                    pos += 1
+                first = False
+                plain_parts.append(plain.ljust(width, "\x00"))
+                leet_parts.append(leet.ljust(width, "\x00"))
+                self.token_doc.append(doc_index)
+                self.token_index.append(word_index)
+                self.token_start.append(base + m.start())
+                self.token_end.append(base + m.end())
+                self.norm_starts.append(pos)
+                pos += width
+
+        self.plain = "".join(plain_parts)
+        self.leet = "".join(leet_parts) if any_leet else None
+        self.norm_start_to_token = {p: k for k, p in enumerate(self.norm_starts)}
+
+    def token_at(self, norm_pos: int) -> int:
+        """Index of the normalized token covering position ``norm_pos``."""
+        return bisect.bisect_right(self.norm_starts, norm_pos) - 1
+
+
+class PatternMatcher:
+    """Aho–Corasick automaton over normalized vocabulary entries."""
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self._reset()
+        for p in patterns:
+            self.add(p)
+
+    def _reset(self) -> None:
+        # Trie: transitions, failure links and output pattern ids per node
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        self._terminal: List[List[int]] = [[]]
+        # Pattern table: id -> (source entry, form length, is_prefix)
+        self._forms: List[Tuple[str, int, bool]] = []
+        self._entry_forms: Dict[str, List[int]] = {}
+        self._dead: Set[int] = set()
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entry_forms)
+
+    def __contains__(self, entry: str) -> bool:
+        return normalize_entry(entry) in self._entry_forms
+
+    @staticmethod
+    def _forms_of(entry: str) -> Tuple[List[str], bool]:
+        """Normalized search forms of an entry, and whether it is a prefix (wildcard) entry."""
+        is_prefix = entry.endswith("*")
+        if is_prefix:
+            entry = entry[:-1]
+        tokens = entry.split()
+        forms = []
+        # Plain form only if stripping punctuation loses nothing (e.g. not for "sh!+")
+        plain = [normalize_token(t) for t in tokens]
+        if all(p == t for p, t in zip(plain, tokens)):
+            forms.append(" ".join(plain))
+        leet = " ".join(_leet_token(t) if _has_leet(t) else normalize_token(t) for t in tokens)
+        if leet and leet not in forms:
+            forms.append(leet)
+        return [f for f in forms if f.strip()], is_prefix
+
+    def add(self, entry: str) -> None:
+        """Add a vocabulary entry (no-op if already present)."""
+        entry = normalize_entry(entry)
+        if not entry or entry in self._entry_forms:
+            return
+        forms, is_prefix = self._forms_of(entry)
+        ids = []
+        for form in forms:
+            node = 0
+            for ch in form:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._terminal.append([])
+                node = nxt
+            pid = len(self._forms)
+            self._forms.append((entry, len(form), is_prefix))
+            self._terminal[node].append(pid)
+            ids.append(pid)
+        self._entry_forms[entry] = ids
+        self._dirty = True
+
+    def remove(self, entry: str) -> bool:
+        """Remove a vocabulary entry. Returns False if it was not present."""
+        entry = normalize_entry(entry)
+        ids = self._entry_forms.pop(entry, None)
+        if ids is None:
+            return False
+        self._dead.update(ids)
+        self._dirty = True
+        if len(self._dead) > len(self._forms) // 2:
+            self._compact()
+        return True
+
+    def _compact(self) -> None:
+        """Rebuild the trie without removed patterns."""
+        entries = list(self._entry_forms)
+        self._reset()
+        for entry in entries:
+            self.add(entry)
+
+    def _build_links(self) -> None:
+        """Compute failure links and merged outputs (BFS over the trie)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        dead = self._dead
+        out[0] = tuple(pid for pid in self._terminal[0] if pid not in dead)
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            own = tuple(pid for pid in self._terminal[node] if pid not in dead)
+            out[node] = own + out[fail[node]]
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                queue.append(child)
+        self._dirty = False
+
+    def search(self, prepared: PreparedText, exclude: Optional[Set[str]] = None) -> List[Match]:
+        """
+        Find all vocabulary entries in the prepared documents.
+
+        Overlapping matches are resolved leftmost-longest, so each token is reported at
+        most once.
+
+        :param exclude: Entries to ignore (they do not hide shorter overlapping matches).
+        """
+        return search_layers(prepared, [(self, exclude)])
+
+    def _collect(self, prepared: PreparedText, exclude: Optional[Set[str]], spans: Dict[Tuple[int, int], str]) -> None:
+        if self._dirty:
+            self._build_links()
+        self._scan(prepared.plain, prepared, exclude, spans)
+        if prepared.leet is not None:
+            self._scan(prepared.leet, prepared, exclude, spans)
+
+    def _scan(
+        self,
+        text: str,
+        prepared: PreparedText,
+        exclude: Optional[Set[str]],
+        spans: Dict[Tuple[int, int], str],
+    ) -> None:
+        goto, fail, out, forms = self._goto, self._fail, self._out, self._forms
+        starts = prepared.norm_start_to_token
+        n = len(text)
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            for pid in out[node]:
+                entry, length, is_prefix = forms[pid]
+                if exclude and entry in exclude:
+                    continue
+                first = starts.get(i - length + 1)
+                if first is None:
+                    continue
+                # Token boundary: separator, end of text, or trailing padding
+                at_end = i + 1 == n or text[i + 1] in " \n\x00"
+                if not (at_end or is_prefix):
+                    continue
+                last = prepared.token_at(i)
+                key = (first, last)
+                prev = spans.get(key)
+                # Prefer the longest entry, then a literal spelling over a leet one
+                if prev is None or (len(entry), not _has_leet(entry)) > (len(prev), not _has_leet(prev)):
+                    spans[key] = entry
+
+
+def search_layers(
+    prepared: PreparedText,
+    layers: Sequence[Tuple[PatternMatcher, Optional[Set[str]]]],
+) -> List[Match]:
+    """
+    Search several matchers over the same prepared text and resolve all their hits
+    together (leftmost-longest, non-overlapping).
+
+    :param layers: (matcher, excluded entries or None) pairs, e.g. a shared base
+                   vocabulary and a per-profile delta.
+    """
+    spans: Dict[Tuple[int, int], str] = {}
+    for matcher, exclude in layers:
+        matcher._collect(prepared, exclude, spans)
+
+    matches: List[Match] = []
+    last_end = -1
+    for (first, last), entry in sorted(spans.items(), key=lambda kv: (kv[0][0], -kv[0][1])):
+        if first <= last_end:
+            continue
+        last_end = last
+        matches.append(Match(
+            prepared.token_doc[first],
+            prepared.token_index[first],
+            prepared.token_index[last],
+            prepared.token_start[first],
+            prepared.token_end[last],
+            entry,
+        ))
+    return matches
@@ -0,0 +1,526 @@
+"""
+Opt-in sampling profiler for slow requests.
+
+A request is profiled when the caller asks for it (``X-Profile: 1`` plus the admin token,
+see backend/main.py) or, with PROFILE_SLOW_S set, always, keeping the profile only if the
+request took longer than the threshold. A profile holds:
+
+- stack samples of every busy thread (event loop, ffmpeg/ASR worker threads, debug sink),
+  taken by one background thread from ``sys._current_frames()`` every PROFILE_INTERVAL_MS;
+  idle pool workers are skipped and consecutive identical samples are merged, so long
+  waits cost one entry;
+- an asyncio task timeline: every PROFILE_TASK_INTERVAL_MS a watcher task records which
+  tasks exist and what each one awaits (e.g. the OpenAI call), plus event-loop lag, i.e.
+  time the loop was blocked by CPU work such as JSON parsing or a synchronous decode.
+
+The sampler is process-wide: samples of concurrent requests are mixed into every active
+profile (``concurrent_profiles`` in the metadata says how many overlapped). Profiles are
+stored gzip-compressed under the media store directory (``profiles/``) and can be
+exported for speedscope (https://www.speedscope.app), flamegraph.pl / inferno (collapsed
+stacks) or Perfetto / chrome://tracing (trace events, with the task timeline).
+
+Configuration (environment):
+    PROFILE_SLOW_S             keep profiles of requests slower than this (0 = header only)
+    PROFILE_INTERVAL_MS        stack sampling interval
+    PROFILE_TASK_INTERVAL_MS   asyncio task/loop-lag sampling interval
+    PROFILE_MAX_FILES          stored profiles kept (oldest removed first)
+"""
+
+import asyncio
+import contextvars
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from src.backend.observability import get_logger
+
+__all__ = [
+    "RequestProfile",
+    "ProfileStore",
+    "profile_request",
+    "annotate",
+    "to_speedscope",
+    "to_collapsed",
+    "to_chrome_trace",
+    "EXPORT_FORMATS",
+]
+
+logger = get_logger(__name__)
+
+DEFAULT_SLOW_S = float(os.environ.get("PROFILE_SLOW_S", "0"))
+DEFAULT_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "10"))
+DEFAULT_TASK_INTERVAL_MS = float(os.environ.get("PROFILE_TASK_INTERVAL_MS", "20"))
+DEFAULT_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "200"))
+
+EXPORT_FORMATS = ("speedscope", "collapsed", "trace", "json")
+
+MAX_STACK_DEPTH = 128
+# Loop lag below this is scheduling noise, not a blocked loop
+_MIN_LAG_S = 0.005
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+_PROFILE_ID = re.compile(r"^[0-9]{8}_[0-9]{6}_[0-9a-f]{8}$")
+# Leaf functions of parked threads ("_worker": pool workers blocked in a C-level queue get)
+_IDLE_LEAVES = frozenset({"wait", "get", "_wait_for_tstate_lock", "acquire", "sleep", "_worker"})
+
+_current: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+
+Frame = Tuple[str, str, int]  # function, file, first line
+
+
+# ----------------------------
+# Stack sampling
+# ----------------------------
+def _stack(frame) -> Tuple[Frame, ...]:
+    """Root-first stack of function-level frames."""
+    frames = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        frames.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+def _idle(stack: Tuple[Frame, ...]) -> bool:
+    """An idle pool/server thread: parked in a wait without any project code on the stack."""
+    if not stack or stack[-1][0] not in _IDLE_LEAVES:
+        return False
+    return not any(f[1].startswith(_PROJECT_ROOT) for f in stack)
+
+
+class _Sampler:
+    """One background thread feeding every active RequestProfile."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: List["RequestProfile"] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: "RequestProfile") -> None:
+        with self._lock:
+            self._profiles.append(profile)
+            for p in self._profiles:
+                p.concurrent_profiles = max(p.concurrent_profiles, len(self._profiles))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: "RequestProfile") -> None:
+        with self._lock:
+            if profile in self._profiles:
+                self._profiles.remove(profile)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while True:
+            with self._lock:
+                profiles = list(self._profiles)
+                if not profiles:
+                    self._thread = None
+                    return
+            time.sleep(min(p.interval_s for p in profiles))
+            now = time.perf_counter()
+            dt, last = now - last, now
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = _stack(frame)
+                if _idle(stack):
+                    continue
+                for profile in profiles:
+                    profile._record(now, dt, tid, names.get(tid, str(tid)), stack)
+
+
+_sampler = _Sampler()
+
+
+# ----------------------------
+# Per-request profile
+# ----------------------------
+class RequestProfile:
+    """Samples and task timeline of one request (times in seconds from its start)."""
+
+    def __init__(
+        self,
+        reason: str,
+        interval_ms: float = DEFAULT_INTERVAL_MS,
+        task_interval_ms: float = DEFAULT_TASK_INTERVAL_MS,
+    ):
+        """
+        :param reason: Why the request is profiled ("header" or "slow").
+        :param interval_ms: Stack sampling interval.
+        :param task_interval_ms: asyncio task / loop-lag sampling interval.
+        """
+        self.profile_id = f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}"
+        self.reason = reason
+        self.interval_s = interval_ms / 1000.0
+        self.task_interval_s = task_interval_ms / 1000.0
+        self.meta: Dict[str, Any] = {}
+        self.concurrent_profiles = 0
+        self.started_at = datetime.now().isoformat(timespec="milliseconds")
+        self.duration_s = 0.0
+        self.saved = False
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._frames: List[Frame] = []
+        self._frame_ids: Dict[Frame, int] = {}
+        self._stacks: List[List[int]] = []
+        self._stack_ids: Dict[Tuple[Frame, ...], int] = {}
+        self._threads: Dict[int, Dict[str, Any]] = {}
+        self._tasks: Dict[int, Dict[str, Any]] = {}
+        self._loop_lag: List[List[float]] = []
+        self._watcher: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start sampling (must be called from the event loop)."""
+        self._t0 = time.perf_counter()
+        _sampler.add(self)
+        self._watcher = asyncio.get_running_loop().create_task(self._watch_tasks(), name="profiler-tasks")
+
+    def stop(self) -> None:
+        _sampler.remove(self)
+        if self._watcher is not None:
+            self._watcher.cancel()
+        self.duration_s = time.perf_counter() - self._t0
+
+    def _stack_id(self, stack: Tuple[Frame, ...]) -> int:
+        sid = self._stack_ids.get(stack)
+        if sid is None:
+            ids = []
+            for frame in stack:
+                fid = self._frame_ids.get(frame)
+                if fid is None:
+                    fid = self._frame_ids[frame] = len(self._frames)
+                    self._frames.append(frame)
+                ids.append(fid)
+            sid = self._stack_ids[stack] = len(self._stacks)
+            self._stacks.append(ids)
+        return sid
+
+    def _record(self, now: float, dt: float, tid: int, name: str, stack: Tuple[Frame, ...]) -> None:
+        """Called by the sampler thread; merges a sample into the previous one if identical."""
+        with self._lock:
+            sid = self._stack_id(stack)
+            thread = self._threads.get(tid)
+            if thread is None:
+                thread = self._threads[tid] = {"id": tid, "name": name, "samples": []}
+            samples = thread["samples"]
+            if samples and samples[-1][1] == sid:
+                samples[-1][2] += dt
+            else:
+                samples.append([max(0.0, now - dt - self._t0), sid, dt])
+
+    async def _watch_tasks(self) -> None:
+        loop = asyncio.get_running_loop()
+        me = asyncio.current_task()
+        interval = self.task_interval_s
+        expected = time.perf_counter() + interval
+        while True:
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            t = now - self._t0
+            lag = now - expected
+            if lag > _MIN_LAG_S:
+                self._loop_lag.append([max(0.0, t - lag), lag])
+            for task in asyncio.all_tasks(loop):
+                if task is me:
+                    continue
+                coro = task.get_coro()
+                entry = self._tasks.get(id(task))
+                if entry is None or entry["name"] != task.get_name():
+                    entry = self._tasks[id(task)] = {
+                        "name": task.get_name(),
+                        "coro": getattr(coro, "__qualname__", repr(coro)),
+                        "start": t,
+                        "end": t,
+                        "states": [],
+                    }
+                entry["end"] = t
+                where = _awaiting(coro)
+                if not entry["states"] or entry["states"][-1][1] != where:
+                    entry["states"].append([t, where])
+            expected = time.perf_counter() + interval
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            threads = [
+                {"id": t["id"], "name": t["name"], "samples": [list(s) for s in t["samples"]]}
+                for t in self._threads.values()
+            ]
+            frames = [list(f) for f in self._frames]
+            stacks = [list(s) for s in self._stacks]
+        return {
+            "profile_id": self.profile_id,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "duration_s": round(self.duration_s, 6),
+            "interval_ms": self.interval_s * 1000.0,
+            "task_interval_ms": self.task_interval_s * 1000.0,
+            "concurrent_profiles": self.concurrent_profiles,
+            "meta": dict(self.meta),
+            "frames": frames,
+            "stacks": stacks,
+            "threads": threads,
+            "tasks": sorted(self._tasks.values(), key=lambda e: e["start"]),
+            "loop_lag": list(self._loop_lag),
+        }
+
+
+def _awaiting(coro) -> str:
+    """Innermost frame a (suspended) coroutine chain is waiting in, as "func (file:line)"."""
+    frame = None
+    while coro is not None:
+        f = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if f is None:
+            break
+        frame = f
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    if frame is None:
+        return "running"
+    return f"{frame.f_code.co_name} ({_short_path(frame.f_code.co_filename)}:{frame.f_lineno})"
+
+
+def annotate(**meta: Any) -> None:
+    """Attach metadata (e.g. media_id) to the profile of the current request, if any."""
+    profile = _current.get()
+    if profile is not None:
+        profile.meta.update(meta)
+
+
+@asynccontextmanager
+async def profile_request(
+    store: "ProfileStore",
+    forced: bool = False,
+    slow_s: float = DEFAULT_SLOW_S,
+    **meta: Any,
+) -> AsyncIterator[Optional[RequestProfile]]:
+    """
+    Profile the enclosed request handling if forced or if slow_s is set.
+
+    The profile is stored when forced, or when the request took at least ``slow_s``.
+
+    :param store: Where kept profiles are written.
+    :param forced: Profile and keep regardless of duration (e.g. the X-Profile header).
+    :param slow_s: Keep profiles of requests slower than this (0 disables).
+    :param meta: Profile metadata (path, parameters...).
+    :return: The RequestProfile, or None when profiling is off for this request.
+    """
+    if not forced and slow_s <= 0:
+        yield None
+        return
+    profile = RequestProfile("header" if forced else "slow")
+    profile.meta.update(meta)
+    token = _current.set(profile)
+    profile.start()
+    try:
+        yield profile
+    except BaseException as e:
+        profile.meta["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        profile.stop()
+        _current.reset(token)
+        if forced or profile.duration_s >= slow_s:
+            try:
+                await asyncio.to_thread(store.save, profile.to_dict())
+                profile.saved = True
+                logger.info("🔬 Profile %s stored (%s, %.2fs)", profile.profile_id, profile.reason, profile.duration_s)
+            except OSError as e:
+                logger.warning("⚠️ Profile %s not stored: %s", profile.profile_id, e)
+
+
+# ----------------------------
+# Storage
+# ----------------------------
+class ProfileStore:
+    """
+    Stores profiles as ``<profile_id>.json.gz`` plus a small ``<profile_id>.meta.json``
+    (for listing without decompressing), keeping the newest ``max_files``.
+    """
+
+    def __init__(self, directory: str, max_files: int = DEFAULT_MAX_FILES):
+        """
+        :param directory: Storage directory (created on first write).
+        :param max_files: Number of profiles kept; the oldest are removed first.
+        """
+        self.directory = os.path.abspath(directory)
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def save(self, profile: Dict[str, Any]) -> str:
+        profile_id = profile["profile_id"]
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, profile_id + ".json.gz")
+        data = gzip.compress(json.dumps(profile, separators=(",", ":")).encode("utf-8"), compresslevel=5)
+        _write_atomic(path, data)
+        summary = {key: profile[key] for key in ("profile_id", "reason", "started_at", "duration_s", "meta")}
+        summary["size"] = len(data)
+        _write_atomic(os.path.join(self.directory, profile_id + ".meta.json"), json.dumps(summary).encode("utf-8"))
+        self._prune()
+        return path
+
+    def load(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not _PROFILE_ID.match(profile_id or ""):
+            return None
+        try:
+            with gzip.open(os.path.join(self.directory, profile_id + ".json.gz"), "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of the stored profiles, newest first."""
+        summaries = []
+        for name in self._ids():
+            try:
+                with open(os.path.join(self.directory, name + ".meta.json"), "r", encoding="utf-8") as f:
+                    summaries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return summaries
+
+    def _ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        ids = [n[: -len(".json.gz")] for n in os.listdir(self.directory) if n.endswith(".json.gz")]
+        return sorted((i for i in ids if _PROFILE_ID.match(i)), reverse=True)
+
+    def _prune(self) -> None:
+        with self._lock:
+            for profile_id in self._ids()[self.max_files:]:
+                for suffix in (".json.gz", ".meta.json"):
+                    try:
+                        os.remove(os.path.join(self.directory, profile_id + suffix))
+                    except OSError:
+                        pass
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# ----------------------------
+# Export
+# ----------------------------
+def _short_path(filename: str) -> str:
+    if filename.startswith(_PROJECT_ROOT + os.sep):
+        return os.path.relpath(filename, _PROJECT_ROOT)
+    parts = filename.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+def _frame_label(frame: List[Any]) -> str:
+    name, filename, line = frame
+    return f"{name} ({_short_path(filename)}:{line})"
+
+
+def to_speedscope(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """speedscope file (one sampled profile per thread, milliseconds)."""
+    stacks = profile["stacks"]
+    profiles = []
+    for thread in profile["threads"]:
+        samples = thread["samples"]
+        if not samples:
+            continue
+        profiles.append({
+            "type": "sampled",
+            "name": f"{thread['name']} ({thread['id']})",
+            "unit": "milliseconds",
+            "startValue": samples[0][0] * 1000.0,
+            "endValue": (samples[-1][0] + samples[-1][2]) * 1000.0,
+            "samples": [stacks[sid] for _, sid, _ in samples],
+            "weights": [weight * 1000.0 for _, _, weight in samples],
+        })
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {
+            "frames": [
+                {"name": name, "file": _short_path(filename), "line": line}
+                for name, filename, line in profile["frames"]
+            ],
+        },
+        "profiles": profiles,
+        "name": f"profile {profile['profile_id']}",
+        "exporter": "src.backend.profiling",
+    }
+
+
+def to_collapsed(profile: Dict[str, Any]) -> str:
+    """Collapsed stacks ("thread;frame;frame weight_ms" per line) for flamegraph.pl / inferno."""
+    labels = [_frame_label(f).replace(";", ":") for f in profile["frames"]]
+    totals: Dict[str, float] = defaultdict(float)
+    for thread in profile["threads"]:
+        root = thread["name"].replace(";", ":")
+        for _, sid, weight in thread["samples"]:
+            key = ";".join([root] + [labels[fid] for fid in profile["stacks"][sid]])
+            totals[key] += weight
+    return "".join(f"{key} {max(1, round(seconds * 1000))}\n" for key, seconds in sorted(totals.items()))
+
+
+def to_chrome_trace(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Trace Event Format (Perfetto, chrome://tracing, speedscope): the sampled stacks as a
+    flame chart per thread (pid 1), the asyncio task timeline with what each task awaited
+    (pid 2) and event-loop lag (pid 2, track 0).
+    """
+    us = 1_000_000.0
+    labels = [_frame_label(f) for f in profile["frames"]]
+    events: List[Dict[str, Any]] = [
+        {"ph": "M", "name": "process_name", "pid": 1, "args": {"name": "threads (sampled stacks)"}},
+        {"ph": "M", "name": "process_name", "pid": 2, "args": {"name": "asyncio tasks"}},
+        {"ph": "M", "name": "thread_name", "pid": 2, "tid": 0, "args": {"name": "event loop lag"}},
+    ]
+
+    for thread in profile["threads"]:
+        tid = thread["id"]
+        events.append({"ph": "M", "name": "thread_name", "pid": 1, "tid": tid, "args": {"name": thread["name"]}})
+        open_frames: List[Tuple[int, float]] = []  # (frame id, start)
+        end = 0.0
+        for start, sid, weight in thread["samples"]:
+            stack = profile["stacks"][sid]
+            common = 0
+            while common < min(len(open_frames), len(stack)) and open_frames[common][0] == stack[common]:
+                common += 1
+            for fid, opened in reversed(open_frames[common:]):
+                events.append({"ph": "X", "name": labels[fid], "pid": 1, "tid": tid,
+                               "ts": opened * us, "dur": (start - opened) * us})
+            open_frames = open_frames[:common] + [(fid, start) for fid in stack[common:]]
+            end = start + weight
+        for fid, opened in reversed(open_frames):
+            events.append({"ph": "X", "name": labels[fid], "pid": 1, "tid": tid,
+                           "ts": opened * us, "dur": (end - opened) * us})
+
+    task_interval = profile.get("task_interval_ms", DEFAULT_TASK_INTERVAL_MS) / 1000.0
+    for track, task in enumerate(profile["tasks"], 1):
+        end = task["end"] + task_interval
+        events.append({"ph": "M", "name": "thread_name", "pid": 2, "tid": track, "args": {"name": task["name"]}})
+        events.append({"ph": "X", "name": task["coro"], "pid": 2, "tid": track,
+                       "ts": task["start"] * us, "dur": (end - task["start"]) * us})
+        states = task["states"]
+        for i, (start, where) in enumerate(states):
+            state_end = states[i + 1][0] if i + 1 < len(states) else end
+            events.append({"ph": "X", "name": where, "pid": 2, "tid": track,
+                           "ts": start * us, "dur": (state_end - start) * us})
+
+    for start, lag in profile["loop_lag"]:
+        events.append({"ph": "X", "name": "event loop blocked", "pid": 2, "tid": 0,
+                       "ts": start * us, "dur": lag * us})
+
+    return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"profile_id": profile["profile_id"]}}
@@ -0,0 +1,312 @@
+"""
+Audio redaction (bleeping / muting) of flagged time ranges.
+
+The flagged ranges are merged into disjoint intervals and written as an ``asendcmd``
+script that switches the gain at the interval boundaries: in "mute" mode the original
+audio's ``volume``, in "beep" mode the ``amix`` weights of the original audio and a sine
+tone. The commands are checked once per ~21 ms frame with integer timestamp comparisons,
+so the cost does not grow with samples × intervals the way a per-sample expression does,
+and the script file keeps the command line short however many intervals there are.
+
+Only the audio is re-encoded; video streams are copied as-is, so redacting an hour-long
+file costs roughly one audio encode. Output is written to a pipe in a streamable container
+(fragmented MP4, Matroska or ADTS) and streamed back chunk by chunk. ``start_redaction``
+waits for the first output bytes, so an ffmpeg failure is reported before a response
+starts.
+
+Configuration (environment):
+    FFMPEG_BIN / FFPROBE_BIN   full paths if the binaries are not on PATH
+    REDACT_BEEP_HZ             beep tone frequency
+"""
+
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+from shutil import which
+from typing import AsyncIterator, Iterable, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "merge_intervals",
+    "redaction_commands",
+    "build_audio_filter",
+    "build_redact_command",
+    "output_format",
+    "probe_has_video",
+    "start_redaction",
+    "stream_redacted",
+    "REDACT_MODES",
+]
+
+FFMPEG_BIN = os.environ.get("FFMPEG_BIN")
+FFPROBE_BIN = os.environ.get("FFPROBE_BIN")
+DEFAULT_BEEP_HZ = float(os.environ.get("REDACT_BEEP_HZ", "1000"))
+DEFAULT_BEEP_VOLUME = 0.3
+DEFAULT_CHUNK_BYTES = 256 * 1024
+
+# Samples per audio frame (~21 ms at 48 kHz, one AAC frame): the granularity of the gain
+# switches. Smaller frames cost ~10% more filtering time for the whole file.
+_FRAME_SAMPLES = 1024
+
+REDACT_MODES = ("beep", "mute")
+
+# Containers that can hold the copied video stream when written to a pipe
+_MP4_SUFFIXES = {".mp4", ".m4v", ".mov", ".3gp"}
+
+Interval = Tuple[float, float]
+
+
+# ----------------------------
+# Filter graph
+# ----------------------------
+def merge_intervals(ranges: Iterable[Sequence[float]], padding_s: float = 0.0) -> List[Interval]:
+    """
+    Sort, pad and merge time ranges into disjoint intervals.
+
+    Args:
+        ranges: (start, end) pairs in seconds, in any order; empty/negative ranges are dropped.
+        padding_s: Seconds added on both sides of every range before merging.
+
+    Returns:
+        Disjoint, sorted (start, end) intervals.
+    """
+    padded = sorted(
+        (max(0.0, float(start) - padding_s), float(end) + padding_s)
+        for start, end in ranges
+        if float(end) > float(start)
+    )
+    merged: List[Interval] = []
+    for start, end in padded:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def redaction_commands(
+    intervals: Sequence[Interval],
+    mode: str = "beep",
+    beep_volume: float = DEFAULT_BEEP_VOLUME,
+) -> str:
+    """
+    ``asendcmd`` script switching the ``@redact`` filter of ``build_audio_filter`` inside
+    the intervals.
+
+    Args:
+        intervals: Disjoint intervals (see merge_intervals).
+        mode: "mute" or "beep".
+        beep_volume: Tone amplitude (0..1).
+    """
+    if mode not in REDACT_MODES:
+        raise ValueError(f"Unsupported redaction mode: {mode}")
+    if mode == "mute":
+        enter, leave = "volume@redact volume 0", "volume@redact volume 1"
+    else:
+        enter, leave = (
+            f"amix@redact weights '0 {beep_volume}'",
+            "amix@redact weights '1 0'",
+        )
+    return "".join(
+        f"{start:.3f}-{end:.3f} [enter] {enter}, [leave] {leave};\n" for start, end in intervals
+    )
+
+
+def _filter_path(path: str) -> str:
+    # Escaped for both filtergraph levels (graph, then option parsing): ":" -> "\\:"
+    return Path(path).as_posix().replace("\\", "/").replace(":", "\\\\:")
+
+
+def build_audio_filter(
+    commands_path: Optional[str],
+    mode: str = "beep",
+    beep_hz: float = DEFAULT_BEEP_HZ,
+) -> str:
+    """
+    Build the filter graph redacting input ``0:a`` into ``[aout]``.
+
+    Args:
+        commands_path: File with the ``redaction_commands`` script; None if nothing is
+            redacted.
+        mode: "mute" silences the intervals; "beep" replaces them with a tone.
+        beep_hz: Tone frequency.
+    """
+    if mode not in REDACT_MODES:
+        raise ValueError(f"Unsupported redaction mode: {mode}")
+    if commands_path is None:
+        return "[0:a]anull[aout]"
+    # Small frames for precise switching; the commands act on the frames that follow
+    gated = f"[0:a]asetnsamples=n={_FRAME_SAMPLES},asendcmd=f={_filter_path(commands_path)}"
+    if mode == "mute":
+        return f"{gated},volume@redact=volume=1[aout]"
+    # The tone source is infinite; amix stops with the first (original) input
+    return (
+        f"{gated}[orig];"
+        f"sine=f={beep_hz}:sample_rate=48000:samples_per_frame={_FRAME_SAMPLES}[beep];"
+        f"[orig][beep]amix@redact=inputs=2:duration=first:dropout_transition=0:weights=1 0:normalize=0[aout]"
+    )
+
+
+def output_format(src_path: str, has_video: bool) -> Tuple[List[str], str, str]:
+    """
+    Pipe-friendly output container for the source.
+
+    Returns:
+        (ffmpeg format args, media type, file extension)
+    """
+    if not has_video:
+        return ["-f", "adts"], "audio/aac", ".aac"
+    if Path(src_path).suffix.lower() in _MP4_SUFFIXES:
+        # Fragmented MP4 does not need a seekable output
+        return ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4"], "video/mp4", ".mp4"
+    return ["-f", "matroska"], "video/x-matroska", ".mkv"
+
+
+def build_redact_command(
+    ffmpeg: str,
+    src_path: str,
+    commands_path: Optional[str],
+    mode: str = "beep",
+    has_video: bool = False,
+    audio_bitrate: str = "192k",
+) -> List[str]:
+    """
+    ffmpeg command redacting ``src_path`` and writing the result to stdout.
+
+    Video (first video stream, if any) is stream-copied; only the audio is re-encoded.
+    ``commands_path`` is the ``redaction_commands`` script (None: nothing to redact).
+    """
+    fmt_args, _, _ = output_format(src_path, has_video)
+    cmd = [
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-i", src_path,
+        "-filter_complex", build_audio_filter(commands_path, mode),
+    ]
+    if has_video:
+        cmd += ["-map", "0:v:0", "-c:v", "copy"]
+    cmd += ["-map", "[aout]", "-c:a", "aac", "-b:a", audio_bitrate]
+    cmd += fmt_args + ["pipe:1"]
+    return cmd
+
+
+# ----------------------------
+# Execution
+# ----------------------------
+def _which(env_path: Optional[str], name: str) -> str:
+    if env_path and Path(env_path).exists():
+        return env_path
+    if FFMPEG_BIN and name != "ffmpeg":
+        sibling = Path(FFMPEG_BIN).with_name(name + Path(FFMPEG_BIN).suffix)
+        if sibling.exists():
+            return str(sibling)
+    found = which(name)
+    if found:
+        return found
+    raise RuntimeError(f"{name} not found. Install FFmpeg and/or set {name.upper()}_BIN to its full path.")
+
+
+async def probe_has_video(src_path: str) -> bool:
+    """True if the file has a (non cover-art) video stream."""
+    proc = await asyncio.create_subprocess_exec(
+        _which(FFPROBE_BIN, "ffprobe"), "-v", "error",
+        "-select_streams", "v",
+        "-show_entries", "stream=index:stream_disposition=attached_pic",
+        "-of", "csv=p=0",
+        src_path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    out, _ = await proc.communicate()
+    for line in out.decode("utf-8", "replace").splitlines():
+        fields = line.strip().split(",")
+        # "index,attached_pic": skip embedded cover images (e.g. in MP3s)
+        if fields and fields[0] and (len(fields) < 2 or fields[1] != "1"):
+            return True
+    return False
+
+
+async def start_redaction(
+    src_path: str,
+    intervals: Sequence[Interval],
+    mode: str = "beep",
+    has_video: bool = False,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> AsyncIterator[bytes]:
+    """
+    Start the redaction and wait for its first output.
+
+    Returns:
+        Iterator over the output, starting with the bytes already read.
+
+    Raises:
+        RuntimeError: If ffmpeg fails before producing any output (bad input, filter
+            error); nothing has been sent at that point.
+    """
+    stream = stream_redacted(src_path, intervals, mode, has_video, chunk_bytes)
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    except BaseException:
+        await stream.aclose()
+        raise
+
+    async def chained() -> AsyncIterator[bytes]:
+        try:
+            if first:
+                yield first
+                async for chunk in stream:
+                    yield chunk
+        finally:
+            await stream.aclose()
+
+    return chained()
+
+
+async def stream_redacted(
+    src_path: str,
+    intervals: Sequence[Interval],
+    mode: str = "beep",
+    has_video: bool = False,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> AsyncIterator[bytes]:
+    """
+    Run the redaction and yield the output as it is produced.
+
+    The ffmpeg process is killed if the consumer stops early (e.g. client disconnect).
+    """
+    if mode not in REDACT_MODES:
+        raise ValueError(f"Unsupported redaction mode: {mode}")
+    commands_path = None
+    if intervals:
+        fd, commands_path = tempfile.mkstemp(prefix="redact_", suffix=".cmd")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(redaction_commands(intervals, mode))
+    proc = None
+    stderr_task = None
+    try:
+        cmd = build_redact_command(_which(FFMPEG_BIN, "ffmpeg"), src_path, commands_path, mode, has_video)
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        # Drained concurrently: a full stderr pipe would block ffmpeg (and stdout with it)
+        stderr_task = asyncio.ensure_future(proc.stderr.read())
+        while True:
+            chunk = await proc.stdout.read(chunk_bytes)
+            if not chunk:
+                break
+            yield chunk
+        stderr = await stderr_task
+        if await proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg redaction failed: {stderr.decode('utf-8', 'replace').strip()}")
+    finally:
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        if stderr_task is not None and not stderr_task.done():
+            stderr_task.cancel()
+        if commands_path is not None:
+            os.unlink(commands_path)
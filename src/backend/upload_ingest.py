@@ -0,0 +1,353 @@
+"""
+Streaming ingestion of multipart media uploads.
+
+Instead of ``await file.read()`` (the whole upload in worker memory), the request body is
+parsed as it arrives: the file part is written chunk by chunk into the media store's
+staging area while its SHA-256 (the ``media_id``) is computed. Uploads are rejected early:
+
+- a Content-Length above the size limit is refused before any byte is read;
+- the body is aborted as soon as the file part exceeds the size limit;
+- once the first ``sniff_bytes`` are on disk, ffprobe reads the container header. Input
+  that is not audio/video, or that has no audio stream, or whose header duration exceeds
+  the limit, is refused without receiving the rest. Containers that keep their index at
+  the end (e.g. MP4 with a trailing moov atom) cannot be sniffed early and are checked
+  once the body is complete.
+
+Without ffprobe the content cannot be checked; uploads are then accepted only if their file
+name has one of FALLBACK_EXTENSIONS (the previous allow-list), and a warning is logged once.
+
+Hashing and disk writes run in a worker thread in batches of ``_DRAIN_BYTES``, so the event
+loop only parses the multipart framing.
+
+Configuration (environment):
+    UPLOAD_MAX_MB            size limit of one upload
+    UPLOAD_MAX_DURATION_S    duration limit (seconds of media)
+    UPLOAD_SNIFF_KB          how much of the file ffprobe sees for the early check
+    FFPROBE_BIN              full path if ffprobe is not on PATH
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+from shutil import which
+from typing import Any, Dict, List, Optional
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+from src.backend.media_store import MediaStore
+from src.backend.observability import get_logger
+
+__all__ = ["UploadRejected", "IngestedUpload", "ingest_upload", "sniff_media", "FALLBACK_EXTENSIONS"]
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_UPLOAD_MB = float(os.environ.get("UPLOAD_MAX_MB", "2048"))
+DEFAULT_MAX_DURATION_S = float(os.environ.get("UPLOAD_MAX_DURATION_S", str(4 * 3600)))
+DEFAULT_SNIFF_BYTES = int(float(os.environ.get("UPLOAD_SNIFF_KB", "1024")) * 1024)
+FFPROBE_BIN = os.environ.get("FFPROBE_BIN")
+PROBE_TIMEOUT_S = 10.0
+
+# Accepted without ffprobe (no content check possible)
+FALLBACK_EXTENSIONS = frozenset({"mp3", "wav", "mp4", "m4a", "aac", "flac", "ogg", "mov", "avi"})
+
+# Multipart overhead (boundaries, part headers) allowed on top of the file size
+_ENVELOPE_BYTES = 64 * 1024
+_HEAD_BYTES = 12
+# Received data buffered before it is hashed and written in a worker thread
+_DRAIN_BYTES = 1024 * 1024
+
+
+class UploadRejected(Exception):
+    """Upload refused; ``status_code`` is the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class IngestedUpload:
+    """A stored upload: content id, path in the media store and probed metadata."""
+
+    __slots__ = ("media_id", "path", "filename", "size", "duration_s", "format_name", "has_video")
+
+    def __init__(self, media_id: str, path: str, filename: str, size: int, probe: Dict[str, Any]):
+        self.media_id = media_id
+        self.path = path
+        self.filename = filename
+        self.size = size
+        self.duration_s = probe.get("duration_s")
+        self.format_name = probe.get("format_name")
+        self.has_video = probe.get("has_video", False)
+
+
+# ----------------------------
+# Container sniffing
+# ----------------------------
+def _ffprobe() -> Optional[str]:
+    if FFPROBE_BIN and Path(FFPROBE_BIN).exists():
+        return FFPROBE_BIN
+    return which("ffprobe")
+
+
+async def sniff_media(path: str, timeout_s: float = PROBE_TIMEOUT_S) -> Optional[Dict[str, Any]]:
+    """
+    Read the container header of a (possibly partial) file with ffprobe.
+
+    :param path: File to probe.
+    :param timeout_s: ffprobe is killed after this long.
+    :return: {"format_name", "duration_s", "has_audio", "has_video"}, or None if ffprobe
+        cannot parse the file (not media, or not enough of it yet).
+    :raises RuntimeError: ffprobe is not installed.
+    """
+    ffprobe = _ffprobe()
+    if not ffprobe:
+        raise RuntimeError("ffprobe not found. Install FFmpeg and/or set FFPROBE_BIN to its full path.")
+    proc = await asyncio.create_subprocess_exec(
+        ffprobe, "-v", "error",
+        "-show_entries", "format=format_name,duration:stream=codec_type:stream_disposition=attached_pic",
+        "-of", "json",
+        path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        out, _ = await asyncio.wait_for(proc.communicate(), timeout_s)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return None
+    if proc.returncode != 0:
+        return None
+    try:
+        data = json.loads(out or b"{}")
+    except ValueError:
+        return None
+    fmt = data.get("format") or {}
+    streams = data.get("streams") or []
+    if not fmt.get("format_name") or not streams:
+        return None
+    try:
+        duration = float(fmt["duration"])
+    except (KeyError, TypeError, ValueError):
+        duration = None
+    return {
+        "format_name": fmt["format_name"],
+        "duration_s": duration,
+        "has_audio": any(s.get("codec_type") == "audio" for s in streams),
+        # Cover art in audio files is reported as a (single-frame) video stream
+        "has_video": any(
+            s.get("codec_type") == "video" and not (s.get("disposition") or {}).get("attached_pic")
+            for s in streams
+        ),
+    }
+
+
+def _index_may_trail(head: bytes) -> bool:
+    """ISO-BMFF (MP4/MOV/M4A/3GP) may keep its index (moov) at the end of the file."""
+    return head[4:8] == b"ftyp"
+
+
+def _check_probe(probe: Dict[str, Any], max_duration_s: float) -> None:
+    if not probe["has_audio"]:
+        raise UploadRejected(415, f"No audio stream in {probe['format_name']} upload")
+    if max_duration_s and probe["duration_s"] and probe["duration_s"] > max_duration_s:
+        raise UploadRejected(
+            413, f"Media is {probe['duration_s']:.0f}s long; the limit is {max_duration_s:.0f}s"
+        )
+
+
+# ----------------------------
+# Streaming multipart ingestion
+# ----------------------------
+class _FilePart:
+    """
+    Multipart callbacks collecting the ``field`` part; ``drain`` hashes it and writes it to
+    disk (called in a worker thread).
+    """
+
+    def __init__(self, field: str, tmp_path: str, max_bytes: int):
+        self.field = field
+        self.max_bytes = max_bytes
+        self.filename: Optional[str] = None
+        self.size = 0
+        self.found = False
+        self.done = False
+        self.head = b""
+        self.pending_bytes = 0
+        self._pending: List[bytes] = []
+        self._sha256 = hashlib.sha256()
+        self._file = open(tmp_path, "wb")
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._active = False
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field_data,
+            "on_header_value": self._header_value_data,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self) -> None:
+        self._headers = {}
+        self._active = False
+
+    def _header_field_data(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _header_value_data(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name", b"").decode("utf-8", "replace") == self.field and not self.found:
+            self.found = True
+            self._active = True
+            self.filename = options.get(b"filename", b"").decode("utf-8", "replace")
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._active:
+            return
+        self.size += end - start
+        if self.size > self.max_bytes:
+            raise UploadRejected(413, f"Upload exceeds {self.max_bytes / 1024 / 1024:.0f} MB")
+        chunk = data[start:end]
+        if len(self.head) < _HEAD_BYTES:
+            self.head += chunk[:_HEAD_BYTES - len(self.head)]
+        self._pending.append(chunk)
+        self.pending_bytes += len(chunk)
+
+    def _part_end(self) -> None:
+        if self._active:
+            self._active = False
+            self.done = True
+
+    def drain(self) -> None:
+        """Hash and write the buffered data (blocking)."""
+        pending, self._pending, self.pending_bytes = self._pending, [], 0
+        for chunk in pending:
+            self._sha256.update(chunk)
+            self._file.write(chunk)
+
+    def flush(self) -> None:
+        """Drain and flush to disk, e.g. before ffprobe reads the file (blocking)."""
+        self.drain()
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+
+async def ingest_upload(
+    request,
+    store: MediaStore,
+    field: str = "file",
+    max_bytes: int = int(DEFAULT_MAX_UPLOAD_MB * 1024 * 1024),
+    max_duration_s: float = DEFAULT_MAX_DURATION_S,
+    sniff_bytes: int = DEFAULT_SNIFF_BYTES,
+) -> IngestedUpload:
+    """
+    Stream a multipart/form-data request's ``field`` file into the media store.
+
+    :param request: The Starlette/FastAPI Request (body not read yet).
+    :param store: Media store the file ends up in (content-addressed).
+    :param field: Form field holding the file.
+    :param max_bytes: Size limit of the file.
+    :param max_duration_s: Duration limit of the media (0 = none).
+    :param sniff_bytes: Probe the container once this much has arrived.
+    :raises UploadRejected: Bad request, too large/long, or not audio/video.
+    """
+    content_type = request.headers.get("content-type", "")
+    kind, params = parse_options_header(content_type)
+    boundary = params.get(b"boundary")
+    if kind != b"multipart/form-data" or not boundary:
+        raise UploadRejected(400, "Expected a multipart/form-data upload")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + _ENVELOPE_BYTES:
+        raise UploadRejected(413, f"Upload exceeds {max_bytes / 1024 / 1024:.0f} MB")
+
+    tmp_path = store.staging_path()
+    part = _FilePart(field, tmp_path, max_bytes)
+    parser = MultipartParser(boundary, part.callbacks())
+    probe: Optional[Dict[str, Any]] = None
+    probed_complete = False
+    adopted = False
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if probe is None and part.found and (part.size >= sniff_bytes or part.done):
+                await asyncio.to_thread(part.flush)
+                probe = await _sniff(tmp_path, part.filename)
+                probed_complete = part.done
+                if probe is not None:
+                    _check_probe(probe, max_duration_s)
+                elif part.done or not _index_may_trail(part.head):
+                    raise UploadRejected(415, "Not a readable audio/video file")
+                else:
+                    probe = {}  # index may be at the end: decided on the complete file below
+            elif part.pending_bytes >= _DRAIN_BYTES:
+                await asyncio.to_thread(part.drain)
+        parser.finalize()
+        await asyncio.to_thread(part.flush)
+        part.close()
+        if not part.found or part.size == 0:
+            raise UploadRejected(400, f"Missing file field '{field}'")
+
+        # Authoritative check on the complete file (duration estimates of a partial file
+        # can be low; trailing-index containers were not readable until now)
+        if not probed_complete:
+            probe = await _sniff(tmp_path, part.filename)
+        if probe is None:
+            raise UploadRejected(415, "Not a readable audio/video file")
+        _check_probe(probe, max_duration_s)
+
+        media_id = part.hexdigest()
+        filename = part.filename or "upload.bin"
+        path = await asyncio.to_thread(store.adopt, tmp_path, media_id, filename)
+        adopted = True
+        return IngestedUpload(media_id, path, filename, part.size, probe)
+    finally:
+        part.close()
+        if not adopted:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+_warned_no_ffprobe = False
+
+
+async def _sniff(path: str, filename: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    sniff_media; without ffprobe (one warning) only the file name extension is checked.
+
+    :raises UploadRejected: ffprobe is missing and the extension is not in FALLBACK_EXTENSIONS.
+    """
+    global _warned_no_ffprobe
+    try:
+        return await sniff_media(path)
+    except RuntimeError as e:
+        if not _warned_no_ffprobe:
+            logger.warning("⚠️ Upload sniffing disabled, checking file extensions only: %s", e)
+            _warned_no_ffprobe = True
+    extension = Path(filename or "").suffix.lower().lstrip(".")
+    if extension not in FALLBACK_EXTENSIONS:
+        raise UploadRejected(415, f"Unsupported extension: {extension or '(none)'}")
+    return {"format_name": None, "duration_s": None, "has_audio": True, "has_video": False}
@@ -0,0 +1,428 @@
+"""
+Persistent, versioned vocabulary filter shared by all backend workers.
+
+The word list lives in a SQLite database (WAL journal, so readers never block the
+writer). Every write bumps a version counter in the same transaction. Each worker keeps
+a compiled ``WordFlagger`` in memory and only checks the version at most once every
+``reload_interval_s`` seconds; the word list is re-read and the matcher recompiled only
+when the version has changed. Requests in between do not touch the database.
+
+Named profiles (one per tenant) are stored as deltas over the shared list: entries the
+profile adds and shared entries it excludes. A profile is served by a
+``LayeredWordFlagger`` that reuses the compiled shared matcher and only compiles its own
+additions; the most recently used profiles are kept in an LRU cache.
+
+Configuration (environment):
+    VOCABULARY_DB             path of the database (default: backend/vocabulary.db)
+    VOCAB_RELOAD_INTERVAL_S   how often a worker checks for changes made by other workers
+    VOCAB_PROFILE_CACHE_SIZE  number of compiled profiles kept in memory per worker
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import FrozenSet, Iterable, List, Optional
+
+from src.backend.bad_word_flagger import DEFAULT_BAD_WORDS, LayeredWordFlagger, WordFlagger
+from src.backend.observability import get_logger
+from src.backend.pattern_matcher import normalize_entry
+
+__all__ = ["VocabularyStore", "DEFAULT_DB_PATH", "DEFAULT_PROFILE"]
+
+logger = get_logger(__name__)
+
+DEFAULT_DB_PATH = os.environ.get(
+    "VOCABULARY_DB",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend", "vocabulary.db")),
+)
+DEFAULT_RELOAD_INTERVAL_S = float(os.environ.get("VOCAB_RELOAD_INTERVAL_S", "2.0"))
+DEFAULT_PROFILE_CACHE_SIZE = int(os.environ.get("VOCAB_PROFILE_CACHE_SIZE", "64"))
+
+# Name of the shared list; requests without a profile use it
+DEFAULT_PROFILE = "default"
+
+_PROFILE_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS words (word TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS profiles (name TEXT PRIMARY KEY, version INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS profile_words (
+    profile TEXT NOT NULL,
+    word TEXT NOT NULL,
+    excluded INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (profile, word)
+) WITHOUT ROWID;
+"""
+
+
+class _ProfileEntry:
+    """A compiled profile in the LRU cache."""
+
+    __slots__ = ("version", "base_generation", "added", "excluded", "flagger", "checked_at")
+
+    def __init__(self, version: int, base_generation: int, added: FrozenSet[str],
+                 excluded: FrozenSet[str], flagger: LayeredWordFlagger, checked_at: float):
+        self.version = version
+        self.base_generation = base_generation
+        self.added = added
+        self.excluded = excluded
+        self.flagger = flagger
+        self.checked_at = checked_at
+
+
+class VocabularyStore:
+    """
+    SQLite-backed vocabulary lists with version counters and hot-reloaded matchers.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_DB_PATH,
+        reload_interval_s: float = DEFAULT_RELOAD_INTERVAL_S,
+        seed: Optional[Iterable[str]] = DEFAULT_BAD_WORDS,
+        profile_cache_size: int = DEFAULT_PROFILE_CACHE_SIZE,
+    ):
+        """
+        :param path: Database file (created if missing).
+        :param reload_interval_s: Minimum time between two version checks of a worker.
+        :param seed: Entries written when the database is created (not on later starts).
+        :param profile_cache_size: Maximum number of compiled profiles kept in memory.
+        """
+        self.path = path
+        self.reload_interval_s = reload_interval_s
+        self.profile_cache_size = max(1, profile_cache_size)
+        self._lock = threading.RLock()
+        self._conn = self._connect(path)
+        self._init_schema(seed)
+
+        self._flagger: WordFlagger
+        self._version = -1
+        self._checked_at = 0.0
+        # Incremented whenever the shared flagger changes, so cached profiles get re-layered
+        self._generation = 0
+        self._profiles: "OrderedDict[str, _ProfileEntry]" = OrderedDict()
+        self._reload()
+
+    # ----------------------------
+    # Connection / schema
+    # ----------------------------
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_schema(self, seed: Optional[Iterable[str]]) -> None:
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Only the first worker to create the database seeds it
+                created = self._conn.execute(
+                    "INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)"
+                ).rowcount == 1
+                if created and seed:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO words (word) VALUES (?)",
+                        ((w,) for w in _normalized(seed)),
+                    )
+                    self._bump_version()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _bump_version(self) -> None:
+        self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _profile_name(profile: Optional[str]) -> Optional[str]:
+        """Validated profile name, or None for the shared list."""
+        if profile is None or profile == DEFAULT_PROFILE:
+            return None
+        if not _PROFILE_NAME.match(profile):
+            raise ValueError(f"Invalid vocabulary profile name: {profile!r}")
+        return profile
+
+    # ----------------------------
+    # Reads
+    # ----------------------------
+    def version(self, profile: Optional[str] = None) -> int:
+        """Current version of the shared list or of a profile (one indexed single-row read)."""
+        profile = self._profile_name(profile)
+        with self._lock:
+            if profile is None:
+                row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            else:
+                row = self._conn.execute("SELECT version FROM profiles WHERE name = ?", (profile,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def profiles(self) -> List[str]:
+        """Names of all profiles that have been written to."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT name FROM profiles ORDER BY name")]
+
+    def words(self, profile: Optional[str] = None) -> List[str]:
+        """All entries of the shared list or the effective entries of a profile, sorted."""
+        profile = self._profile_name(profile)
+        with self._lock:
+            if profile is None:
+                rows = self._conn.execute("SELECT word FROM words ORDER BY word")
+            else:
+                rows = self._conn.execute(
+                    """
+                    SELECT word FROM words WHERE word NOT IN (
+                        SELECT word FROM profile_words WHERE profile = ? AND excluded = 1)
+                    UNION
+                    SELECT word FROM profile_words WHERE profile = ? AND excluded = 0
+                    ORDER BY word
+                    """,
+                    (profile, profile),
+                )
+            return [row[0] for row in rows]
+
+    def flagger(self, profile: Optional[str] = None) -> WordFlagger:
+        """
+        The compiled flagger for the shared list or for a profile.
+
+        Checks the stored versions at most once per ``reload_interval_s`` and recompiles
+        only what another worker has changed.
+        """
+        profile = self._profile_name(profile)
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval_s:
+            with self._lock:
+                self._checked_at = now
+                if self.version() != self._version:
+                    self._reload()
+        if profile is None:
+            return self._flagger
+        return self._profile_flagger(profile, now)
+
+    def _reload(self) -> None:
+        with self._lock:
+            # Read version and words from the same snapshot
+            self._conn.execute("BEGIN")
+            try:
+                version = self.version()
+                words = [row[0] for row in self._conn.execute("SELECT word FROM words")]
+            finally:
+                self._conn.execute("COMMIT")
+            self._flagger = WordFlagger(words)
+            self._version = version
+            self._generation += 1
+            self._checked_at = time.monotonic()
+            logger.info("📚 Vocabulary filter loaded: %d words (version %s)", len(words), version)
+
+    def _profile_flagger(self, profile: str, now: float) -> LayeredWordFlagger:
+        with self._lock:
+            entry = self._profiles.get(profile)
+            if entry is not None:
+                self._profiles.move_to_end(profile)
+                if now - entry.checked_at >= self.reload_interval_s:
+                    entry.checked_at = now
+                    if self.version(profile) != entry.version:
+                        entry = None
+            if entry is None:
+                entry = self._load_profile(profile, now)
+            elif entry.base_generation != self._generation:
+                # Shared list changed: re-layer the cached delta, no DB access needed
+                entry.flagger = LayeredWordFlagger(self._flagger, entry.added, entry.excluded)
+                entry.base_generation = self._generation
+            return entry.flagger
+
+    def _load_profile(self, profile: str, now: float) -> _ProfileEntry:
+        self._conn.execute("BEGIN")
+        try:
+            version = self.version(profile)
+            rows = self._conn.execute(
+                "SELECT word, excluded FROM profile_words WHERE profile = ?", (profile,)
+            ).fetchall()
+        finally:
+            self._conn.execute("COMMIT")
+        added = frozenset(word for word, excluded in rows if not excluded)
+        excluded = frozenset(word for word, excluded in rows if excluded)
+        entry = _ProfileEntry(
+            version, self._generation, added, excluded,
+            LayeredWordFlagger(self._flagger, added, excluded), now,
+        )
+        self._profiles[profile] = entry
+        while len(self._profiles) > self.profile_cache_size:
+            self._profiles.popitem(last=False)
+        return entry
+
+    # ----------------------------
+    # Writes
+    # ----------------------------
+    def add(self, words: Iterable[str], profile: Optional[str] = None) -> int:
+        """
+        Add entries to the shared list or to a profile. Returns the number of new entries.
+        """
+        words = _normalized(words)
+        profile = self._profile_name(profile)
+        if profile is not None:
+            return self._write_profile(profile, lambda: self._profile_add(profile, words))
+        return self._write(
+            lambda: self._executemany_count("INSERT OR IGNORE INTO words (word) VALUES (?)", [(w,) for w in words]),
+            lambda flagger: flagger.add_words(words),
+        )
+
+    def remove(self, words: Iterable[str], profile: Optional[str] = None) -> int:
+        """
+        Remove entries from the shared list or from a profile (shared entries are then
+        excluded for that profile). Returns the number of entries that were present.
+        """
+        words = _normalized(words)
+        profile = self._profile_name(profile)
+        if profile is not None:
+            return self._write_profile(profile, lambda: self._profile_remove(profile, words))
+        return self._write(
+            lambda: self._executemany_count("DELETE FROM words WHERE word = ?", [(w,) for w in words]),
+            lambda flagger: flagger.remove_words(words),
+        )
+
+    def replace(self, words: Iterable[str], profile: Optional[str] = None) -> int:
+        """
+        Replace the shared list or the effective list of a profile. Returns the new number
+        of entries.
+        """
+        words = _normalized(words)
+        profile = self._profile_name(profile)
+        if profile is not None:
+            def write_profile():
+                self._conn.execute("DELETE FROM profile_words WHERE profile = ?", (profile,))
+                base = {row[0] for row in self._conn.execute("SELECT word FROM words")}
+                wanted = set(words)
+                self._conn.executemany(
+                    "INSERT INTO profile_words (profile, word, excluded) VALUES (?, ?, 1)",
+                    ((profile, w) for w in base - wanted),
+                )
+                self._conn.executemany(
+                    "INSERT INTO profile_words (profile, word, excluded) VALUES (?, ?, 0)",
+                    ((profile, w) for w in words if w not in base),
+                )
+                return 1
+
+            self._write_profile(profile, write_profile)
+            return len(self.flagger(profile).bad_words)
+
+        def write():
+            self._conn.execute("DELETE FROM words")
+            self._executemany_count("INSERT OR IGNORE INTO words (word) VALUES (?)", [(w,) for w in words])
+            return 1
+
+        self._write(write, lambda flagger: flagger.set_words(words))
+        return len(self._flagger.bad_words)
+
+    def _executemany_count(self, sql: str, rows: List[tuple]) -> int:
+        before = self._conn.total_changes
+        self._conn.executemany(sql, rows)
+        return self._conn.total_changes - before
+
+    def _in_base(self, word: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM words WHERE word = ?", (word,)).fetchone() is not None
+
+    def _profile_add(self, profile: str, words: List[str]) -> int:
+        shared = {w for w in words if self._in_base(w)}
+        excluded = [(profile, w) for w in words if w in shared]
+        added = [(profile, w) for w in words if w not in shared]
+        # Adding a shared entry back only lifts its exclusion
+        return self._executemany_count(
+            "DELETE FROM profile_words WHERE profile = ? AND word = ? AND excluded = 1", excluded
+        ) + self._executemany_count(
+            """
+            INSERT INTO profile_words (profile, word, excluded) VALUES (?, ?, 0)
+            ON CONFLICT (profile, word) DO UPDATE SET excluded = 0 WHERE excluded = 1
+            """,
+            added,
+        )
+
+    def _profile_remove(self, profile: str, words: List[str]) -> int:
+        shared = {w for w in words if self._in_base(w)}
+        excluded = [(profile, w) for w in words if w in shared]
+        own = [(profile, w) for w in words if w not in shared]
+        return self._executemany_count(
+            """
+            INSERT INTO profile_words (profile, word, excluded) VALUES (?, ?, 1)
+            ON CONFLICT (profile, word) DO UPDATE SET excluded = 1 WHERE excluded = 0
+            """,
+            excluded,
+        ) + self._executemany_count(
+            "DELETE FROM profile_words WHERE profile = ? AND word = ? AND excluded = 0", own
+        )
+
+    def _write(self, write, apply) -> int:
+        """
+        Run ``write`` in one transaction and bump the version if anything changed.
+
+        If no other worker wrote in between, ``apply`` updates the local matcher in place;
+        otherwise the whole list is reloaded.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self.version()
+                changed = write()
+                if changed:
+                    self._bump_version()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            if not changed:
+                return 0
+            if before == self._version:
+                apply(self._flagger)
+                self._version = before + 1
+                self._generation += 1
+                self._checked_at = time.monotonic()
+            else:
+                self._reload()
+            return changed
+
+    def _write_profile(self, profile: str, write) -> int:
+        """
+        Run a profile ``write`` in one transaction and bump the profile version if anything
+        changed. The cached compiled profile is dropped and rebuilt on next use.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                changed = write()
+                if changed:
+                    self._conn.execute(
+                        """
+                        INSERT INTO profiles (name, version) VALUES (?, 1)
+                        ON CONFLICT (name) DO UPDATE SET version = version + 1
+                        """,
+                        (profile,),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            if changed:
+                self._profiles.pop(profile, None)
+            return changed
+
+
+def _normalized(words: Iterable[str]) -> List[str]:
+    """Normalize and de-duplicate entries, keeping their order."""
+    seen = {}
+    for word in words:
+        entry = normalize_entry(word)
+        if entry:
+            seen.setdefault(entry, None)
+    return list(seen)
@@ -0,0 +1,34 @@
+import unittest
+
+from src.ai.psycholinguistic_features import compute_psycholinguistic_features
+from src.backend.aggregation import EXTREMISM_THRESHOLD
+
+
+def absolutism(features):
+    # Stage 4 / window mode: mean of the absolutist and modal certainty scores
+    return (features["absolutist_score"] + features["certainty_score"]) / 2.0
+
+
+class CertaintyScoreTest(unittest.TestCase):
+    def test_single_strong_modal_is_not_absolutism(self):
+        [features] = compute_psycholinguistic_features(["I will call you tomorrow."])
+        self.assertLess(absolutism(features), EXTREMISM_THRESHOLD)
+
+    def test_repeated_strong_modals_reach_full_certainty(self):
+        [features] = compute_psycholinguistic_features(["We must act, we will act, we shall win."])
+        self.assertEqual(features["certainty_score"], 10.0)
+
+    def test_weak_modals_lower_certainty(self):
+        [strong, mixed] = compute_psycholinguistic_features([
+            "We must act, we will act, we shall win.",
+            "We must act, we might act, we could win.",
+        ])
+        self.assertLess(mixed["certainty_score"], strong["certainty_score"])
+
+    def test_no_modals(self):
+        [features] = compute_psycholinguistic_features(["The weather is nice."])
+        self.assertEqual(features["certainty_score"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+# file: transcriber/cache.py
+# Purpose: Persistent cache of ASR output (columnar word transcripts), keyed by the media
+#          content hash and the parameters that influence recognition.
+#
+# Sentence packing parameters (gap_s, max duration/chars) are deliberately NOT part of the
+# key: a cached transcript is re-packed with the requested rules, which takes milliseconds,
+# instead of re-running Whisper. Entries are files in one directory; a hit refreshes the
+# file's mtime and the least recently used files are evicted when the size budget is hit.
+# The language-ID result of a media file is cached next to it (small JSON entries keyed
+# by the content hash and the LID settings), so routing decisions are not repeated either.
+
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .columnar import ColumnarTranscript
+
+__all__ = [
+    "TranscriptCache",
+    "get_default_cache",
+    "hash_bytes",
+    "hash_file",
+]
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# Default configuration
+# ----------------------------
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TRANSCRIPT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "transcriber")
+)
+DEFAULT_CACHE_MAX_MB = float(os.environ.get("TRANSCRIPT_CACHE_MAX_MB", "1024"))
+CACHE_ENABLED = os.environ.get("TRANSCRIPT_CACHE", "1") != "0"
+
+_SUFFIX = ".tr"
+_LANG_SUFFIX = ".lang"
+_META_LEN = struct.Struct("<I")
+_FORMAT_VERSION = 1
+
+
+def hash_bytes(data: bytes) -> str:
+    """Hex SHA-256 of some content (same as the backend's media_id)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """Hex SHA-256 of a file, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class TranscriptCache:
+    """
+    Size-bounded on-disk LRU of (language, ColumnarTranscript) entries.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = int(DEFAULT_CACHE_MAX_MB * 1024 * 1024)):
+        """
+        Args:
+            directory: Cache directory (created on first write).
+            max_bytes: Total size budget; least recently used entries are removed first.
+        """
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(content_hash: str, asr_params: Dict[str, Any]) -> str:
+        """Cache key of some media transcribed with some ASR parameters."""
+        canonical = json.dumps(
+            {"v": _FORMAT_VERSION, "media": content_hash, "asr": asr_params},
+            sort_keys=True, separators=(",", ":"),
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key: str) -> Optional[Tuple[str, ColumnarTranscript]]:
+        """(language, transcript) for a key, or None. A hit marks the entry as recently used."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        try:
+            (meta_len,) = _META_LEN.unpack_from(data, 0)
+            meta = json.loads(data[_META_LEN.size:_META_LEN.size + meta_len].decode("utf-8"))
+            transcript = ColumnarTranscript.from_bytes(memoryview(data)[_META_LEN.size + meta_len:])
+            return meta.get("language"), transcript
+        except Exception as e:
+            logger.warning("⚠️ Dropping unreadable transcript cache entry %s: %s", path, e)
+            _remove(path)
+            return None
+
+    def put(self, key: str, language: str, transcript: ColumnarTranscript) -> None:
+        """Store an entry (atomically) and evict old entries beyond the size budget."""
+        meta = json.dumps({"language": language}).encode("utf-8")
+        payload = _META_LEN.pack(len(meta)) + meta + transcript.to_bytes()
+        with self._lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                path = self._path(key)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+                self._prune()
+            except OSError as e:
+                logger.warning("⚠️ Transcript cache write failed: %s", e)
+
+    def get_language(self, key: str) -> Optional[Tuple[str, float]]:
+        """Cached (language, probability) of a language-ID key, or None."""
+        path = os.path.join(self.directory, key + _LANG_SUFFIX)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            os.utime(path)
+            return meta["language"], float(meta["probability"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def put_language(self, key: str, language: str, probability: float) -> None:
+        """Store a language-ID result."""
+        payload = json.dumps({"language": language, "probability": probability})
+        with self._lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, key + _LANG_SUFFIX)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning("⚠️ Transcript cache write failed: %s", e)
+
+    def _prune(self) -> None:
+        if not self.max_bytes:
+            return
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith((_SUFFIX, _LANG_SUFFIX)):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_DEFAULT_CACHE: Optional[TranscriptCache] = None
+
+
+def get_default_cache() -> Optional[TranscriptCache]:
+    """Process-wide cache configured from env (None if TRANSCRIPT_CACHE=0)."""
+    global _DEFAULT_CACHE
+    if not CACHE_ENABLED:
+        return None
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = TranscriptCache()
+    return _DEFAULT_CACHE
@@ -0,0 +1,174 @@
+# file: transcriber/columnar.py
+# Purpose: Compact, columnar storage of timed ASR words for long transcripts.
+#
+# Instead of one {"w","s","e"} dict per word, a transcript is stored as parallel float32
+# start/end arrays plus one string buffer with per-word offsets (~12 bytes per word plus
+# the text, versus a few hundred bytes per dict). Time-range slices are views sharing the
+# same arrays and buffer, and the whole transcript serializes to a compact binary blob.
+# float32 keeps ~1 ms resolution for times up to ~4.6 hours.
+
+import struct
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+
+from .sentence_packer import Word
+
+__all__ = [
+    "ColumnarTranscript",
+    "ColumnarBuilder",
+]
+
+_MAGIC = b"CTR1"
+_HEADER = struct.Struct("<4sII")  # magic, n_words, text bytes
+
+
+class ColumnarTranscript:
+    """
+    Words as columns: ``starts``/``ends`` (float32 seconds) and ``text[offsets[i]:offsets[i+1]]``.
+    """
+
+    __slots__ = ("starts", "ends", "offsets", "text")
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, offsets: np.ndarray, text: str):
+        """
+        Args:
+            starts: float32 start times, one per word.
+            ends: float32 end times, one per word.
+            offsets: len(starts) + 1 character offsets into ``text`` (not necessarily from 0).
+            text: Shared buffer with all word tokens concatenated.
+        """
+        self.starts = starts
+        self.ends = ends
+        self.offsets = offsets
+        self.text = text
+
+    # ----------------------------
+    # Construction
+    # ----------------------------
+    @classmethod
+    def from_words(cls, words: Iterable[Union[Word, Dict[str, Any]]]) -> "ColumnarTranscript":
+        """Build from Word records or word dicts ({"w","s","e"} or {"word","start","end"})."""
+        builder = ColumnarBuilder()
+        for w in words:
+            builder.append(w if isinstance(w, Word) else Word.from_dict(w))
+        return builder.build()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ColumnarTranscript":
+        """Inverse of to_bytes (arrays are read-only views on ``data``)."""
+        magic, n, text_len = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError("Not a columnar transcript")
+        pos = _HEADER.size
+        starts = np.frombuffer(data, dtype="<f4", count=n, offset=pos)
+        pos += 4 * n
+        ends = np.frombuffer(data, dtype="<f4", count=n, offset=pos)
+        pos += 4 * n
+        offsets = np.frombuffer(data, dtype="<u4", count=n + 1, offset=pos)
+        pos += 4 * (n + 1)
+        text = bytes(data[pos:pos + text_len]).decode("utf-8")
+        return cls(starts, ends, offsets, text)
+
+    def to_bytes(self) -> bytes:
+        """Compact little-endian binary form (header, starts, ends, offsets, UTF-8 text)."""
+        base = int(self.offsets[0]) if len(self.offsets) else 0
+        text = self.text[base:int(self.offsets[-1])] if len(self.offsets) else ""
+        encoded = text.encode("utf-8")
+        # Offsets are character offsets; store them relative to the stored text
+        offsets = (np.asarray(self.offsets, dtype=np.int64) - base).astype("<u4")
+        return b"".join((
+            _HEADER.pack(_MAGIC, len(self), len(encoded)),
+            np.asarray(self.starts, dtype="<f4").tobytes(),
+            np.asarray(self.ends, dtype="<f4").tobytes(),
+            offsets.tobytes(),
+            encoded,
+        ))
+
+    # ----------------------------
+    # Access
+    # ----------------------------
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def token(self, i: int) -> str:
+        return self.text[self.offsets[i]:self.offsets[i + 1]]
+
+    def tokens(self) -> List[str]:
+        text, offsets = self.text, self.offsets.tolist()
+        return [text[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+    def columns(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """(tokens, starts, ends) — the form consumed by the vocabulary flagger."""
+        return self.tokens(), self.starts, self.ends
+
+    def word(self, i: int) -> Word:
+        return Word(self.token(i), float(self.starts[i]), float(self.ends[i]))
+
+    def __iter__(self) -> Iterator[Word]:
+        """Words as Word records (e.g. to feed sentence_packer.iter_sentences)."""
+        starts, ends = self.starts.tolist(), self.ends.tolist()
+        for i, token in enumerate(self.tokens()):
+            yield Word(token, starts[i], ends[i])
+
+    def __getitem__(self, index: slice) -> "ColumnarTranscript":
+        """Word-index slice; a view sharing the arrays and the text buffer."""
+        if not isinstance(index, slice) or index.step not in (None, 1):
+            raise TypeError("ColumnarTranscript supports contiguous slices only; use word(i)")
+        start, stop, _ = index.indices(len(self))
+        stop = max(start, stop)
+        return ColumnarTranscript(
+            self.starts[start:stop], self.ends[start:stop], self.offsets[start:stop + 1], self.text
+        )
+
+    def slice_time(self, start_s: float, end_s: float) -> "ColumnarTranscript":
+        """Words starting in [start_s, end_s) — binary search, no copy (starts are sorted)."""
+        lo = int(np.searchsorted(self.starts, start_s, side="left"))
+        hi = int(np.searchsorted(self.starts, end_s, side="left"))
+        return self[lo:hi]
+
+    # ----------------------------
+    # Conversion
+    # ----------------------------
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """The transcribe_file ``words`` shape: [{"w","s","e"}, ...] (times rounded to ms)."""
+        starts = np.round(self.starts.astype(np.float64), 3).tolist()
+        ends = np.round(self.ends.astype(np.float64), 3).tolist()
+        return [{"w": t, "s": s, "e": e} for t, s, e in zip(self.tokens(), starts, ends)]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by this view (arrays + its part of the text)."""
+        chars = int(self.offsets[-1] - self.offsets[0]) if len(self.offsets) else 0
+        return self.starts.nbytes + self.ends.nbytes + self.offsets.nbytes + chars
+
+
+class ColumnarBuilder:
+    """Append-only builder (compact stdlib arrays while growing, numpy at the end)."""
+
+    __slots__ = ("_starts", "_ends", "_offsets", "_parts", "_pos")
+
+    def __init__(self):
+        self._starts = array("f")
+        self._ends = array("f")
+        self._offsets = array("I", [0])
+        self._parts: List[str] = []
+        self._pos = 0
+
+    def append(self, word: Word) -> None:
+        self._starts.append(word.start)
+        self._ends.append(word.end)
+        self._parts.append(word.text)
+        self._pos += len(word.text)
+        self._offsets.append(self._pos)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def build(self) -> ColumnarTranscript:
+        return ColumnarTranscript(
+            np.frombuffer(self._starts, dtype=np.float32),
+            np.frombuffer(self._ends, dtype=np.float32),
+            np.frombuffer(self._offsets, dtype=np.uint32),
+            "".join(self._parts),
+        )
@@ -0,0 +1,88 @@
+# file: transcriber/language.py
+# Purpose: Fast spoken-language identification on the first seconds of audio, and the
+#          routing decisions built on it (English-only Whisper models, languages the
+#          downstream analysis supports).
+#
+# A tiny Whisper model only runs its encoder + language token on one 30 s window, which
+# is far cheaper than letting the (larger) transcription model auto-detect. When the
+# audio is confidently English, the profile's model is swapped for its ".en" variant
+# (more accurate at the same size) and the known language is passed to the decoder.
+
+import os
+import wave
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+__all__ = [
+    "identify_language",
+    "read_wav_head",
+    "english_model_for",
+    "analysis_supported",
+    "DEFAULT_LID_MODEL",
+    "DEFAULT_LID_SECONDS",
+    "DEFAULT_LID_MIN_PROB",
+]
+
+# ----------------------------
+# Default configuration
+# ----------------------------
+DEFAULT_LID_MODEL = os.environ.get("LID_MODEL", "tiny")
+DEFAULT_LID_SECONDS = float(os.environ.get("LID_SECONDS", "30"))        # Whisper sees 30 s windows
+DEFAULT_LID_MIN_PROB = float(os.environ.get("LID_MIN_PROB", "0.7"))     # below: let ASR decide
+ROUTE_ENGLISH = os.environ.get("ASR_ROUTE_ENGLISH", "1") != "0"
+ANALYSIS_LANGUAGES = frozenset(
+    code.strip().lower() for code in os.environ.get("ANALYSIS_LANGUAGES", "en").split(",") if code.strip()
+)
+
+# Whisper sizes that ship an English-only checkpoint (large-* do not)
+_ENGLISH_VARIANTS = {"tiny", "base", "small", "medium"}
+
+
+def read_wav_head(wav_path: str, seconds: float = DEFAULT_LID_SECONDS) -> np.ndarray:
+    """
+    First ``seconds`` of a 16-bit PCM WAV as float32 in [-1, 1] (mono; channels averaged).
+    Only that part of the file is read.
+    """
+    with wave.open(wav_path, "rb") as w:
+        channels = w.getnchannels()
+        frames = w.readframes(int(seconds * w.getframerate()))
+        if w.getsampwidth() != 2:
+            raise ValueError("Expected 16-bit PCM WAV")
+    audio = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio
+
+
+def identify_language(model, wav_path: str, seconds: float = DEFAULT_LID_SECONDS) -> Tuple[str, float]:
+    """
+    Language of the start of a 16 kHz WAV.
+
+    Args:
+        model: A faster_whisper.WhisperModel (typically "tiny").
+        wav_path: 16 kHz mono WAV (see transcribe._extract_wav).
+        seconds: How much audio to look at.
+
+    Returns:
+        (language code, probability)
+    """
+    audio = read_wav_head(wav_path, seconds)
+    # transcribe() detects the language eagerly and decodes lazily; the segment
+    # generator is never iterated, so no text is decoded here.
+    _, info = model.transcribe(audio, beam_size=1, vad_filter=False)
+    return info.language, float(info.language_probability)
+
+
+def english_model_for(model_size: str) -> Optional[str]:
+    """The English-only variant of a Whisper size ("small" -> "small.en"), or None."""
+    if model_size.endswith(".en"):
+        return model_size
+    if ROUTE_ENGLISH and model_size in _ENGLISH_VARIANTS:
+        return model_size + ".en"
+    return None
+
+
+def analysis_supported(language: Optional[str], supported: Iterable[str] = ANALYSIS_LANGUAGES) -> bool:
+    """True if the LLM analysis prompts handle this language (env ANALYSIS_LANGUAGES, default "en")."""
+    return bool(language) and language.lower() in set(supported)
@@ -0,0 +1,173 @@
+# file: transcriber/media_probe.py
+# Purpose: Probe media with ffprobe, pick the audio stream, and extract only that stream
+#          as 16 kHz mono PCM (for ASR and for the backend waveform).
+#
+# ffmpeg only decodes the streams it maps: mapping the one audio stream (and disabling
+# video/subtitle/data) keeps a large video container down to demuxing plus one audio
+# decode, instead of librosa's audioread fallback or an implicit stream choice. PCM comes
+# back over a pipe as float32, so no intermediate file is needed for the waveform.
+
+import json
+import os
+import subprocess
+from pathlib import Path
+from shutil import which
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+__all__ = [
+    "MediaInfo",
+    "probe",
+    "extract_pcm",
+    "extract_wav",
+    "ASR_SAMPLE_RATE",
+]
+
+ASR_SAMPLE_RATE = 16000
+FFMPEG_BIN = os.environ.get("FFMPEG_BIN")    # set full path if ffmpeg isn't on PATH
+FFPROBE_BIN = os.environ.get("FFPROBE_BIN")
+FFMPEG_THREADS = int(os.environ.get("FFMPEG_THREADS", "0"))   # 0 = ffmpeg decides
+
+
+def _binary(env_path: Optional[str], name: str) -> str:
+    """Find an FFmpeg tool (env override wins; ffprobe is also looked up next to FFMPEG_BIN)."""
+    if env_path and Path(env_path).exists():
+        return env_path
+    if FFMPEG_BIN and name != "ffmpeg":
+        sibling = Path(FFMPEG_BIN).with_name(name + Path(FFMPEG_BIN).suffix)
+        if sibling.exists():
+            return str(sibling)
+    found = which(name)
+    if found:
+        return found
+    raise RuntimeError(
+        f"{name} not found. Install FFmpeg and/or set {name.upper()}_BIN to its full path. "
+        "Windows: winget install -e --id Gyan.FFmpeg"
+    )
+
+
+class MediaInfo:
+    """What ffprobe reports about a file (only the parts used for stream selection)."""
+
+    __slots__ = ("format_name", "duration_s", "streams")
+
+    def __init__(self, format_name: str, duration_s: Optional[float], streams: List[Dict[str, Any]]):
+        self.format_name = format_name
+        self.duration_s = duration_s
+        self.streams = streams
+
+    @property
+    def audio_streams(self) -> List[Dict[str, Any]]:
+        return [s for s in self.streams if s.get("codec_type") == "audio"]
+
+    @property
+    def has_video(self) -> bool:
+        return any(
+            s.get("codec_type") == "video" and not (s.get("disposition") or {}).get("attached_pic")
+            for s in self.streams
+        )
+
+    def audio_stream(self) -> Optional[Dict[str, Any]]:
+        """
+        The audio stream to transcribe: the container's default audio stream if flagged,
+        else the one with the most channels (main mix over commentary/mono tracks), else
+        the first.
+        """
+        audio = self.audio_streams
+        if not audio:
+            return None
+        for s in audio:
+            if (s.get("disposition") or {}).get("default"):
+                return s
+        return max(audio, key=lambda s: int(s.get("channels") or 0))
+
+
+def probe(src_path: str) -> MediaInfo:
+    """
+    Run ffprobe on a file.
+
+    Raises:
+        RuntimeError: ffprobe missing or the file is not readable media.
+    """
+    out = subprocess.run(
+        [
+            _binary(FFPROBE_BIN, "ffprobe"), "-v", "error",
+            "-show_entries",
+            "format=format_name,duration:"
+            "stream=index,codec_type,codec_name,sample_rate,channels:stream_disposition=default,attached_pic",
+            "-of", "json",
+            src_path,
+        ],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False,
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on {src_path}: {out.stderr.decode('utf-8', 'replace').strip()}")
+    data = json.loads(out.stdout or b"{}")
+    fmt = data.get("format") or {}
+    try:
+        duration = float(fmt["duration"])
+    except (KeyError, TypeError, ValueError):
+        duration = None
+    return MediaInfo(fmt.get("format_name", ""), duration, data.get("streams") or [])
+
+
+def _audio_args(src_path: str, info: Optional[MediaInfo], sample_rate: int, threads: int) -> List[str]:
+    """ffmpeg input + stream selection + resampling arguments (output not included)."""
+    if info is None:
+        info = probe(src_path)
+    stream = info.audio_stream()
+    if stream is None:
+        raise RuntimeError(f"No audio stream in {src_path}")
+    return [
+        _binary(FFMPEG_BIN, "ffmpeg"), "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-threads", str(threads),
+        "-i", src_path,
+        "-map", f"0:{stream['index']}",
+        "-vn", "-sn", "-dn",          # never decode video/subtitles/data
+        "-ac", "1",
+        "-ar", str(sample_rate),
+    ]
+
+
+def extract_pcm(
+    src_path: str,
+    sample_rate: int = ASR_SAMPLE_RATE,
+    info: Optional[MediaInfo] = None,
+    threads: int = FFMPEG_THREADS,
+) -> np.ndarray:
+    """
+    Decode only the selected audio stream to mono float32 PCM (read from a pipe).
+
+    Args:
+        src_path: Any audio/video file FFmpeg can read.
+        sample_rate: Output rate; 16 kHz is what Whisper expects.
+        info: probe() result if already available (saves one ffprobe run).
+        threads: ffmpeg decoding threads (0 = automatic).
+
+    Returns:
+        1-D float32 array in [-1, 1].
+    """
+    cmd = _audio_args(src_path, info, sample_rate, threads) + ["-f", "f32le", "pipe:1"]
+    out = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if out.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed on {src_path}: {out.stderr.decode('utf-8', 'replace').strip()}")
+    return np.frombuffer(out.stdout, dtype="<f4")
+
+
+def extract_wav(
+    src_path: str,
+    wav_path: str,
+    sample_rate: int = ASR_SAMPLE_RATE,
+    info: Optional[MediaInfo] = None,
+    threads: int = FFMPEG_THREADS,
+) -> str:
+    """
+    Write only the selected audio stream as a 16-bit mono WAV (see extract_pcm for args).
+    Returns wav_path.
+    """
+    cmd = _audio_args(src_path, info, sample_rate, threads) + ["-c:a", "pcm_s16le", "-y", wav_path]
+    out = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False)
+    if out.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed on {src_path}: {out.stderr.decode('utf-8', 'replace').strip()}")
+    return wav_path
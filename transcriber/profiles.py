@@ -0,0 +1,147 @@
+# file: transcriber/profiles.py
+# Purpose: Named ASR speed/accuracy profiles ("fast", "balanced", "accurate") bundling the
+#          Whisper model and decoding settings, selectable per transcription call.
+#
+# "balanced" reproduces the historical transcribe_file settings (FW_MODEL, beam 5, VAD with
+# 500 ms silences). "fast" is for bulk triage: greedy decoding, no temperature fallback,
+# aggressive VAD and batched decoding when the installed faster-whisper supports it.
+# "accurate" is for escalations: large-v3, wider beam and the full temperature fallback.
+
+import os
+from typing import Any, Dict, Optional, Tuple, Union
+
+__all__ = [
+    "AsrProfile",
+    "PROFILES",
+    "DEFAULT_PROFILE",
+    "get_profile",
+]
+
+# Whisper's own fallback schedule: retry a segment at higher temperatures when the
+# decoded text looks degenerate (compression ratio / log-prob thresholds).
+_FULL_FALLBACK = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+
+class AsrProfile:
+    """Model + decoding settings for one transcription profile."""
+
+    __slots__ = (
+        "name", "model_size", "compute_type", "beam_size", "best_of", "temperature",
+        "vad_filter", "vad_parameters", "cpu_threads", "batch_size", "condition_on_previous_text",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        model_size: str,
+        beam_size: int = 5,
+        best_of: int = 5,
+        compute_type: Optional[str] = None,
+        temperature: Tuple[float, ...] = _FULL_FALLBACK,
+        vad_filter: bool = True,
+        vad_parameters: Optional[Dict[str, Any]] = None,
+        cpu_threads: int = 0,
+        batch_size: int = 0,
+        condition_on_previous_text: bool = True,
+    ):
+        """
+        Args:
+            name: Profile name.
+            model_size: Whisper model ("tiny"|"base"|"small"|"medium"|"large-v3", or a path).
+            beam_size: Beam width; 1 = greedy decoding.
+            best_of: Candidates sampled at non-zero temperature.
+            compute_type: CTranslate2 compute type; None = "int8" on CPU, "float16" on CUDA.
+            temperature: Temperature fallback schedule; a single 0.0 disables fallback.
+            vad_filter: Drop non-speech with Silero VAD before decoding.
+            vad_parameters: VAD options (e.g. min_silence_duration_ms, speech_pad_ms).
+            cpu_threads: CTranslate2 threads on CPU; 0 = library default.
+            batch_size: >0 decodes VAD chunks in batches (faster-whisper >= 1.1), else sequentially.
+            condition_on_previous_text: Prompt each window with the previous text.
+        """
+        self.name = name
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.best_of = best_of
+        self.temperature = tuple(temperature)
+        self.vad_filter = vad_filter
+        self.vad_parameters = dict(vad_parameters or {})
+        self.cpu_threads = cpu_threads
+        self.batch_size = batch_size
+        self.condition_on_previous_text = condition_on_previous_text
+
+    def transcribe_options(self) -> Dict[str, Any]:
+        """Keyword arguments for WhisperModel.transcribe (except audio/word_timestamps)."""
+        options: Dict[str, Any] = {
+            "beam_size": self.beam_size,
+            "best_of": self.best_of,
+            "temperature": list(self.temperature),
+            "vad_filter": self.vad_filter,
+            "condition_on_previous_text": self.condition_on_previous_text,
+        }
+        if self.vad_filter and self.vad_parameters:
+            options["vad_parameters"] = dict(self.vad_parameters)
+        return options
+
+    def cache_params(self) -> Dict[str, Any]:
+        """Settings that change the recognized words (threads do not)."""
+        params = self.transcribe_options()
+        params["batch_size"] = self.batch_size
+        return params
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"AsrProfile({self.name!r}, model={self.model_size!r}, beam={self.beam_size})"
+
+
+# ----------------------------
+# Built-in profiles
+# ----------------------------
+PROFILES: Dict[str, AsrProfile] = {
+    "fast": AsrProfile(
+        "fast",
+        model_size=os.environ.get("ASR_FAST_MODEL", "base"),
+        beam_size=1,
+        best_of=1,
+        temperature=(0.0,),
+        vad_parameters=dict(min_silence_duration_ms=300, speech_pad_ms=200),
+        cpu_threads=int(os.environ.get("ASR_FAST_THREADS", str(os.cpu_count() or 4))),
+        batch_size=int(os.environ.get("ASR_FAST_BATCH", "8")),
+        condition_on_previous_text=False,
+    ),
+    "balanced": AsrProfile(
+        "balanced",
+        model_size=os.environ.get("FW_MODEL", "base"),
+        beam_size=5,
+        vad_parameters=dict(min_silence_duration_ms=500),
+    ),
+    "accurate": AsrProfile(
+        "accurate",
+        model_size=os.environ.get("ASR_ACCURATE_MODEL", "large-v3"),
+        beam_size=8,
+        best_of=5,
+        vad_parameters=dict(min_silence_duration_ms=1000, speech_pad_ms=400),
+    ),
+}
+
+DEFAULT_PROFILE = os.environ.get("ASR_PROFILE", "balanced")
+
+
+def get_profile(profile: Union[str, AsrProfile, None] = None) -> AsrProfile:
+    """
+    Resolve a profile name (or pass an AsrProfile through).
+
+    Raises:
+        ValueError: Unknown profile name.
+    """
+    if isinstance(profile, AsrProfile):
+        return profile
+    name = profile or DEFAULT_PROFILE
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown ASR profile: {name!r} (expected one of {', '.join(PROFILES)})"
+        ) from None
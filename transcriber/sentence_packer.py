@@ -0,0 +1,173 @@
+# file: transcriber/sentence_packer.py
+# Purpose: Greedy, streaming packing of timed ASR words into sentence-like chunks.
+#          Shared by transcribe.py and transcribe_to_sentences.py.
+
+import os
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+__all__ = [
+    "Word",
+    "Sentence",
+    "SplitRules",
+    "SentencePacker",
+    "iter_sentences",
+    "pack_sentences",
+]
+
+# ----------------------------
+# Default configuration
+# ----------------------------
+DEFAULT_GAP_S = float(os.environ.get("SENTENCE_GAP_S", "0.8"))
+DEFAULT_MAX_DURATION_S = float(os.environ.get("SENTENCE_MAX_S", "0")) or None      # 0 = no limit
+DEFAULT_MAX_CHARS = int(os.environ.get("SENTENCE_MAX_CHARS", "0")) or None         # 0 = no limit
+
+_SENT_PUNCT = re.compile(r"\s+([,.!?])")
+_CLOSERS = "\"')]}»”’"
+
+
+class Word:
+    """One timed ASR token (slots instead of a per-word dict)."""
+
+    __slots__ = ("text", "start", "end")
+
+    def __init__(self, text: str, start: float, end: float):
+        self.text = text
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Word":
+        """Accepts both {"w","s","e"} (transcribe.py) and {"word","start","end"} items."""
+        if "w" in d:
+            return cls(d["w"], float(d["s"] or 0.0), float(d["e"] or 0.0))
+        return cls(d["word"], float(d["start"] or 0.0), float(d["end"] or 0.0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"w": self.text, "s": self.start, "e": self.end}
+
+    def __repr__(self) -> str:
+        return f"Word({self.text!r}, {self.start:.2f}, {self.end:.2f})"
+
+
+class Sentence:
+    """A packed sentence; ``first_word``/``last_word`` index the input word stream."""
+
+    __slots__ = ("start", "end", "text", "first_word", "last_word")
+
+    def __init__(self, start: float, end: float, text: str, first_word: int, last_word: int):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.first_word = first_word
+        self.last_word = last_word
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The sentence shape returned by transcribe_file."""
+        return {"start": round(self.start, 2), "end": round(self.end, 2), "text": self.text}
+
+    def __repr__(self) -> str:
+        return f"Sentence({self.start:.2f}-{self.end:.2f}, {self.text!r})"
+
+
+class SplitRules:
+    """When to close the current sentence."""
+
+    __slots__ = ("punctuation", "gap_s", "max_duration_s", "max_chars")
+
+    def __init__(
+        self,
+        punctuation: Tuple[str, ...] = (".", "!", "?"),
+        gap_s: Optional[float] = DEFAULT_GAP_S,
+        max_duration_s: Optional[float] = DEFAULT_MAX_DURATION_S,
+        max_chars: Optional[int] = DEFAULT_MAX_CHARS,
+    ):
+        """
+        Args:
+            punctuation: A word ending with one of these (before closing quotes/brackets)
+                ends the sentence. Empty tuple disables punctuation splits.
+            gap_s: A pause of at least this many seconds before a word starts a new sentence.
+            max_duration_s: A word that would make the sentence longer than this starts a new one.
+            max_chars: A word that would make the text longer than this starts a new one.
+        """
+        self.punctuation = tuple(punctuation)
+        self.gap_s = gap_s
+        self.max_duration_s = max_duration_s
+        self.max_chars = max_chars
+
+
+class SentencePacker:
+    """
+    Incremental packer: feed words one at a time, get sentences as soon as they are
+    complete. Only the words of the current (unfinished) sentence are kept in memory.
+    """
+
+    def __init__(self, rules: Optional[SplitRules] = None):
+        self.rules = rules or SplitRules()
+        self._tokens: List[str] = []
+        self._chars = 0
+        self._start = 0.0
+        self._end = 0.0
+        self._first = 0
+        self._index = 0
+
+    def feed(self, word: Word) -> Iterator[Sentence]:
+        """Add the next word; yields the sentence(s) it completes (zero, one or two)."""
+        rules = self.rules
+        token = word.text.strip()
+        if self._tokens:
+            if rules.gap_s is not None and word.start - self._end >= rules.gap_s:
+                yield self._flush()
+            elif rules.max_duration_s and word.end - self._start > rules.max_duration_s:
+                yield self._flush()
+            elif rules.max_chars and self._chars + 1 + len(token) > rules.max_chars:
+                yield self._flush()
+
+        if token:
+            if not self._tokens:
+                self._start = word.start
+                self._first = self._index
+            self._tokens.append(token)
+            self._chars += len(token) + (1 if len(self._tokens) > 1 else 0)
+            self._end = word.end
+        self._index += 1
+
+        if self._tokens and rules.punctuation and token.rstrip(_CLOSERS).endswith(rules.punctuation):
+            yield self._flush()
+
+    def close(self) -> Iterator[Sentence]:
+        """Yields the last, unfinished sentence (if any)."""
+        if self._tokens:
+            yield self._flush()
+
+    def _flush(self) -> Sentence:
+        text = _SENT_PUNCT.sub(r"\1", " ".join(self._tokens))  # tighten spaces before punctuation
+        sentence = Sentence(self._start, self._end, text, self._first, self._index - 1)
+        self._tokens = []
+        self._chars = 0
+        return sentence
+
+
+def iter_sentences(words: Iterable[Word], rules: Optional[SplitRules] = None) -> Iterator[Sentence]:
+    """
+    Lazily pack a word stream into sentences.
+
+    Args:
+        words: Any iterable of Word (e.g. a generator over Whisper segments).
+        rules: Split rules; defaults from env (SENTENCE_GAP_S, SENTENCE_MAX_S, SENTENCE_MAX_CHARS).
+
+    Yields:
+        Sentence objects, in order, as soon as each one is complete.
+    """
+    packer = SentencePacker(rules)
+    for word in words:
+        yield from packer.feed(word)
+    yield from packer.close()
+
+
+def pack_sentences(words: Iterable[Any], rules: Optional[SplitRules] = None) -> List[dict]:
+    """
+    Pack words (Word objects or word dicts) into sentence dicts ``{"start","end","text"}``.
+    """
+    stream = (w if isinstance(w, Word) else Word.from_dict(w) for w in words)
+    return [s.to_dict() for s in iter_sentences(stream, rules)]
@@ -2,116 +2,207 @@
 # Purpose: Call from your backend to transcribe any audio/video file into sentence-level
 #          timestamps (and optionally word-level), without running an HTTP server.
 
+import logging
 import os
-import re
 import tempfile
-import subprocess
+import time
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Tuple, Union
 
 from faster_whisper import WhisperModel
 
+from .cache import TranscriptCache, get_default_cache, hash_bytes, hash_file
+from .columnar import ColumnarBuilder, ColumnarTranscript
+from .language import (
+    DEFAULT_LID_MIN_PROB,
+    DEFAULT_LID_MODEL,
+    DEFAULT_LID_SECONDS,
+    english_model_for,
+    identify_language,
+)
+from .media_probe import extract_wav
+from .profiles import AsrProfile, get_profile
+from .sentence_packer import (
+    DEFAULT_GAP_S,
+    DEFAULT_MAX_CHARS,
+    DEFAULT_MAX_DURATION_S,
+    SplitRules,
+    Word,
+    iter_sentences,
+    pack_sentences,
+)
+
 __all__ = [
     "transcribe_file",
+    "iter_transcribe_file",
     "transcribe_bytes",
     "save_srt",
 ]
 
+logger = logging.getLogger(__name__)
+
 # ----------------------------
 # Default configuration
 # ----------------------------
-DEFAULT_MODEL = os.environ.get("FW_MODEL", "base")   # "base"|"small"|"medium"|"large-v3"
 DEFAULT_DEVICE = os.environ.get("FW_DEVICE", "cpu")    # "cpu"|"cuda"
 DEFAULT_COMPUTE = "int8" if DEFAULT_DEVICE == "cpu" else "float16"
-DEFAULT_GAP_S = float(os.environ.get("SENTENCE_GAP_S", "0.8"))
-FFMPEG_BIN = os.environ.get("FFMPEG_BIN")  # set full path if ffmpeg isn't on PATH
-
-_SENT_PUNCT = re.compile(r"\s+([,.!?])")
+# FFMPEG_BIN / FFPROBE_BIN: see media_probe.py
+# Model size and decoding settings come from the ASR profile (see profiles.py)
 
 _MODEL_CACHE: Dict[tuple, WhisperModel] = {}
+_BATCHED_CACHE: Dict[tuple, Any] = {}
 
 
 # ----------------------------
 # Internal utilities
 # ----------------------------
-def _which_ffmpeg() -> str:
-    """Find ffmpeg executable (env override wins)."""
-    if FFMPEG_BIN and Path(FFMPEG_BIN).exists():
-        return FFMPEG_BIN
-    from shutil import which
-    found = which("ffmpeg")
-    if found:
-        return found
-    raise RuntimeError(
-        "FFmpeg not found. Install it and/or set FFMPEG_BIN to its full path. "
-        "Windows: winget install -e --id Gyan.FFmpeg"
-    )
-
-
 def _extract_wav(src_path: str) -> str:
     """
-    Extract mono 16 kHz WAV from any audio/video. Returns temp WAV path.
+    Extract mono 16 kHz WAV from any audio/video (only the selected audio stream is
+    decoded; see media_probe.py). Returns a unique temp WAV path.
     """
-    ffmpeg = _which_ffmpeg()
-    wav_path = os.path.join(
-        tempfile.gettempdir(),
-        Path(src_path).stem + "_16k_mono.wav"
-    )
-    cmd = [
-        ffmpeg, "-y",
-        "-i", src_path,
-        "-vn",            # ignore video
-        "-ac", "1",       # mono
-        "-ar", "16000",   # 16 kHz
-        wav_path
-    ]
-    # Suppress ffmpeg console spam; raise on error
-    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    return wav_path
-
-
-def _load_model(size: str, device: str, compute_type: str) -> WhisperModel:
-    key = (size, device, compute_type)
+    fd, wav_path = tempfile.mkstemp(prefix=Path(src_path).stem[:40] + "_", suffix="_16k_mono.wav")
+    os.close(fd)
+    try:
+        return extract_wav(src_path, wav_path)
+    except Exception:
+        _remove_quietly(wav_path)
+        raise
+
+
+def _load_model(size: str, device: str, compute_type: str, cpu_threads: int = 0) -> WhisperModel:
+    key = (size, device, compute_type, cpu_threads)
     mdl = _MODEL_CACHE.get(key)
     if mdl is None:
-        mdl = WhisperModel(size, device=device, compute_type=compute_type)
+        mdl = WhisperModel(size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
         _MODEL_CACHE[key] = mdl
     return mdl
 
 
-def _pack_sentences(words: List[dict], gap_s: float) -> List[dict]:
+def _load_batched(model: WhisperModel, key: tuple):
+    """Batched pipeline over a model, or None if this faster-whisper has none (< 1.1)."""
+    if key not in _BATCHED_CACHE:
+        try:
+            from faster_whisper import BatchedInferencePipeline
+        except ImportError:
+            logger.warning("⚠️ faster-whisper has no BatchedInferencePipeline; decoding sequentially")
+            _BATCHED_CACHE[key] = None
+        else:
+            _BATCHED_CACHE[key] = BatchedInferencePipeline(model=model)
+    return _BATCHED_CACHE[key]
+
+
+def _segment_words(segments, word_timestamps: bool) -> Iterator[Word]:
+    """Lazily turn Whisper segments into Word records (segments are decoded on demand)."""
+    for seg in segments:
+        if word_timestamps:
+            for w in seg.words or ():
+                yield Word(w.word, float(w.start or 0.0), float(w.end or 0.0))
+        else:
+            # Fall back to segment-level timing if word timestamps were disabled
+            yield Word(seg.text.strip(), float(seg.start), float(seg.end))
+
+
+def _tap(words: Iterable[Word], sink: ColumnarBuilder) -> Iterator[Word]:
+    """Pass words through while collecting them in columnar form (for return_words)."""
+    for w in words:
+        sink.append(w)
+        yield w
+
+
+def _resolve_compute_type(device: str, compute_type: Optional[str]) -> str:
+    if compute_type is None:
+        return "int8" if device == "cpu" else "float16"
+    return compute_type
+
+
+def _resolve_asr(profile: Union[str, AsrProfile, None], model_size: Optional[str], device: str,
+                 compute_type: Optional[str]) -> Tuple[AsrProfile, str, str]:
+    """The profile plus the effective model size and compute type (explicit arguments win)."""
+    asr = get_profile(profile)
+    return (
+        asr,
+        model_size or asr.model_size,
+        _resolve_compute_type(device, compute_type or asr.compute_type),
+    )
+
+
+def _asr_params(asr: AsrProfile, model_size: str, device: str, compute_type: str,
+                word_timestamps: bool, language: Optional[str]) -> Dict[str, Any]:
+    """Everything that influences the recognized words (not the sentence packing)."""
+    params = asr.cache_params()
+    params.update(
+        model_size=model_size,
+        device=device,
+        compute_type=compute_type,
+        word_timestamps=word_timestamps,
+        language=language,
+    )
+    return params
+
+
+def _lid_key(cache: TranscriptCache, content_hash: str) -> str:
+    return cache.key(content_hash, {"lid_model": DEFAULT_LID_MODEL, "lid_seconds": DEFAULT_LID_SECONDS})
+
+
+def _detect_language(wav_path: str, device: str) -> Tuple[str, float]:
+    """Language ID with the small LID model on the start of the WAV."""
+    model = _load_model(DEFAULT_LID_MODEL, device, _resolve_compute_type(device, None))
+    return identify_language(model, wav_path)
+
+
+def _route(model_size: str, detected: Optional[Tuple[str, float]]) -> Tuple[str, Optional[str]]:
     """
-    Greedy packing of words into sentence-like chunks using punctuation or pauses >= gap_s.
-    Input word items: {"w": token, "s": start_sec, "e": end_sec}
-    Output items: {"start": float, "end": float, "text": str}
+    Model and decoder language for a language-ID result: confident English goes to the
+    ".en" model; a confident language is passed to the decoder (no second detection).
     """
-    out: List[dict] = []
-    cur: List[dict] = []
-    last_end: Optional[float] = None
-
-    def flush():
-        if not cur:
-            return
-        text = " ".join(w["w"] for w in cur).strip()
-        text = _SENT_PUNCT.sub(r"\1", text)  # tighten spaces before punctuation
-        out.append({
-            "start": round(cur[0]["s"], 2),
-            "end": round(cur[-1]["e"], 2),
-            "text": text
-        })
-        cur.clear()
+    if detected is None or detected[1] < DEFAULT_LID_MIN_PROB:
+        return model_size, None
+    language = detected[0]
+    if language == "en":
+        model_size = english_model_for(model_size) or model_size
+    return model_size, language
+
+
+def _start_decoding(wav_path: str, asr: AsrProfile, model_size: str, device: str, compute_type: str,
+                    word_timestamps: bool, language: Optional[str]):
+    """Start decoding a 16 kHz WAV. Returns (lazy segments, info)."""
+    # Load/cached model (batched pipeline if the profile asks for it)
+    model = _load_model(model_size, device, compute_type, asr.cpu_threads)
+    options = asr.transcribe_options()
+    if asr.batch_size > 0:
+        batched = _load_batched(model, (model_size, device, compute_type, asr.cpu_threads))
+        if batched is not None:
+            model = batched
+            options["batch_size"] = asr.batch_size
+            options.pop("best_of", None)
+            options.pop("condition_on_previous_text", None)
+
+    # segments is a generator; decoding happens while iterating
+    return model.transcribe(wav_path, language=language, word_timestamps=word_timestamps, **options)
+
+
+def _open_transcription(src_path: str, asr: AsrProfile, model_size: str, device: str, compute_type: str,
+                        word_timestamps: bool, language: Optional[str] = None, detect_language: bool = True):
+    """Extract the WAV, identify the language and start decoding. Returns (wav_path, lazy segments, info)."""
+    wav_path = _extract_wav(src_path)
+    try:
+        detected = (language, 1.0) if language else None
+        if detected is None and detect_language:
+            detected = _detect_language(wav_path, device)
+        model_size, language = _route(model_size, detected)
+        segments, info = _start_decoding(wav_path, asr, model_size, device, compute_type, word_timestamps, language)
+    except Exception:
+        _remove_quietly(wav_path)
+        raise
+    return wav_path, segments, info
 
-    for w in words:
-        s, e, tok = w["s"], w["e"], w["w"]
-        if last_end is not None and (s - last_end) >= gap_s and cur:
-            flush()
-        cur.append(w)
-        last_end = e
-        if tok.endswith((".", "!", "?")):
-            flush()
-            last_end = None
-    flush()
-    return out
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except Exception:
+        pass
 
 
 # ----------------------------
@@ -119,77 +210,177 @@ def _pack_sentences(words: List[dict], gap_s: float) -> List[dict]:
 # ----------------------------
 def transcribe_file(
     src_path: str,
-    model_size: str = DEFAULT_MODEL,
+    model_size: Optional[str] = None,
     device: str = DEFAULT_DEVICE,
     compute_type: Optional[str] = None,
     gap_s: float = DEFAULT_GAP_S,
     word_timestamps: bool = True,
     return_words: bool = False,
+    max_sentence_s: Optional[float] = DEFAULT_MAX_DURATION_S,
+    max_sentence_chars: Optional[int] = DEFAULT_MAX_CHARS,
+    columnar_words: bool = False,
+    use_cache: bool = True,
+    content_hash: Optional[str] = None,
+    profile: Union[str, AsrProfile, None] = None,
+    language: Optional[str] = None,
+    detect_language: bool = True,
 ) -> Dict[str, Any]:
     """
     Transcribe an audio or video file into sentence-level timestamps.
 
     Args:
         src_path: Path to audio or video file.
-        model_size: Whisper model size ("base"|"small"|"medium"|"large-v3"). Default: env FW_MODEL or "medium".
+        model_size: Whisper model size ("base"|"small"|"medium"|"large-v3"); overrides the profile's.
         device: "cpu" or "cuda". Default: env FW_DEVICE or "cpu".
-        compute_type: Whisper compute type; default: "int8" on CPU, "float16" on CUDA.
+        compute_type: Whisper compute type; default: the profile's, else "int8" on CPU, "float16" on CUDA.
         gap_s: Pause threshold (seconds) to split sentences when no punctuation.
         word_timestamps: If True, request word-level times from Whisper (recommended).
         return_words: If True, include the raw word list in the return payload.
+        max_sentence_s: Split sentences longer than this (seconds); None = no limit.
+        max_sentence_chars: Split sentences longer than this (characters); None = no limit.
+        columnar_words: With return_words, return the words as a ColumnarTranscript
+            instead of a list of dicts (much smaller for long files).
+        use_cache: Reuse/store the recognized words in the transcript cache (see cache.py).
+            A hit skips FFmpeg and Whisper; only the sentence packing is redone.
+        content_hash: SHA-256 of the file if already known (saves hashing it again).
+        profile: ASR profile name ("fast"|"balanced"|"accurate") or an AsrProfile;
+            default: env ASR_PROFILE or "balanced" (see profiles.py).
+        language: Spoken language if known (e.g. "en"); skips language identification.
+        detect_language: Identify the language on the first seconds with a small model
+            (env LID_MODEL) and route confident English to the ".en" model (see language.py).
+            The result is cached per content hash. False lets Whisper auto-detect.
 
     Returns:
         {
           "language": "en",
           "sentences": [ {"start": 1.02, "end": 3.84, "text": "..."} , ... ],
-          "words": [ {"w":"Hello","s":0.10,"e":0.32}, ... ]   # present only if return_words=True
+          "words": [ {"w":"Hello","s":0.10,"e":0.32}, ... ],  # present only if return_words=True
+                                                              # (ColumnarTranscript if columnar_words=True)
+          "cache": "hit" | "miss" | "off",
+          "timings": {"extract": s, "lid": s, "asr": s, "pack": s}  # stages that ran (seconds;
+                                                              # "asr" includes the streamed packing)
         }
     """
-    if compute_type is None:
-        compute_type = "int8" if device == "cpu" else "float16"
+    rules = SplitRules(gap_s=gap_s, max_duration_s=max_sentence_s, max_chars=max_sentence_chars)
+    asr, model_size, compute_type = _resolve_asr(profile, model_size, device, compute_type)
+    cache = get_default_cache() if use_cache else None
+    if cache is not None and content_hash is None:
+        content_hash = hash_file(src_path)
+    timings: Dict[str, float] = {}
+
+    def _cache_key(detected):
+        routed_model, decode_language = _route(model_size, detected)
+        return cache.key(
+            content_hash,
+            _asr_params(asr, routed_model, device, compute_type, word_timestamps, decode_language),
+        )
+
+    # 0) Known language (argument or cached LID result) + cached words? Then only re-pack sentences.
+    detected = (language, 1.0) if language else None
+    if detected is None and cache is not None and detect_language:
+        detected = cache.get_language(_lid_key(cache, content_hash))
+    if cache is not None and (detected is not None or not detect_language):
+        result = _cached_result(cache, _cache_key(detected), rules, return_words, columnar_words, timings)
+        if result is not None:
+            return result
 
     # 1) Ensure we have a 16k mono wav
+    t0 = time.perf_counter()
     wav_path = _extract_wav(src_path)
+    timings["extract"] = time.perf_counter() - t0
+    try:
+        # 2) Language ID on the first seconds (decides the model and skips Whisper's own detection)
+        if detected is None and detect_language:
+            t0 = time.perf_counter()
+            detected = _detect_language(wav_path, device)
+            timings["lid"] = time.perf_counter() - t0
+            if cache is not None:
+                cache.put_language(_lid_key(cache, content_hash), *detected)
+                result = _cached_result(cache, _cache_key(detected), rules, return_words, columnar_words, timings)
+                if result is not None:
+                    return result
+        routed_model, decode_language = _route(model_size, detected)
+        cache_key = _cache_key(detected) if cache is not None else None
+
+        # 3) Decode (lazily) with the routed model
+        t0 = time.perf_counter()
+        segments, info = _start_decoding(
+            wav_path, asr, routed_model, device, compute_type, word_timestamps, decode_language
+        )
+
+        # 4) Stream words into the packer; keep the words if they are returned or cached
+        words = ColumnarBuilder()
+        stream = _segment_words(segments, word_timestamps)
+        if return_words or cache is not None:
+            stream = _tap(stream, words)
+        sentences = [s.to_dict() for s in iter_sentences(stream, rules)]
+        timings["asr"] = time.perf_counter() - t0
+    finally:
+        # 5) Cleanup temp wav
+        _remove_quietly(wav_path)
+
+    transcript = words.build()
+    if cache is not None:
+        cache.put(cache_key, info.language, transcript)
+    result = _result(info.language, sentences, transcript, return_words, columnar_words, timings)
+    result["cache"] = "miss" if cache is not None else "off"
+    return result
 
-    # 2) Load/cached model
-    model = _load_model(model_size, device, compute_type)
 
-    # 3) Transcribe
-    segments, info = model.transcribe(
-        wav_path,
-        beam_size=5,
-        vad_filter=True,
-        vad_parameters=dict(min_silence_duration_ms=500),
-        word_timestamps=word_timestamps
-    )
+def _cached_result(cache: TranscriptCache, key: str, rules: SplitRules, return_words: bool,
+                   columnar_words: bool, timings: Dict[str, float]) -> Optional[Dict[str, Any]]:
+    """Result built from cached words (re-packed with ``rules``), or None on a miss."""
+    hit = cache.get(key)
+    if hit is None:
+        return None
+    language, transcript = hit
+    t0 = time.perf_counter()
+    sentences = [s.to_dict() for s in iter_sentences(transcript, rules)]
+    timings["pack"] = time.perf_counter() - t0
+    result = _result(language, sentences, transcript, return_words, columnar_words, timings)
+    result["cache"] = "hit"
+    return result
 
-    # 4) Collect words (if available)
-    words: List[dict] = []
-    if word_timestamps:
-        for seg in segments:
-            if seg.words:
-                for w in seg.words:
-                    words.append({"w": w.word, "s": float(w.start or 0.0), "e": float(w.end or 0.0)})
-    else:
-        # Fall back to segment-level timing if word timestamps were disabled
-        for seg in segments:
-            words.append({"w": seg.text.strip(), "s": float(seg.start), "e": float(seg.end)})
-
-    # 5) Build sentences
-    sentences = _pack_sentences(words, gap_s=gap_s)
-
-    # 6) Cleanup temp wav
-    try:
-        os.remove(wav_path)
-    except Exception:
-        pass
 
-    result: Dict[str, Any] = {"language": info.language, "sentences": sentences}
+def _result(language: str, sentences: List[dict], transcript: ColumnarTranscript,
+            return_words: bool, columnar_words: bool, timings: Dict[str, float]) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"language": language, "sentences": sentences, "timings": timings}
     if return_words:
-        result["words"] = words
+        result["words"] = transcript if columnar_words else transcript.to_dicts()
     return result
 
 
+def iter_transcribe_file(
+    src_path: str,
+    model_size: Optional[str] = None,
+    device: str = DEFAULT_DEVICE,
+    compute_type: Optional[str] = None,
+    word_timestamps: bool = True,
+    rules: Optional[SplitRules] = None,
+    profile: Union[str, AsrProfile, None] = None,
+    language: Optional[str] = None,
+    detect_language: bool = True,
+) -> Iterator[dict]:
+    """
+    Streaming variant of transcribe_file: yields sentence dicts ({"start","end","text"})
+    while Whisper is still decoding the rest of the file.
+
+    Args:
+        src_path: Path to audio or video file.
+        model_size / device / compute_type / word_timestamps / profile / language /
+            detect_language: As in transcribe_file.
+        rules: Sentence split rules (see sentence_packer.SplitRules).
+    """
+    asr, model_size, compute_type = _resolve_asr(profile, model_size, device, compute_type)
+    wav_path, segments, _ = _open_transcription(src_path, asr, model_size, device, compute_type,
+                                                word_timestamps, language, detect_language)
+    try:
+        for sentence in iter_sentences(_segment_words(segments, word_timestamps), rules):
+            yield sentence.to_dict()
+    finally:
+        _remove_quietly(wav_path)
+
+
 def transcribe_bytes(
     data: bytes,
     filename_hint: str = "upload.mp4",
@@ -197,7 +388,8 @@ def transcribe_bytes(
 ) -> Dict[str, Any]:
     """
     Same as transcribe_file, but accepts raw bytes (e.g., when you received a file stream).
-    We write to a secure temp file, then call transcribe_file().
+    We write to a secure temp file, then call transcribe_file() (the content hash for the
+    transcript cache is computed from the bytes).
 
     Args:
         data: File content in bytes.
@@ -205,6 +397,8 @@ def transcribe_bytes(
 
     Returns: Same dict as transcribe_file().
     """
+    if kwargs.get("use_cache", True) and "content_hash" not in kwargs:
+        kwargs["content_hash"] = hash_bytes(data)
     suffix = Path(filename_hint).suffix or ".bin"
     with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
         tmp.write(data)
@@ -218,8 +412,13 @@ def transcribe_bytes(
             pass
 
 
-def save_srt(sentences: list[dict], srt_path: str) -> None:
-    from pathlib import Path
+def save_srt(sentences: Union[List[dict], ColumnarTranscript], srt_path: str) -> None:
+    """
+    Write sentences as an SRT file. A ColumnarTranscript (words) is packed into
+    sentences first, with the default split rules.
+    """
+    if isinstance(sentences, ColumnarTranscript):
+        sentences = pack_sentences(sentences)
 
     def _fmt(ts: float) -> str:
         ms = int(round(ts * 1000))
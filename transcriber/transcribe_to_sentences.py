@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
-import sys, os, json, math, re
+import sys, os, json, math
 from pathlib import Path
 import ffmpeg
 from text_unidecode import unidecode
 from faster_whisper import WhisperModel
 
+# Allow running as a script from any directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from transcriber.sentence_packer import SplitRules, pack_sentences
+
 # Config
 MODEL_SIZE = "medium"          # "large-v3" for best quality if you have VRAM
 DEVICE = "cuda" if os.environ.get("USE_CUDA","1") == "1" else "cpu"
@@ -12,8 +17,6 @@ COMPUTE_TYPE = "float16" if DEVICE == "cuda" else "int8"
 PAUSE_GAP_S = 0.8              # split sentence if a gap >= this (seconds)
 OUTPUT_DIR = "out"
 
-PUNCT_RE = re.compile(r'([.!?])')
-
 def ensure_wav(input_path, out_wav):
     Path(out_wav).parent.mkdir(parents=True, exist_ok=True)
     (
@@ -38,32 +41,7 @@ def sentence_pack(words):
     - OR pauses >= PAUSE_GAP_S between consecutive words
     Each 'word' item: {'word','start','end'}
     """
-    sentences = []
-    cur = []
-    last_end = None
-    for w in words:
-        if last_end is not None and (w["start"] - last_end) >= PAUSE_GAP_S and cur:
-            sentences.append(cur); cur = []
-        cur.append(w)
-        last_end = w["end"]
-        # If the word text ends with sentence punctuation, cut here
-        if PUNCT_RE.search(w["word"]):
-            sentences.append(cur); cur = []
-            last_end = None
-    if cur:
-        sentences.append(cur)
-    # Build final dicts
-    out = []
-    for sent_words in sentences:
-        text = " ".join([w["word"] for w in sent_words]).strip()
-        # normalize spacing around punctuation
-        text = re.sub(r'\s+([,.!?])', r'\1', text)
-        out.append({
-            "start": round(sent_words[0]["start"], 2),
-            "end": round(sent_words[-1]["end"], 2),
-            "text": text
-        })
-    return out
+    return pack_sentences(words, SplitRules(gap_s=PAUSE_GAP_S))
 
 def transcribe(wav_path):
     model = WhisperModel(MODEL_SIZE, device=DEVICE, compute_type=COMPUTE_TYPE)